@@ -0,0 +1,123 @@
+# Benchmark da busca no catálogo: latência tecla -> lista pronta num catálogo sintético.
+#
+#   python benchmarks/bench_catalog.py [--entries 50000] [--out resultado.json]
+#
+# Compara o filtro antigo (lower() + "in" em todos os itens, Treeview recriado a cada
+# tecla) com CatalogIndex/CatalogView. Com display disponível também mede o Treeview
+# (apply + update_idletasks); sem display mede só a busca. O debounce não entra na
+# conta: cada tecla é aplicada imediatamente.
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import CatalogIndex, CatalogView  # noqa: E402
+
+WORDS = ["Volvo", "Scania", "ônibus", "Perfil", "Lv28", "escape", "som", "FH16", "Mercedes", "Actros",
+         "caminhão", "reboque", "mapa", "Brasil", "comboio", "DSW", "skin", "motor", "DC13", "Marcopolo"]
+QUERY = "volvo fh16 perf"
+
+
+def synthetic_catalog(n, seed=1):
+    rnd = random.Random(seed)
+    mods = []
+    for i in range(n):
+        name = " ".join(rnd.choice(WORDS) for _ in range(3)) + f" {i}"
+        desc = " ".join(rnd.choice(WORDS) for _ in range(8))
+        mods.append({"name": name, "description": desc, "drive_link": f"https://drive.google.com/uc?id=synthetic{i:08d}"})
+    return mods
+
+
+def legacy_filter(mods, search):
+    search = search.lower()
+    return [idx for idx, mod in enumerate(mods)
+            if search in mod['name'].lower() or search in mod.get('description', '').lower()]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {"mean_ms": round(statistics.mean(samples) * 1000, 3),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3)}
+
+
+def bench_search(mods):
+    t0 = time.perf_counter()
+    index = CatalogIndex(mods)
+    build = time.perf_counter() - t0
+    legacy, indexed = [], []
+    for i in range(1, len(QUERY) + 1):
+        q = QUERY[:i]
+        t0 = time.perf_counter()
+        legacy_filter(mods, q)
+        legacy.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        index.search(q)
+        indexed.append(time.perf_counter() - t0)
+    return {"index_build_ms": round(build * 1000, 3), "legacy": percentiles(legacy), "indexed": percentiles(indexed)}
+
+
+def bench_render(mods):
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": f"Tk indisponível: {e}"}
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=("Nome", "Descrição"), show="headings")
+    tree.pack()
+
+    legacy = []
+    for i in range(1, len(QUERY) + 1):
+        t0 = time.perf_counter()
+        for iid in tree.get_children():
+            tree.delete(iid)
+        for idx in legacy_filter(mods, QUERY[:i]):
+            mod = mods[idx]
+            tree.insert("", "end", iid=idx, values=(mod['name'], mod.get('description', '')))
+        root.update_idletasks()
+        legacy.append(time.perf_counter() - t0)
+    tree.delete(*tree.get_children())
+
+    view = CatalogView(tree)
+    view.set_catalog(mods)
+    view.apply("")
+    root.update_idletasks()
+    indexed = []
+    for i in range(1, len(QUERY) + 1):
+        t0 = time.perf_counter()
+        view.apply(QUERY[:i])
+        root.update_idletasks()
+        indexed.append(time.perf_counter() - t0)
+    root.destroy()
+    return {"legacy": percentiles(legacy), "indexed": percentiles(indexed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--no-render", action="store_true", help="não mede o Treeview")
+    parser.add_argument("--out", help="grava o resultado em JSON neste arquivo")
+    args = parser.parse_args()
+
+    mods = synthetic_catalog(args.entries)
+    result = {"benchmark": "catalog", "entries": args.entries, "query": QUERY, "keystrokes": len(QUERY),
+              "search": bench_search(mods)}
+    if not args.no_render:
+        result["render"] = bench_render(mods)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Benchmark de instalação: gravação serial (caminho anterior) x threads + cópia pelo kernel.
+#
+#   python benchmarks/bench_extract.py [--workers 1 2 4 8] [--repeat 3] [--scale 1] [--out resultado.json]
+#
+# Monta ZIPs sintéticos numa pasta temporária (ou em --dir, para medir outro disco):
+#   perfis  - milhares de arquivos pequenos comprimidos (saves/perfis)
+#   scs     - poucos .scs grandes sem compressão (como os packs costumam vir)
+#   deflate - poucos arquivos grandes comprimidos
+# e instala cada um com engine.install_archive numa pasta do ETS2 vazia a cada rodada.
+# "serial" é extract_workers=1 com KERNEL_COPY desligado; as demais linhas usam o número
+# de threads indicado e a cópia pelo kernel quando o sistema tem. O cache de páginas
+# não é limpo entre as rodadas: em disco frio as threads tendem a ganhar mais.
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import engine  # noqa: E402
+
+
+def build_archives(folder, scale):
+    """(nome, caminho, bytes descompactados) dos ZIPs sintéticos."""
+    specs = (
+        ("perfis", int(4000 * scale), 4 * 1024, zipfile.ZIP_DEFLATED, "P/perfil/Perfil{g}/save/{i}/game.sii"),
+        ("scs", max(2, int(12 * scale)), 32 * 1024 * 1024, zipfile.ZIP_STORED, "P/mods/pack{i}.scs"),
+        ("deflate", max(2, int(12 * scale)), 16 * 1024 * 1024, zipfile.ZIP_DEFLATED, "P/mods/pack{i}.scs"),
+    )
+    archives = []
+    for name, count, size, compression, pattern in specs:
+        path = os.path.join(folder, f"{name}.zip")
+        # metade aleatória, metade repetida: comprime como um arquivo de jogo, não como zeros
+        with zipfile.ZipFile(path, "w", compression) as z:
+            for i in range(count):
+                half = os.urandom(size // 2)
+                z.writestr(pattern.format(i=i, g=i % 5), half + half[:size - len(half)])
+        archives.append((name, path, count * size))
+    return archives
+
+
+def install_once(archive, game_dir, workers, kernel_copy):
+    shutil.rmtree(game_dir, ignore_errors=True)
+    engine.configure_paths(documents_folder=game_dir)
+    engine.ensure_folders()
+    engine.KERNEL_COPY = kernel_copy
+    started = time.perf_counter()
+    success, info, _ = engine.install_archive({"name": "bench", "drive_link": "bench"}, archive, extract_workers=workers)
+    elapsed = time.perf_counter() - started
+    if not success:
+        raise RuntimeError(f"instalação falhou: {info}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({2, 4, engine.EXTRACT_WORKERS}))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica a quantidade de arquivos")
+    parser.add_argument("--dir", help="pasta onde montar os ZIPs e instalar (padrão: temporária)")
+    parser.add_argument("--out", help="grava o resultado em JSON neste arquivo")
+    args = parser.parse_args()
+
+    kernel_copy = engine.KERNEL_COPY
+    result = {"benchmark": "extract", "python": sys.version.split()[0], "cpus": os.cpu_count(),
+              "kernel_copy": kernel_copy, "repeat": args.repeat, "archives": {}}
+    with tempfile.TemporaryDirectory(dir=args.dir) as folder:
+        game_dir = os.path.join(folder, "docs")
+        for name, path, size in build_archives(folder, args.scale):
+            runs = {"serial": (1, False)}
+            runs.update((f"{w} threads", (w, kernel_copy)) for w in args.workers)
+            rows = {}
+            for label, (workers, kernel) in runs.items():
+                samples = [install_once(path, game_dir, workers, kernel) for _ in range(args.repeat)]
+                median = statistics.median(samples)
+                rows[label] = {"seconds": round(median, 3), "mb_s": round(size / median / 1e6, 1),
+                               "samples": [round(s, 3) for s in samples]}
+            base = rows["serial"]["seconds"]
+            for row in rows.values():
+                row["speedup"] = round(base / row["seconds"], 2) if row["seconds"] else None
+            result["archives"][name] = {"bytes": size, "runs": rows}
+            print(f"{name}: " + ", ".join(f"{label} {row['seconds']}s ({row['speedup']}x)" for label, row in rows.items()),
+                  file=sys.stderr)
+    engine.KERNEL_COPY = kernel_copy
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# Benchmark do caminho completo de instalação: download -> gravação -> commit -> verificação.
+#
+#   python benchmarks/bench_pipeline.py [--mods-files 16 --mods-mb 512] [--profile-files 3000 --profile-kb 4]
+#                                       [--serve-mbps 0] [--out resultado.json]
+#   python benchmarks/bench_pipeline.py --baseline anterior.json [--tolerance 0.25]
+#
+# Monta um ZIP sintético (pasta mods com .scs e pasta perfil com muitos arquivos
+# pequenos), serve por um HTTP local no lugar do Drive (com Range, para retomada, e
+# limite de banda opcional) e mede cada etapa com engine, numa pasta de Documentos
+# temporária:
+#   download   - fetch_archive (MB/s do arquivo baixado)
+#   install    - install_archive (MB/s descompactados), separado em extract (gravação
+#                até "Aplicando alterações...") e commit (renomeações + manifesto)
+#   reinstall  - mesmo pacote de novo (nada muda: só comparação com o manifesto)
+#   verify     - verify_installed (MB/s relidos de mod/)
+# Em cada etapa, uma thread amostra o espaço ocupado na pasta de Documentos (inodes
+# distintos, então hardlinks contam uma vez) e a memória residente do processo; o
+# resultado guarda os picos. Com --baseline, sai com código 1 se alguma vazão cair ou
+# algum pico crescer mais que a tolerância.
+
+import argparse
+import http.server
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import engine  # noqa: E402
+
+SAMPLE_INTERVAL = 0.05
+FILE_ID = "benchpipeline0001"
+
+
+def build_archive(path, mods_files, mods_mb, profile_files, profile_kb, compression):
+    mod_size = int(mods_mb * 1024 * 1024 / max(1, mods_files))
+    with zipfile.ZipFile(path, "w", compression) as z:
+        for i in range(mods_files):
+            # metade aleatória, metade repetida: comprime como arquivo de jogo, não como zeros
+            half = os.urandom(mod_size // 2)
+            z.writestr(f"Pacote/mods/pack_{i:03d}.scs", half + half[:mod_size - len(half)])
+        for i in range(profile_files):
+            z.writestr(f"Pacote/perfil/Perfil{i % 3}/save/{i:05d}/game.sii", os.urandom(profile_kb * 1024))
+    with zipfile.ZipFile(path) as z:
+        return sum(info.file_size for info in z.infolist())
+
+
+class DriveStandIn(http.server.BaseHTTPRequestHandler):
+    """Responde /uc?export=download&id=... como o Drive para arquivos pequenos (sem página de confirmação)."""
+
+    files = {}
+    bytes_per_sec = 0
+
+    def do_GET(self):
+        fid = parse_qs(urlparse(self.path).query).get("id", [""])[0]
+        path = self.files.get(fid)
+        if path is None:
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start = 0
+        m = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if m and int(m.group(1)) < size:
+            start = int(m.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+        self.end_headers()
+        limiter = engine.BandwidthLimiter(self.bytes_per_sec)
+        with open(path, "rb") as f:
+            f.seek(start)
+            try:
+                for block in iter(lambda: f.read(256 * 1024), b""):
+                    limiter.consume(len(block))
+                    self.wfile.write(block)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def log_message(self, *args):
+        pass
+
+
+def disk_bytes(folder):
+    """Espaço alocado em folder, contando cada inode uma vez."""
+    seen = set()
+    total = 0
+    stack = [folder]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            total += getattr(st, "st_blocks", 0) * 512 or st.st_size
+    return total
+
+
+def rss_bytes():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Sampler:
+    """Picos de disco (em folder) e de memória enquanto o bloco with roda."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.peak_disk = 0
+        self.peak_rss = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        self.peak_disk = max(self.peak_disk, disk_bytes(self.folder))
+        rss = rss_bytes()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+
+    def _run(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def stage(name, folder, nbytes, fn):
+    with Sampler(folder) as sampler:
+        started = time.perf_counter()
+        extra = fn() or {}
+        seconds = time.perf_counter() - started
+    result = {"seconds": round(seconds, 3), "bytes": nbytes, "peak_disk_bytes": sampler.peak_disk,
+              "peak_rss_bytes": sampler.peak_rss}
+    result.update(extra)
+    seconds = result["seconds"]
+    result["mb_s"] = round(result["bytes"] / seconds / 1e6, 1) if seconds and result["bytes"] else None
+    print(f"  {name}: {seconds:.2f}s" + (f", {result['mb_s']} MB/s" if result["mb_s"] else ""), file=sys.stderr)
+    return result
+
+
+def run_once(work, url, archive_bytes, install_bytes, args):
+    docs = os.path.join(work, "docs")
+    shutil.rmtree(docs, ignore_errors=True)
+    engine.configure_paths(documents_folder=docs)
+    engine.ensure_folders()
+    mod = {"name": "Pacote de benchmark", "drive_link": url}
+    stages = {}
+    local = {}
+
+    def download():
+        local["archive"] = engine.fetch_archive(url)
+
+    stages["download"] = stage("download", docs, archive_bytes, download)
+
+    marks = {}
+
+    def on_status(text):
+        marks.setdefault(text, time.perf_counter())
+
+    def install():
+        started = time.perf_counter()
+        success, info, _ = engine.install_archive(mod, local["archive"], status=on_status,
+                                                  extract_workers=args.extract_workers)
+        finished = time.perf_counter()
+        if not success:
+            raise RuntimeError(f"instalação falhou: {info}")
+        # install_archive avisa cada fase por status(): a gravação vai de "Instalando
+        # arquivos..." a "Aplicando alterações..." (commit), que vai até o retorno
+        begin = marks.get("Instalando arquivos...", started)
+        commit = marks.get("Aplicando alterações...", finished)
+        return {"extract_seconds": round(commit - begin, 3), "commit_seconds": round(finished - commit, 3),
+                "extract_mb_s": round(install_bytes / (commit - begin) / 1e6, 1) if commit > begin else None}
+
+    stages["install"] = stage("install", docs, install_bytes, install)
+
+    def reinstall():
+        engine.install_archive(mod, local["archive"], extract_workers=args.extract_workers)
+
+    stages["reinstall"] = stage("reinstall", docs, install_bytes, reinstall)
+
+    def verify():
+        result = engine.verify_installed()
+        if result["missing"] or result["corrupt"]:
+            raise RuntimeError(f"verificação falhou: {result['missing'] + result['corrupt']}")
+        return {"bytes": result["bytes"]}
+
+    stages["verify"] = stage("verify", docs, 0, verify)
+    engine.release_archive(local["archive"])
+    return stages
+
+
+def summarize(runs):
+    """Mediana de cada métrica numérica entre as repetições."""
+    summary = {}
+    for name in runs[0]:
+        summary[name] = {}
+        for metric, value in runs[0][name].items():
+            values = [run[name][metric] for run in runs if run[name][metric] is not None]
+            summary[name][metric] = round(statistics.median(values), 3) if values else None
+    return summary
+
+
+def compare(result, baseline, tolerance):
+    """Lista de regressões em relação a um resultado anterior."""
+    problems = []
+    for name, new in result["stages"].items():
+        old = baseline.get("stages", {}).get(name, {})
+        for metric in ("mb_s", "extract_mb_s"):
+            if old.get(metric) and new.get(metric) and new[metric] < old[metric] * (1 - tolerance):
+                problems.append(f"{name}.{metric}: {old[metric]} -> {new[metric]}")
+        for metric in ("peak_disk_bytes", "peak_rss_bytes"):
+            if old.get(metric) and new.get(metric) and new[metric] > old[metric] * (1 + tolerance):
+                problems.append(f"{name}.{metric}: {engine.format_bytes(old[metric])} -> {engine.format_bytes(new[metric])}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mods-files", type=int, default=16, help=".scs na pasta mods")
+    parser.add_argument("--mods-mb", type=float, default=512, help="tamanho total dos .scs (MB)")
+    parser.add_argument("--profile-files", type=int, default=3000, help="arquivos na pasta perfil")
+    parser.add_argument("--profile-kb", type=int, default=4, help="tamanho de cada arquivo de perfil (KB)")
+    parser.add_argument("--compression", choices=("stored", "deflate"), default="stored")
+    parser.add_argument("--serve-mbps", type=float, default=0, help="banda do servidor local em MB/s (0 = sem limite)")
+    parser.add_argument("--extract-workers", type=int, default=engine.EXTRACT_WORKERS)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--dir", help="pasta onde montar o ZIP e instalar (padrão: temporária)")
+    parser.add_argument("--out", help="grava o resultado em JSON neste arquivo")
+    parser.add_argument("--baseline", help="resultado anterior (JSON) para detectar regressão")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="piora aceita sobre a base (padrão: 25%%)")
+    args = parser.parse_args()
+
+    compression = zipfile.ZIP_STORED if args.compression == "stored" else zipfile.ZIP_DEFLATED
+    with tempfile.TemporaryDirectory(dir=args.dir) as work:
+        archive = os.path.join(work, "pacote.zip")
+        started = time.perf_counter()
+        install_bytes = build_archive(archive, args.mods_files, args.mods_mb, args.profile_files, args.profile_kb,
+                                      compression)
+        archive_bytes = os.path.getsize(archive)
+        print(f"ZIP sintético: {engine.format_bytes(archive_bytes)} ({engine.format_bytes(install_bytes)} descompactados) "
+              f"em {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        DriveStandIn.files = {FILE_ID: archive}
+        DriveStandIn.bytes_per_sec = int(args.serve_mbps * 1024 * 1024)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), DriveStandIn)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/uc?export=download&id={FILE_ID}"
+        try:
+            runs = []
+            for i in range(args.repeat):
+                print(f"rodada {i + 1}/{args.repeat}", file=sys.stderr)
+                runs.append(run_once(work, url, archive_bytes, install_bytes, args))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    result = {"benchmark": "pipeline", "python": sys.version.split()[0], "platform": sys.platform,
+              "cpus": os.cpu_count(), "repeat": args.repeat,
+              "config": {k: getattr(args, k) for k in ("mods_files", "mods_mb", "profile_files", "profile_kb",
+                                                       "compression", "serve_mbps", "extract_workers")},
+              "archive_bytes": archive_bytes, "install_bytes": install_bytes, "stages": summarize(runs)}
+    problems = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = problems
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# Benchmark de abertura: importações (python -X importtime) e tempo até a primeira janela.
+#
+#   python benchmarks/bench_startup.py [--repeat 5] [--out resultado.json]
+#   python benchmarks/bench_startup.py --baseline anterior.json [--tolerance 0.25]
+#
+# Cada medição roda num processo novo com HOME temporário (abertura "a frio", sem
+# pastas nem catálogo salvos). "imports" mede engine + catalog; com display disponível
+# também roda min.py com ETS2_STARTUP_PROBE=1, que imprime first_frame_ms/ready_ms e
+# fecha. Com --baseline, sai com código 1 se alguma mediana piorar mais que a tolerância
+# ou se gdown/requests/bs4 voltarem a ser importados antes da primeira janela.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("gdown", "requests", "bs4")
+
+
+def parse_importtime(stderr):
+    """Soma o tempo cumulativo (ms) das importações de primeiro nível e lista os módulos carregados."""
+    total_us = 0
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # "| engine" = importação de primeiro nível; dependências vêm com mais recuo
+        top_level = not name.startswith("  ")
+        name = name.strip()
+        modules[name] = int(cumulative_us)
+        if top_level:
+            total_us += int(cumulative_us)
+    return round(total_us / 1000, 1), modules
+
+
+def run(args, env_extra=None):
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, USERPROFILE=home, **(env_extra or {}))
+        return subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT, env=env,
+                              capture_output=True, text=True, timeout=60)
+
+
+def bench_imports(repeat):
+    samples, heavy = [], set()
+    for _ in range(repeat):
+        proc = run(["-c", "import engine, catalog"])
+        total_ms, modules = parse_importtime(proc.stderr)
+        samples.append(total_ms)
+        heavy.update(m for m in HEAVY_MODULES if m in modules)
+    return {"import_ms": statistics.median(samples), "samples": samples, "heavy_modules": sorted(heavy)}
+
+
+def bench_gui(repeat):
+    if not (sys.platform.startswith(("win", "darwin")) or os.environ.get("DISPLAY")):
+        return {"skipped": "sem display"}
+    first, ready, imports, heavy = [], [], [], set()
+    for _ in range(repeat):
+        proc = run(["min.py"], {"ETS2_STARTUP_PROBE": "1"})
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            return {"skipped": f"min.py falhou: {proc.stderr.strip().splitlines()[-1:] or proc.returncode}"}
+        probe = json.loads(lines[-1])
+        first.append(probe["first_frame_ms"])
+        ready.append(probe["ready_ms"])
+        heavy.update(probe.get("heavy_modules", []))
+        imports.append(parse_importtime(proc.stderr)[0])
+    return {"first_frame_ms": statistics.median(first), "ready_ms": statistics.median(ready),
+            "import_ms": statistics.median(imports), "first_frame_samples": first, "heavy_modules": sorted(heavy)}
+
+
+def compare(result, baseline, tolerance):
+    """Lista de regressões em relação a um resultado anterior."""
+    problems = []
+    for section, metric in (("imports", "import_ms"), ("gui", "first_frame_ms"), ("gui", "ready_ms")):
+        old = baseline.get(section, {}).get(metric)
+        new = result.get(section, {}).get(metric)
+        if old and new and new > old * (1 + tolerance):
+            problems.append(f"{section}.{metric}: {old} -> {new} ms")
+    for section in ("imports", "gui"):
+        heavy = result.get(section, {}).get("heavy_modules")
+        if heavy:
+            problems.append(f"{section}: importou {', '.join(heavy)} antes da janela")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-gui", action="store_true", help="não abre a janela (só importações)")
+    parser.add_argument("--out", help="grava o resultado em JSON neste arquivo")
+    parser.add_argument("--baseline", help="resultado anterior (JSON) para detectar regressão")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="piora aceita sobre a base (padrão: 25%%)")
+    args = parser.parse_args()
+
+    result = {"benchmark": "startup", "python": sys.version.split()[0], "repeat": args.repeat,
+              "imports": bench_imports(args.repeat)}
+    if not args.no_gui:
+        result["gui"] = bench_gui(args.repeat)
+    problems = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = problems
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
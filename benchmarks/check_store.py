@@ -0,0 +1,196 @@
+# Conferência do armazenamento por conteúdo (hardlinks em mod/) no sistema de arquivos local.
+#
+#   python benchmarks/check_store.py [--dir /mnt/outro_disco] [--out resultado.json]
+#
+# Monta uma pasta de Documentos temporária (em --dir, para conferir outro disco/sistema
+# de arquivos) e confere, com engine:
+#   dry-run      - dedupe_mods(dry_run=True) conta os iguais sem mexer em nenhum arquivo
+#   dedupe       - os .scs iguais passam a ser o mesmo inode (st_nlink = cópias + 1 do
+#                  armazenamento); o diferente de mesmo tamanho e os pequenos ficam como estão
+#   idempotente  - rodar de novo não troca nada nem muda inodes
+#   install      - install_archive liga ao armazenamento um .scs igual a um já guardado
+#   gc           - depois de uninstall_package a cópia guardada fica enquanto a remoção
+#                  puder ser desfeita; some com store_gc quando a transação é descartada
+#   sem-hardlink - com os.link falhando (outro volume, FAT32) dedupe e instalação seguem
+#                  com cópias comuns, sem erro e sem perder conteúdo
+# Sai com código 1 se alguma conferência falhar.
+
+import argparse
+import errno
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import engine  # noqa: E402
+
+SIZE = engine.STORE_MIN_SIZE * 2
+
+
+class Checks:
+    def __init__(self):
+        self.results = {}
+
+    def __call__(self, name, ok, detail=""):
+        self.results.setdefault(name, []).append({"ok": bool(ok), "detail": detail})
+        if not ok:
+            print(f"FALHOU {name}: {detail}", file=sys.stderr)
+
+    def failed(self):
+        return [name for name, rows in self.results.items() if not all(r["ok"] for r in rows)]
+
+
+def filesystem(path):
+    """Tipo do sistema de arquivos de path (Linux: /proc/mounts), ou None."""
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best = None
+    for point, kind in mounts:
+        point = point.replace("\\040", " ")
+        inside = path == point or path.startswith(point.rstrip("/") + "/")
+        if inside and (best is None or len(point) >= len(best[0])):
+            best = (point, kind)
+    return best[1] if best else None
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def inode(path):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+
+def build_package(folder, name, files):
+    path = os.path.join(folder, f"{name}.zip")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as z:
+        for rel, data in files.items():
+            z.writestr(f"{name}/mods/{rel}", data)
+    return path
+
+
+def run(folder, check):
+    engine.configure_paths(documents_folder=os.path.join(folder, "docs"))
+    engine.ensure_folders()
+    mod = lambda *p: os.path.join(engine.MODS_FOLDER, *p)  # noqa: E731
+    same = os.urandom(SIZE)
+    other = os.urandom(SIZE)
+    small = os.urandom(1024)
+    for rel in ("a.scs", os.path.join("sub", "b.scs"), "c.scs"):
+        write(mod(rel), same)
+    write(mod("d.scs"), other)
+    write(mod("e.scs"), small)
+    write(mod("f.scs"), small)
+    copies = [mod("a.scs"), mod("sub", "b.scs"), mod("c.scs")]
+    before = {p: inode(p) for p in copies + [mod("d.scs"), mod("e.scs"), mod("f.scs")]}
+
+    r = engine.dedupe_mods(dry_run=True)
+    check("dry-run", r["linked"] == 2 and r["bytes_saved"] == 2 * SIZE, f"linked={r['linked']} saved={r['bytes_saved']}")
+    check("dry-run", all(inode(p) == i for p, i in before.items()), "inodes mudaram na simulação")
+    check("dry-run", engine.store_report()["files"] == 0, "a simulação guardou cópias")
+
+    r = engine.dedupe_mods()
+    check("dedupe", r["linked"] == 2 and r["bytes_saved"] == 2 * SIZE, f"linked={r['linked']} saved={r['bytes_saved']}")
+    check("dedupe", len({inode(p) for p in copies}) == 1, "cópias iguais não viraram o mesmo inode")
+    nlinks = [os.stat(p).st_nlink for p in copies]
+    check("dedupe", nlinks == [len(copies) + 1] * len(copies), f"st_nlink={nlinks}")
+    check("dedupe", all(open(p, "rb").read() == same for p in copies), "conteúdo alterado")
+    check("dedupe", inode(mod("d.scs")) == before[mod("d.scs")] and os.stat(mod("d.scs")).st_nlink == 1,
+          "arquivo diferente de mesmo tamanho foi ligado")
+    check("dedupe", inode(mod("e.scs")) != inode(mod("f.scs")), "arquivos abaixo de STORE_MIN_SIZE foram ligados")
+    store = engine.store_report()
+    check("dedupe", store["files"] == 1 and store["saved"] == 2 * SIZE, f"store={store}")
+
+    linked = {p: inode(p) for p in copies}
+    r = engine.dedupe_mods()
+    check("idempotente", r["linked"] == 0 and r["bytes_saved"] == 0, f"linked={r['linked']} saved={r['bytes_saved']}")
+    check("idempotente", all(inode(p) == i for p, i in linked.items()), "inodes mudaram na segunda rodada")
+    check("idempotente", engine.store_report() == store, "armazenamento mudou na segunda rodada")
+
+    # pacote com um .scs igual ao guardado e um novo
+    unique = os.urandom(SIZE)
+    package = build_package(folder, "pacote", {"igual.scs": same, "novo.scs": unique})
+    ok, info, _ = engine.install_archive({"name": "pacote", "drive_link": "check"}, package)
+    check("install", ok, info)
+    check("install", inode(mod("igual.scs")) == inode(mod("a.scs")), "pacote não reaproveitou a cópia guardada")
+    unique_blob = engine.store_lookup(hashlib.sha256(unique).hexdigest(), SIZE)
+    check("install", unique_blob is not None and inode(unique_blob) == inode(mod("novo.scs")),
+          "arquivo novo do pacote não foi guardado")
+
+    engine.uninstall_package("pacote")
+    check("gc", not os.path.exists(mod("novo.scs")), "uninstall não removeu o arquivo")
+    engine.store_gc()
+    check("gc", unique_blob is not None and os.path.exists(unique_blob),
+          "cópia guardada apagada enquanto a remoção ainda pode ser desfeita")
+    keep = engine.TRANSACTIONS_KEEP
+    engine.TRANSACTIONS_KEEP = 0
+    try:
+        engine.prune_transactions()  # descarta os backups e chama store_gc
+    finally:
+        engine.TRANSACTIONS_KEEP = keep
+    check("gc", unique_blob is not None and not os.path.exists(unique_blob), "cópia sem uso ficou no armazenamento")
+    check("gc", engine.store_lookup(hashlib.sha256(same).hexdigest(), SIZE) is not None,
+          "cópia ainda usada em mod/ foi apagada")
+
+    # sem hardlink: o volume recusa os.link (EXDEV, como outro disco; FAT32 dá EPERM)
+    more = os.urandom(SIZE)
+    write(mod("g.scs"), more)
+    write(mod("h.scs"), more)
+    real_link = os.link
+
+    def refuse(src, dst, *args, **kwargs):
+        raise OSError(errno.EXDEV, "hardlink recusado (conferência)", dst)
+
+    engine.os.link = refuse
+    try:
+        engine.dedupe_mods()
+        check("sem-hardlink", inode(mod("g.scs")) != inode(mod("h.scs")), "arquivos ligados com os.link falhando")
+        check("sem-hardlink", all(open(mod(n), "rb").read() == more for n in ("g.scs", "h.scs")), "conteúdo perdido")
+        package = build_package(folder, "pacote2", {"outro.scs": more, "igual2.scs": same})
+        ok, info, _ = engine.install_archive({"name": "pacote2", "drive_link": "check"}, package)
+        check("sem-hardlink", ok, info)
+        check("sem-hardlink", open(mod("outro.scs"), "rb").read() == more and open(mod("igual2.scs"), "rb").read() == same,
+              "instalação sem hardlink gravou conteúdo errado")
+        check("sem-hardlink", os.stat(mod("outro.scs")).st_nlink == 1, "arquivo instalado ficou ligado")
+    finally:
+        engine.os.link = real_link
+    return {"store": engine.store_report()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", help="pasta onde montar a conferência (padrão: temporária)")
+    parser.add_argument("--out", help="grava o resultado em JSON neste arquivo")
+    args = parser.parse_args()
+
+    check = Checks()
+    with tempfile.TemporaryDirectory(dir=args.dir) as folder:
+        extra = run(folder, check)
+        fs = filesystem(folder)
+    failed = check.failed()
+    result = {"check": "store", "platform": sys.platform, "dir": args.dir or tempfile.gettempdir(),
+              "filesystem": fs, "ok": not failed, "failed": failed,
+              "checks": {name: all(r["ok"] for r in rows) for name, rows in check.results.items()}}
+    result.update(extra)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# Índice e visão filtrada do catálogo (mods.json) para a lista de expansões.
+# - CatalogIndex: montado uma vez por load_mods; chaves em minúsculas e sem acento,
+#   busca por prefixo de palavra (todas as palavras digitadas precisam casar)
+# - CatalogView: aplica a busca com atraso (debounce) e atualiza o Treeview só com as
+#   diferenças, exibindo no máximo MAX_VISIBLE_ROWS linhas
+# - TableView: base das listas da aba "Instalados" (perfis, mods): mesma busca por
+#   prefixo, ordenação clicando no cabeçalho e Treeview atualizado só nas diferenças
+
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+MAX_VISIBLE_ROWS = 1000
+SEARCH_DEBOUNCE_MS = 150
+INCREMENTAL_FILTER_LIMIT = 2000  # abaixo disso, refinar o resultado anterior é mais barato que o índice
+
+
+COMBINING_RE = re.compile(r"[\u0300-\u036f]")
+
+
+def fold_text(text):
+    """Minúsculas e sem acentos ("Ônibus" -> "onibus")."""
+    text = text or ""
+    if text.isascii():
+        return text.lower()
+    return COMBINING_RE.sub("", unicodedata.normalize("NFKD", text)).casefold()
+
+
+def text_matches(text, terms):
+    """Cada termo (já normalizado) é prefixo de alguma palavra de text."""
+    tokens = TOKEN_RE.findall(fold_text(text))
+    return all(any(tok.startswith(term) for tok in tokens) for term in terms)
+
+
+class CatalogIndex:
+    def __init__(self, mods):
+        self.mods = mods
+        postings = defaultdict(list)
+        self.item_tokens = []
+        for idx, mod in enumerate(mods):
+            key = fold_text(f"{mod.get('name', '')} {mod.get('description', '')}")
+            tokens = set(TOKEN_RE.findall(key))
+            self.item_tokens.append(tokens)
+            for token in tokens:
+                postings[token].append(idx)
+        self.postings = dict(postings)
+        self.tokens = sorted(postings)
+        self._last_terms = None
+        self._last_result = None
+
+    def _prefix_matches(self, prefix):
+        # tokens ordenados: todos que começam com o prefixo estão num intervalo contíguo
+        lo = bisect.bisect_left(self.tokens, prefix)
+        hi = bisect.bisect_left(self.tokens, prefix + "\uffff")
+        if hi - lo == 1:
+            return set(self.postings[self.tokens[lo]])
+        found = set()
+        for token in self.tokens[lo:hi]:
+            found.update(self.postings[token])
+        return found
+
+    def search(self, query):
+        """Índices (em ordem do catálogo) dos itens em que cada palavra da busca é prefixo de alguma palavra."""
+        terms = TOKEN_RE.findall(fold_text(query))
+        if not terms:
+            self._last_terms, self._last_result = None, None
+            return list(range(len(self.mods)))
+        # digitando: se a busca só estendeu a anterior, o resultado é um subconjunto dela
+        previous = None
+        last = self._last_terms
+        if last and len(terms) >= len(last) and all(t.startswith(l) for t, l in zip(terms, last)):
+            previous = self._last_result
+        if previous is not None and len(previous) <= INCREMENTAL_FILTER_LIMIT:
+            ordered = [idx for idx in previous
+                       if all(any(tok.startswith(term) for tok in self.item_tokens[idx]) for term in terms)]
+        else:
+            result = set(previous) if previous is not None else None
+            for term in sorted(terms, key=len, reverse=True):
+                matches = self._prefix_matches(term)
+                result = matches if result is None else result & matches
+                if not result:
+                    break
+            ordered = sorted(result)
+        self._last_terms, self._last_result = terms, ordered
+        return ordered
+
+
+class CatalogView:
+    """Liga um CatalogIndex a um ttk.Treeview (iid = índice no catálogo)."""
+
+    def __init__(self, tree, status_var=None, debounce_ms=SEARCH_DEBOUNCE_MS, max_rows=MAX_VISIBLE_ROWS):
+        self.tree = tree
+        self.status_var = status_var
+        self.debounce_ms = debounce_ms
+        self.max_rows = max_rows
+        self.index = CatalogIndex([])
+        self.shown = []
+        self._pending = None
+
+    def set_catalog(self, mods):
+        self.index = CatalogIndex(mods)
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.shown = []
+
+    def schedule(self, query):
+        """Chamado a cada tecla; só filtra depois de debounce_ms sem digitação."""
+        if self._pending is not None:
+            self.tree.after_cancel(self._pending)
+        self._pending = self.tree.after(self.debounce_ms, self.apply, query)
+
+    def apply(self, query):
+        self._pending = None
+        matches = self.index.search(query)
+        self.render(matches[:self.max_rows])
+        if self.status_var is not None:
+            if len(matches) > self.max_rows:
+                self.status_var.set(f"Mostrando {self.max_rows} de {len(matches)} resultados - refine a busca")
+            else:
+                self.status_var.set(f"{len(matches)} de {len(self.index.mods)} expansões")
+        return matches
+
+    def render(self, ids):
+        wanted = set(ids)
+        removed = [idx for idx in self.shown if idx not in wanted]
+        if removed:
+            self.tree.delete(*[str(idx) for idx in removed])
+        kept = [idx for idx in self.shown if idx in wanted]
+        kept_set = set(kept)
+        # ids e kept estão em ordem do catálogo: cada item novo entra na posição final;
+        # depois do último item mantido, inserir no fim é o caso barato
+        pos = 0
+        kept_left = len(kept)
+        for idx in ids:
+            if idx in kept_set:
+                kept_left -= 1
+            else:
+                mod = self.index.mods[idx]
+                self.tree.insert("", pos if kept_left else "end", iid=str(idx),
+                                 values=(mod['name'], mod.get('description', '')))
+            pos += 1
+        self.shown = list(ids)
+
+
+class TableView:
+    """Itens (dicts) num ttk.Treeview com busca e ordenação por coluna (iid = chave do item).
+
+    Subclasses definem columns, headings, numeric (colunas que começam em ordem
+    decrescente), noun e os métodos row_values, search_text e sort_value.
+    """
+
+    columns = ()
+    headings = {}
+    numeric = ()
+    noun = "itens"
+
+    def __init__(self, tree, status_var=None, debounce_ms=SEARCH_DEBOUNCE_MS):
+        self.tree = tree
+        self.status_var = status_var
+        self.debounce_ms = debounce_ms
+        self.items = {}
+        self.query = ""
+        self.sort_key = self.columns[0]
+        self.sort_reverse = False
+        self.shown = []
+        self._values = {}
+        self._pending = None
+        for column in self.columns:
+            tree.heading(column, text=self.headings[column], command=lambda c=column: self.sort_by(c))
+
+    def row_values(self, item):
+        raise NotImplementedError
+
+    def search_text(self, item):
+        raise NotImplementedError
+
+    def sort_value(self, item, column):
+        return item.get(column)
+
+    def set_items(self, items):
+        self.items = items
+        self.apply(self.query)
+
+    def schedule(self, query):
+        """Chamado a cada tecla; só filtra depois de debounce_ms sem digitação."""
+        if self._pending is not None:
+            self.tree.after_cancel(self._pending)
+        self._pending = self.tree.after(self.debounce_ms, self.apply, query)
+
+    def sort_by(self, column):
+        if self.sort_key == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_key, self.sort_reverse = column, column in self.numeric
+        for col in self.columns:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if col == column else ""
+            self.tree.heading(col, text=self.headings[col] + arrow)
+        self.apply(self.query)
+
+    def _sort_key(self, iid):
+        item = self.items[iid]
+        value = self.sort_value(item, self.sort_key)
+        if self.sort_key in self.numeric:
+            return (value or 0, iid)
+        return (fold_text(str(value or "")), iid)
+
+    def apply(self, query):
+        self._pending = None
+        self.query = query
+        terms = TOKEN_RE.findall(fold_text(query))
+        matches = [iid for iid, item in self.items.items() if not terms or text_matches(self.search_text(item), terms)]
+        matches.sort(key=self._sort_key, reverse=self.sort_reverse)
+        self.render(matches)
+        if self.status_var is not None:
+            self.status_var.set(f"{len(matches)} de {len(self.items)} {self.noun}")
+        return matches
+
+    def render(self, iids):
+        wanted = set(iids)
+        removed = [iid for iid in self.shown if iid not in wanted]
+        if removed:
+            self.tree.delete(*removed)
+            for iid in removed:
+                self._values.pop(iid, None)
+        shown = set(self.shown) - set(removed)
+        for pos, iid in enumerate(iids):
+            values = self.row_values(self.items[iid])
+            if iid not in shown:
+                self.tree.insert("", pos, iid=iid, values=values)
+            else:
+                # item relido ou com outro dono: só a linha que mudou é reescrita
+                if self._values.get(iid) != values:
+                    self.tree.item(iid, values=values)
+                if self.tree.index(iid) != pos:
+                    self.tree.move(iid, "", pos)
+            self._values[iid] = values
+        self.shown = list(iids)
+
+    def selected(self):
+        return [self.items[iid] for iid in self.tree.selection() if iid in self.items]
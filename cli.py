@@ -0,0 +1,380 @@
+# Linha de comando do instalador ETS2 (sem janela), para instalações em lote:
+#   python cli.py list
+#   python cli.py install "Nome do mod" "Outro mod" --parallel 3 --profiles replace
+#   python cli.py raw "Nome do mod" --dest D:\pacotes
+#   python cli.py preview "Nome do mod"   (pastas, contagens e tamanhos, sem instalar)
+#   python cli.py rollback                (desfaz a última instalação)
+#   python cli.py verify ["Nome do mod"]  (relê mod/ e compara com os manifestos)
+#   python cli.py installed               (pacotes instalados, arquivos e tamanho)
+#   python cli.py profiles [busca] [--sort saved] (perfis: nome, empresa, XP e último save)
+#   python cli.py mods [--conflicts]      (conteúdo dos .scs de mod/: manifest, veículos e conflitos)
+#   python cli.py uninstall "Nome do mod" (apaga só os arquivos do pacote; desfazível com rollback)
+#   python cli.py dedupe [--dry-run]     (troca .scs idênticos em mod/ por hardlinks)
+#   python cli.py catalog-entry pacote.zip (size/sha256/files para publicar no mods.json)
+#   python cli.py log-report              (vazão por etapa: catálogo, download, detect, extract, copy)
+# O resultado sai em JSON no stdout; o progresso vai para o stderr.
+# Código de saída: 0 = tudo certo, 1 = algum item falhou, 2 = erro de uso/catálogo.
+# Ctrl+C em install/raw interrompe os downloads (o parcial fica para retomar) e desfaz a
+# instalação em andamento; os itens saem com "cancelled": true.
+
+import argparse
+import json
+import os
+import signal
+import sys
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import engine
+from catalog import TOKEN_RE, fold_text
+from profiles import format_save_time, profile_matches
+from scs import conflicts_by_mod, describe_mod
+
+
+class CliError(Exception):
+    pass
+
+
+def load_catalog(source=None, offline=False):
+    """Lista de expansões: --catalog (arquivo ou URL), senão a remota com a cópia salva como reserva."""
+    if source:
+        if source.startswith(("http://", "https://")):
+            import requests
+            response = requests.get(source, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+        else:
+            with open(source, "r", encoding="utf-8") as f:
+                data = json.load(f)
+    else:
+        data = None
+        if not offline:
+            try:
+                data = engine.fetch_catalog()
+            except Exception as e:
+                engine.write_log(f"CLI: erro ao carregar mods.json: {e}")
+                print(f"aviso: lista remota indisponível ({e}); usando a cópia salva", file=sys.stderr)
+        if data is None:
+            data = engine.load_cached_catalog()
+        if data is None:
+            raise CliError("nenhuma lista de expansões disponível (sem rede e sem cópia salva)")
+    if not isinstance(data, list):
+        raise CliError("mods.json inválido (esperada uma lista de expansões)")
+    return data
+
+
+def find_mods(mods, names):
+    """Casa cada nome pedido com o catálogo: igual (sem acento/maiúsculas) ou trecho único."""
+    found = []
+    for name in names:
+        wanted = fold_text(name).strip()
+        exact = [m for m in mods if fold_text(m.get("name", "")).strip() == wanted]
+        matches = exact or [m for m in mods if wanted in fold_text(m.get("name", ""))]
+        if not matches:
+            raise CliError(f"expansão não encontrada: {name}")
+        if len(matches) > 1:
+            options = ", ".join(m["name"] for m in matches[:10])
+            raise CliError(f"'{name}' é ambíguo ({len(matches)} expansões): {options}")
+        found.append(matches[0])
+    return found
+
+
+def stderr_progress(prefix):
+    def update(done, total, rate, eta):
+        print(f"{prefix}: {engine.describe_download_progress(done, total, rate, eta)}", file=sys.stderr, flush=True)
+    return update
+
+
+@contextmanager
+def cancel_on_interrupt():
+    """CancelToken acionado pelo Ctrl+C enquanto o bloco roda (um segundo Ctrl+C encerra na hora)."""
+    token = engine.CancelToken()
+
+    def handler(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        print("cancelando... (Ctrl+C de novo para sair na hora)", file=sys.stderr, flush=True)
+        token.cancel()
+
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        yield token
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def cmd_list(args, mods):
+    return [{"name": m.get("name"), "description": m.get("description", "")} for m in mods]
+
+
+def cmd_install(args, mods):
+    items = [{"mod": mod, "state": "queued", "progress": ""} for mod in find_mods(mods, args.names)]
+    limiter = engine.BandwidthLimiter(int(args.limit_mb * 1024 * 1024))
+
+    def on_state(item):
+        # progresso de download chega várias vezes por segundo; só mudanças de estado vão para o stderr
+        if item["state"] != item.get("_printed"):
+            item["_printed"] = item["state"]
+            print(f"{item['mod']['name']}: {item['state']}", file=sys.stderr, flush=True)
+
+    def notify(kind, title, text):
+        print(f"{title}: {text}", file=sys.stderr, flush=True)
+
+    overrides = {}
+    for spec in args.profile_policy:
+        name, sep, policy = spec.rpartition("=")
+        if not sep or policy not in engine.PROFILE_POLICIES:
+            raise CliError(f"--profile-policy espera PERFIL=keep|replace|merge, recebeu {spec!r}")
+        overrides[name] = policy
+
+    def ask_overwrite(conflicts):
+        return {name: overrides.get(name, args.profiles) for name in conflicts}
+
+    with cancel_on_interrupt() as cancel:
+        elapsed = engine.run_install_pipeline(items, args.parallel, limiter, on_state=on_state, cancel=cancel,
+                                              notify=notify, ask_overwrite=ask_overwrite,
+                                              extract_workers=args.extract_workers)
+    engine.write_log(f"CLI: instalação de {len(items)} item(s) em {elapsed:.0f}s.")
+    results = []
+    for item in items:
+        default = (False, "Cancelado", {"cancelled": True}) if cancel.cancelled else (False, "não executado", {})
+        success, info, details = item.get("result", default)
+        results.append({"name": item["mod"]["name"], "success": success, "info": info, "details": details})
+    return results
+
+
+def cmd_raw(args, mods):
+    dest = args.dest or engine.DOWNLOADS_FOLDER
+    os.makedirs(dest, exist_ok=True)
+
+    def download(mod):
+        out_path = engine.reserve_raw_path(mod, dest)
+        try:
+            engine.download_raw(mod, out_path, progress=stderr_progress(mod["name"]), cancel=cancel)
+            return {"name": mod["name"], "success": True, "info": out_path, "details": {"saved_as": out_path}}
+        except engine.Cancelled:
+            return {"name": mod["name"], "success": False, "info": "Cancelado", "details": {"cancelled": True}}
+        except Exception as e:
+            engine.write_log(f"CLI: erro no RAW para {mod['name']}: {e}")
+            return {"name": mod["name"], "success": False, "info": f"Erro: {e}", "details": {"error": str(e)}}
+
+    selected = find_mods(mods, args.names)
+    with cancel_on_interrupt() as cancel, ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        return list(pool.map(download, selected))
+
+
+def cmd_preview(args, mods):
+    results = []
+    for mod in find_mods(mods, args.names):
+        try:
+            layout = engine.preview_archive(mod["drive_link"], progress=stderr_progress(mod["name"]))
+            results.append({"name": mod["name"], "success": True, "info": engine.describe_layout(layout), "details": layout})
+        except Exception as e:
+            engine.write_log(f"CLI: erro na pré-visualização de {mod['name']}: {e}")
+            results.append({"name": mod["name"], "success": False, "info": f"Erro: {e}", "details": {"error": str(e)}})
+    return results
+
+
+def cmd_rollback(args, mods):
+    with engine.INSTALL_LOCK:
+        journal = engine.rollback_last()
+    if journal is None:
+        raise CliError("nenhuma instalação para desfazer")
+    return [{"name": journal["package"], "success": True, "info": f"{len(journal['ops'])} itens restaurados",
+             "details": {"transaction": journal["id"], "created": journal["created"]}}]
+
+
+def installed_packages():
+    return [{"name": name} for name in sorted(engine.installed_index()["packages"])]
+
+
+def cmd_installed(args, mods):
+    packages = engine.installed_index()["packages"]
+    return [{"name": name, "success": True,
+             "info": (f"versão {p['version']}, " if p["version"] else "") + f"{p['files']} arquivos, {engine.format_bytes(p['bytes'])}",
+             "details": {k: p[k] for k in ("files", "bytes", "updated", "version", "top_level")}}
+            for name, p in sorted(packages.items())]
+
+
+def cmd_profiles(args, mods):
+    terms = TOKEN_RE.findall(fold_text(" ".join(args.search)))
+    profiles = [p for p in engine.list_profiles() if profile_matches(p, terms)]
+    if args.sort != "name":
+        profiles.sort(key=lambda p: p[args.sort] or 0, reverse=True)
+    results = []
+    for p in profiles:
+        info = ", ".join(part for part in (
+            p["company"], f"{p['experience']} XP" if p["experience"] is not None else "",
+            f"último save {format_save_time(p['saved'])}" if p["saved"] else "",
+            f"não lido: {p['error']}" if p["error"] else "") if part)
+        results.append({"name": p["name"], "success": True, "info": info,
+                        "details": {k: v for k, v in p.items() if k != "stamp"}})
+    return results
+
+
+def cmd_mods(args, mods):
+    result = engine.inspect_mods()
+    overlaps = conflicts_by_mod(result["conflicts"])
+    results = []
+    for mod in result["mods"]:
+        if args.conflicts and mod["file"] not in overlaps:
+            continue
+        details = {k: v for k, v in mod.items() if k not in ("hashes", "names", "stamp")}
+        details["conflicts"] = overlaps.get(mod["file"], {})
+        results.append({"name": mod["file"], "success": not mod["error"],
+                        "info": " | ".join(describe_mod(mod, result["conflicts"])), "details": details})
+    return results
+
+
+def cmd_uninstall(args, mods):
+    results = []
+    for package in find_mods(installed_packages(), args.names):
+        with engine.INSTALL_LOCK:
+            result = engine.uninstall_package(package["name"])
+        info = f"{len(result['removed'])} arquivos removidos"
+        if result["shared"] or result["modified"]:
+            info += f"; mantidos {len(result['shared'])} compartilhados e {len(result['modified'])} alterados"
+        results.append({"name": package["name"], "success": True, "info": info, "details": result})
+    return results
+
+
+def cmd_verify(args, mods):
+    installed = installed_packages()
+    packages = [m["name"] for m in find_mods(installed, args.names)] if args.names else None
+
+    def progress(done, total):
+        print(f"verificando: {done * 100 // total if total else 100}%", file=sys.stderr, flush=True)
+
+    result = engine.verify_installed(packages, workers=args.workers, progress=progress)
+    print(f"{result['checked']} arquivos ({engine.format_bytes(result['bytes'])}) em {result['elapsed']:.1f}s",
+          file=sys.stderr)
+    results = []
+    for name in packages or [m["name"] for m in installed]:
+        bad = result["packages"].get(name, [])
+        missing = [k for k in bad if k in result["missing"]]
+        corrupt = [k for k in bad if k in result["corrupt"]]
+        info = "ok" if not bad else f"{len(missing)} ausentes, {len(corrupt)} corrompidos"
+        results.append({"name": name, "success": not bad, "info": info,
+                        "details": {"missing": missing, "corrupt": corrupt}})
+    return results
+
+
+def cmd_dedupe(args, mods):
+    def progress(done, total):
+        print(f"lendo arquivos: {done * 100 // total if total else 100}%", file=sys.stderr, flush=True)
+
+    with engine.INSTALL_LOCK, cancel_on_interrupt() as cancel:
+        result = engine.dedupe_mods(dry_run=args.dry_run, workers=args.workers, progress=progress, cancel=cancel)
+    verb = "economizaria" if args.dry_run else "economizou"
+    info = (f"{result['linked']} arquivos em hardlink, {verb} {engine.format_bytes(result['bytes_saved'])}; "
+            f"total poupado por arquivos iguais: {engine.format_bytes(result['store']['saved'])}")
+    return [{"name": "mod/", "success": True, "info": info, "details": result}]
+
+
+def cmd_catalog_entry(args, mods):
+    results = []
+    for path in args.archives:
+        integrity = engine.integrity_for_archive(path)
+        results.append({"name": os.path.basename(path), "success": True,
+                        "info": f"{len(integrity['files'])} arquivos", "details": integrity})
+    return results
+
+
+def cmd_log_report(args, mods):
+    results = []
+    for stage, s in engine.log_report().items():
+        rate = f" a {s['mb_s']} MB/s" if s["mb_s"] else ""
+        results.append({"name": stage, "success": True, "details": s,
+                        "info": f"{s['count']} vezes em {s['runs']} execuções ({s['failed']} com erro), "
+                                f"{engine.format_bytes(s['bytes'])} em {s['seconds']:.1f}s{rate}"})
+    return results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Instalador ETS2 sem janela (saída em JSON).")
+    parser.add_argument("--catalog", help="mods.json local ou URL (padrão: lista do GitHub)")
+    parser.add_argument("--offline", action="store_true", help="não consultar a lista remota; usar a cópia salva")
+    parser.add_argument("--documents-dir", help="pasta Documentos (logs, cache, manifestos e ETS2 padrão)")
+    parser.add_argument("--ets2-dir", help="pasta do Euro Truck Simulator 2 (contém mod/ e profiles/)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="listar as expansões do catálogo")
+
+    install = sub.add_parser("install", help="baixar e instalar expansões pelo nome")
+    install.add_argument("names", nargs="+")
+    install.add_argument("--parallel", type=int, default=2, help="downloads simultâneos (padrão: 2)")
+    install.add_argument("--limit-mb", type=float, default=0, help="limite de banda em MB/s (0 = sem limite)")
+    install.add_argument("--extract-workers", type=int, default=engine.EXTRACT_WORKERS,
+                         help="arquivos gravados ao mesmo tempo na instalação")
+    install.add_argument("--profiles", choices=engine.PROFILE_POLICIES, default="keep",
+                         help="perfis que já existem: keep = preservar (padrão), replace = substituir, "
+                              "merge = só arquivos novos/alterados, sem apagar e sem voltar saves mais novos")
+    install.add_argument("--profile-policy", action="append", default=[], metavar="PERFIL=POLÍTICA",
+                         help="política para um perfil específico (pode repetir); vale sobre --profiles")
+
+    raw = sub.add_parser("raw", help="baixar o ZIP bruto, sem instalar")
+    raw.add_argument("names", nargs="+")
+    raw.add_argument("--dest", help="pasta de destino (padrão: Downloads)")
+    raw.add_argument("--parallel", type=int, default=2, help="downloads simultâneos (padrão: 2)")
+
+    preview = sub.add_parser("preview", help="mostrar o conteúdo do pacote sem instalar")
+    preview.add_argument("names", nargs="+")
+
+    sub.add_parser("rollback", help="desfazer a última instalação")
+
+    sub.add_parser("installed", help="listar os pacotes instalados pelo instalador")
+
+    profiles = sub.add_parser("profiles", help="listar os perfis do jogo (profiles/ e steam_profiles/)")
+    profiles.add_argument("search", nargs="*", help="palavras do nome, empresa ou pasta")
+    profiles.add_argument("--sort", choices=("name", "saved", "experience"), default="name",
+                          help="ordem (saved e experience: maiores primeiro)")
+
+    mods_cmd = sub.add_parser("mods", help="ler os .scs de mod/ (manifest.sii, veículos, arquivos sobrescritos)")
+    mods_cmd.add_argument("--conflicts", action="store_true", help="só os mods que sobrescrevem arquivos de outro")
+
+    uninstall = sub.add_parser("uninstall", help="remover os arquivos instalados por um pacote")
+    uninstall.add_argument("names", nargs="+")
+
+    verify = sub.add_parser("verify", help="conferir os arquivos instalados em mod/ (tamanho + sha256)")
+    verify.add_argument("names", nargs="*", help="pacotes instalados (padrão: todos)")
+    verify.add_argument("--workers", type=int, default=engine.VERIFY_WORKERS, help="arquivos lidos ao mesmo tempo")
+
+    dedupe = sub.add_parser("dedupe", help="guardar .scs idênticos de mod/ uma vez só (hardlinks)")
+    dedupe.add_argument("--dry-run", action="store_true", help="só calcular quanto seria economizado")
+    dedupe.add_argument("--workers", type=int, default=engine.VERIFY_WORKERS, help="arquivos lidos ao mesmo tempo")
+
+    entry = sub.add_parser("catalog-entry", help="gerar size/sha256/files de um ZIP para o mods.json")
+    entry.add_argument("archives", nargs="+")
+
+    sub.add_parser("log-report", help="resumir a vazão de cada etapa registrada nos logs")
+    return parser
+
+
+COMMANDS = {"list": cmd_list, "install": cmd_install, "raw": cmd_raw, "preview": cmd_preview,
+            "rollback": cmd_rollback, "verify": cmd_verify, "catalog-entry": cmd_catalog_entry,
+            "installed": cmd_installed, "profiles": cmd_profiles, "mods": cmd_mods, "uninstall": cmd_uninstall, "dedupe": cmd_dedupe, "log-report": cmd_log_report}
+LOCAL_COMMANDS = ("rollback", "verify", "catalog-entry", "installed", "profiles", "mods", "uninstall", "dedupe",
+                  "log-report")  # não precisam do catálogo
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.documents_dir or args.ets2_dir:
+        engine.configure_paths(documents_folder=args.documents_dir, ets2_folder=args.ets2_dir)
+    engine.ensure_folders()
+    engine.write_log(f"CLI iniciada: {args.command}")
+    engine.recover_transactions()
+    try:
+        mods = [] if args.command in LOCAL_COMMANDS else load_catalog(args.catalog, args.offline)
+        results = COMMANDS[args.command](args, mods)
+    except (CliError, OSError, ValueError) as e:
+        print(json.dumps({"command": args.command, "error": str(e)}, ensure_ascii=False))
+        return 2
+    print(json.dumps({"command": args.command, "results": results}, ensure_ascii=False, indent=2, default=str))
+    if args.command == "list":
+        return 0
+    return 0 if all(r["success"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3215 @@
+# Motor do instalador ETS2 (sem interface gráfica): catálogo, download, cache e
+# instalação direto do ZIP. Usado pela janela Tk (min.py) e pela linha de comando
+# (cli.py). Importar este módulo não cria pastas nem abre janelas: quem for gravar
+# algo chama ensure_folders() antes.
+
+import os
+import json
+import threading
+import queue
+import zipfile
+import shutil
+import time
+import sys
+import re
+import hashlib
+import zlib
+import stat
+import struct
+import atexit
+import errno
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from datetime import datetime
+from importlib.util import find_spec
+
+from profiles import ProfileIndex
+from scs import ScsIndex, find_conflicts
+
+# gdown (e requests/BeautifulSoup que ele carrega) só é importado no primeiro
+# download; na abertura basta saber se está instalado.
+HAVE_GDOWN = find_spec("gdown") is not None
+
+# ---------- Configs e pastas ----------
+def get_documents_folder():
+    if sys.platform.startswith("win"):
+        try:
+            import ctypes
+            _SHGetKnownFolderPath = ctypes.windll.shell32.SHGetKnownFolderPath
+            _SHGetKnownFolderPath.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_void_p, ctypes.POINTER(ctypes.c_wchar_p)]
+            _SHGetKnownFolderPath.restype = ctypes.c_long
+            buf = ctypes.c_wchar_p()
+            guid = ctypes.create_unicode_buffer("{FDD39AD0-238F-46AF-ADB4-6C85480369C7}")
+            res = _SHGetKnownFolderPath(ctypes.byref(guid), 0, 0, ctypes.byref(buf))
+            if res == 0 and buf.value:
+                return buf.value
+        except Exception:
+            pass
+    home = os.path.expanduser("~")
+    for candidate in ("Documents", "Documentos", "Meus Documentos"):
+        path = os.path.join(home, candidate)
+        if os.path.isdir(path):
+            return path
+    return os.path.join(home, "Documents")
+
+# Downloads folder (para "Baixar RAW")
+def get_downloads_folder():
+    home = os.path.expanduser("~")
+    # Windows generally has "Downloads", mac/linux usually also
+    for candidate in ("Downloads", "Download"):
+        d = os.path.join(home, candidate)
+        if os.path.isdir(d):
+            return d
+    # fallback para home
+    return home
+
+def configure_paths(documents_folder=None, ets2_folder=None, downloads_folder=None):
+    """Define todas as pastas usadas pelo motor (padrão: Documentos do usuário).
+
+    A linha de comando usa isto para apontar para outra instalação do jogo ou para
+    pastas de teste.
+    """
+    global DOCUMENTS_FOLDER, EUROTRUCK_PATH, MODS_FOLDER, PROFILES_FOLDER, DOWNLOADS_FOLDER
+    global LOG_FOLDER, LOG_FILE, CACHE_FOLDER, PARTIAL_FOLDER, ARCHIVE_CACHE_FOLDER, CACHE_INDEX_FILE
+    global MANIFEST_FOLDER, CATALOG_CACHE_FILE, CATALOG_META_FILE, TRANSACTIONS_FOLDER, STORE_FOLDER
+    global STEAM_PROFILES_FOLDER, PROFILE_INDEX_FILE, SCS_INDEX_FILE
+    DOCUMENTS_FOLDER = documents_folder or get_documents_folder()
+    EUROTRUCK_PATH = ets2_folder or os.path.join(DOCUMENTS_FOLDER, "Euro Truck Simulator 2")
+    MODS_FOLDER = os.path.join(EUROTRUCK_PATH, "mod")
+    PROFILES_FOLDER = os.path.join(EUROTRUCK_PATH, "profiles")
+    # perfis sincronizados pela Steam Cloud (o instalador só lê, nunca grava aqui)
+    STEAM_PROFILES_FOLDER = os.path.join(EUROTRUCK_PATH, "steam_profiles")
+    DOWNLOADS_FOLDER = downloads_folder or get_downloads_folder()
+    LOG_FOLDER = os.path.join(DOCUMENTS_FOLDER, "ets2_installer_logs")
+    if "LOG_FILE" in globals():
+        flush_log()  # o que já foi registrado vai para a pasta anterior
+    LOG_FILE = os.path.join(LOG_FOLDER, "installer.jsonl")
+    # downloads parciais (.part) ficam no cache para poderem ser retomados depois
+    CACHE_FOLDER = os.path.join(DOCUMENTS_FOLDER, "ets2_installer_cache")
+    PARTIAL_FOLDER = os.path.join(CACHE_FOLDER, "partial")
+    ARCHIVE_CACHE_FOLDER = os.path.join(CACHE_FOLDER, "archives")
+    CACHE_INDEX_FILE = os.path.join(CACHE_FOLDER, "index.json")
+    MANIFEST_FOLDER = os.path.join(DOCUMENTS_FOLDER, "ets2_installer_manifests")
+    CATALOG_CACHE_FILE = os.path.join(CACHE_FOLDER, "mods.json")
+    CATALOG_META_FILE = os.path.join(CACHE_FOLDER, "mods.meta.json")
+    PROFILE_INDEX_FILE = os.path.join(CACHE_FOLDER, "profiles.json")
+    SCS_INDEX_FILE = os.path.join(CACHE_FOLDER, "scs.json")
+    # preparo/backup das instalações: no mesmo volume de mod/ e profiles/ para o commit ser só renomear
+    TRANSACTIONS_FOLDER = os.path.join(EUROTRUCK_PATH, ".ets2_installer", "transactions")
+    # cópia única dos .scs iguais entre pacotes; hardlink só funciona no mesmo volume de mod/
+    STORE_FOLDER = os.path.join(EUROTRUCK_PATH, ".ets2_installer", "store")
+
+def ensure_folders():
+    for folder in (MODS_FOLDER, PROFILES_FOLDER, LOG_FOLDER, PARTIAL_FOLDER, ARCHIVE_CACHE_FOLDER, MANIFEST_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+
+configure_paths()
+
+# ---------- log ----------
+# Uma linha JSON por evento em LOG_FOLDER/installer.jsonl: {"ts", "run", "msg"} e, nos
+# trechos medidos com log_span, também {"span", "seconds", "bytes", "ok", ...}.
+# write_log só enfileira; uma thread grava em lote a cada LOG_FLUSH_INTERVAL (ou ao
+# juntar LOG_BUFFER_RECORDS), abrindo o arquivo uma vez por lote. Passando de
+# LOG_MAX_BYTES, o arquivo vira installer.1.jsonl (os anteriores sobem um número) e
+# ficam só LOG_KEEP arquivos antigos. log_report resume os trechos de todos eles.
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_KEEP = 5
+LOG_FLUSH_INTERVAL = 1.0
+LOG_BUFFER_RECORDS = 1000
+RUN_ID = f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"  # separa as execuções no relatório
+
+_log_buffer = []
+_log_lock = threading.Lock()       # buffer
+_log_file_lock = threading.Lock()  # uma gravação (e rotação) por vez
+_log_wakeup = threading.Event()
+_log_thread = None
+
+def write_log(line: str, **fields):
+    record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "run": RUN_ID, "msg": line}
+    record.update(fields)
+    global _log_thread
+    with _log_lock:
+        _log_buffer.append(record)
+        full = len(_log_buffer) >= LOG_BUFFER_RECORDS
+        if _log_thread is None:
+            _log_thread = threading.Thread(target=_log_writer, name="ets2-log", daemon=True)
+            _log_thread.start()
+            atexit.register(flush_log)
+    if full:
+        _log_wakeup.set()
+
+def _log_writer():
+    _prune_legacy_logs()
+    while True:
+        _log_wakeup.wait(LOG_FLUSH_INTERVAL)
+        _log_wakeup.clear()
+        flush_log()
+
+def flush_log():
+    """Grava o que está no buffer (a thread do log chama sozinha; também na saída do programa)."""
+    with _log_file_lock:
+        with _log_lock:
+            records = _log_buffer[:]
+            del _log_buffer[:]
+        if not records:
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        try:
+            _rotate_log(len(data.encode("utf-8")))
+            with open(LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(data)
+        except Exception:
+            pass
+
+def log_files():
+    """Arquivos de log atuais, do mais antigo para o mais novo."""
+    base = LOG_FILE[:-len(".jsonl")]
+    rotated = [f"{base}.{i}.jsonl" for i in range(LOG_KEEP, 0, -1)]
+    return [p for p in rotated + [LOG_FILE] if os.path.exists(p)]
+
+def _rotate_log(incoming):
+    try:
+        size = os.path.getsize(LOG_FILE)
+    except OSError:
+        return
+    if size + incoming <= LOG_MAX_BYTES:
+        return
+    base = LOG_FILE[:-len(".jsonl")]
+    for i in range(LOG_KEEP - 1, 0, -1):
+        if os.path.exists(f"{base}.{i}.jsonl"):
+            os.replace(f"{base}.{i}.jsonl", f"{base}.{i + 1}.jsonl")
+    os.replace(LOG_FILE, f"{base}.1.jsonl")
+
+def _prune_legacy_logs():
+    # versões anteriores criavam log_AAAAMMDD_HHMMSS.txt a cada abertura; ficam só os LOG_KEEP mais novos
+    try:
+        legacy = sorted(n for n in os.listdir(LOG_FOLDER) if n.startswith("log_") and n.endswith(".txt"))
+    except OSError:
+        return
+    for name in legacy[:-LOG_KEEP]:
+        try:
+            os.remove(os.path.join(LOG_FOLDER, name))
+        except OSError:
+            pass
+
+@contextmanager
+def log_span(stage, nbytes=0, **fields):
+    """Mede o bloco e registra {"span": stage, "seconds", "bytes", "ok"} + fields.
+
+    O bloco recebe o dict do registro e pode acertar "bytes" (ou outros campos)
+    quando souber o total. Exceções passam adiante com "ok": false e "error".
+    """
+    span = dict(fields, bytes=nbytes)
+    started = time.monotonic()
+    try:
+        yield span
+        span.setdefault("ok", True)
+    except BaseException as e:
+        span["ok"] = False
+        span["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        span["seconds"] = round(seconds, 4)
+        if span["bytes"] and seconds > 0:
+            span["mb_s"] = round(span["bytes"] / seconds / 1e6, 2)
+        write_log(f"{stage}: {format_bytes(span['bytes'])} em {seconds:.2f}s" + ("" if span["ok"] else f" ({span['error']})"),
+                  span=stage, **span)
+
+def log_report(paths=None):
+    """Vazão por etapa em todos os logs: {etapa: {count, failed, runs, bytes, seconds, mb_s, p50_mb_s, max_mb_s}}."""
+    flush_log()
+    stages = {}
+    for path in paths or log_files():
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except OSError:
+            continue
+        with f:
+            for line in f:
+                if '"span"' not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                stage = stages.setdefault(record["span"], {"count": 0, "failed": 0, "runs": set(), "bytes": 0,
+                                                           "seconds": 0.0, "rates": []})
+                stage["count"] += 1
+                stage["runs"].add(record.get("run"))
+                if not record.get("ok", True):
+                    stage["failed"] += 1
+                    continue
+                stage["bytes"] += record.get("bytes") or 0
+                stage["seconds"] += record.get("seconds") or 0
+                if record.get("mb_s"):
+                    stage["rates"].append(record["mb_s"])
+    report = {}
+    for name, stage in sorted(stages.items()):
+        rates = sorted(stage.pop("rates"))
+        stage["runs"] = len(stage["runs"])
+        stage["seconds"] = round(stage["seconds"], 3)
+        # etapas sem bytes (copy: só renomeações) não têm vazão
+        stage["mb_s"] = round(stage["bytes"] / stage["seconds"] / 1e6, 2) if stage["seconds"] and stage["bytes"] else None
+        stage["p50_mb_s"] = rates[len(rates) // 2] if rates else None
+        stage["max_mb_s"] = rates[-1] if rates else None
+        report[name] = stage
+    return report
+
+JSON_URL = "https://raw.githubusercontent.com/DIY-Steering-Wheel/ETS__mod_hub/refs/heads/main/mods.json"
+
+# ---------- util gdown ----------
+def require_gdown_or_fail():
+    if not HAVE_GDOWN:
+        msg = "O 'gdown' não está instalado neste sistema. Instale com: pip install gdown"
+        write_log("gdown ausente: downloads bloqueados.")
+        raise RuntimeError(msg)
+
+def robust_download_with_gdown(url, out_path):
+    require_gdown_or_fail()
+    import gdown
+    try:
+        result = gdown.download(url, out_path, quiet=True, fuzzy=True)
+        if result is None and os.path.exists(out_path) and os.path.getsize(out_path) > 0:
+            return True
+        if result is not None and os.path.exists(result) and os.path.getsize(result) > 0:
+            if os.path.abspath(result) != os.path.abspath(out_path):
+                try:
+                    shutil.move(result, out_path)
+                except Exception:
+                    write_log(f"gdown salvou em {result}, não foi possível mover para {out_path}.")
+            return True
+        raise RuntimeError("gdown não retornou arquivo válido (arquivo ausente ou vazio).")
+    except Exception as e:
+        write_log(f"robust_download_with_gdown falhou para URL {url}: {e}")
+        raise
+
+# ---------- download em partes (retomável) ----------
+# O arquivo é gravado em PARTIAL_FOLDER/<id>.part, que sobrevive a falhas e a
+# reinícios do app; a próxima tentativa continua com "Range: bytes=N-".
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES = 6          # falhas seguidas sem progresso antes de desistir
+DOWNLOAD_BACKOFF = 2.0        # segundos; dobra a cada falha (máx. 60)
+PROGRESS_INTERVAL = 0.25      # intervalo mínimo entre avisos de progresso
+DOWNLOAD_READ_SIZE = 64 * 1024  # leitura da rede; pequeno para o cancelamento ser checado com frequência
+DURABLE_SYNC_BYTES = 64 * 1024 * 1024  # durable: fsync + ponto de retomada a cada tanto gravado
+
+class DriveLinkError(RuntimeError):
+    pass
+
+class IncompleteDownload(IOError):
+    pass
+
+class Cancelled(Exception):
+    pass
+
+class IntegrityError(IOError):
+    """Tamanho ou sha256 diferente do publicado no catálogo."""
+
+class CancelToken:
+    """Pedido de cancelamento compartilhado entre quem pede (janela, Ctrl+C) e as threads.
+
+    Os laços de download e de gravação chamam check() a cada bloco; on_cancel registra
+    ações imediatas (interromper a conexão em espera) para valer em menos de 1 s.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled("Operação cancelada")
+
+    def wait(self, timeout):
+        """Como time.sleep(timeout), mas acorda no cancelamento; True se cancelado."""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """Registra callback para o cancelamento; devolve a função que o remove."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+def _abort_response(r):
+    """Interrompe, de outra thread, uma resposta que está esperando dados."""
+    import socket
+    try:
+        # shutdown acorda o recv bloqueado na hora (a leitura termina em EOF/erro na
+        # própria thread); close() sozinho espera o timeout de leitura e, fechado no
+        # meio de um read, quebra o http.client. Só serve de reserva.
+        r.raw._fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+        return
+    except Exception:
+        pass
+    try:
+        r.close()
+    except Exception:
+        pass
+
+def drive_file_id(url):
+    m = re.search(r"(?:[?&]id=|/d/)([\w-]{10,})", url)
+    return m.group(1) if m else None
+
+def cache_key_for(url):
+    return drive_file_id(url) or hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+def partial_path_for(url):
+    return os.path.join(PARTIAL_FOLDER, cache_key_for(url) + ".part")
+
+def resolve_download_url(session, url):
+    """Retorna a URL direta do arquivo, passando pela página de confirmação do Drive (arquivos grandes)."""
+    fid = drive_file_id(url)
+    if not fid or "google.com" not in url:
+        return url
+    direct = f"https://drive.usercontent.google.com/download?id={fid}&export=download"
+    with session.get(direct, stream=True, timeout=(15, 60)) as r:
+        r.raise_for_status()
+        if "text/html" not in r.headers.get("Content-Type", ""):
+            return direct
+        html = r.text
+    form = re.search(r'<form[^>]*id="download-form"[^>]*>', html)
+    if form:
+        action = re.search(r'action="([^"]+)"', form.group(0))
+        params = dict(re.findall(r'<input type="hidden" name="([^"]+)" value="([^"]*)"', html))
+        if action and params:
+            return action.group(1).replace("&amp;", "&") + "?" + urlencode(params)
+    raise DriveLinkError("Drive retornou uma página HTML sem link de download (permissão ou cota excedida?)")
+
+def _parse_content_range(value):
+    # "bytes 100-199/1000" ou "bytes */1000"
+    m = re.match(r"bytes (?:(\d+)-\d+|\*)/(\d+|\*)", value or "")
+    if not m:
+        return None, None
+    start = int(m.group(1)) if m.group(1) else None
+    total = int(m.group(2)) if m.group(2) != "*" else None
+    return start, total
+
+def _load_part_meta(part):
+    try:
+        with open(part + ".json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_part_meta(part, meta):
+    try:
+        with open(part + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    except Exception:
+        pass
+
+def _discard_part(part):
+    for p in (part, part + ".json"):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+class BandwidthLimiter:
+    """Balde de fichas compartilhado pelos downloads simultâneos (bytes_per_sec <= 0 = sem limite)."""
+    def __init__(self, bytes_per_sec=0):
+        self.rate = bytes_per_sec
+        self.allowance = bytes_per_sec
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, n):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+            self.last = now
+            self.allowance -= n
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+# um .part só pode ser escrito por um download de cada vez (itens com o mesmo link)
+_named_locks = {}
+_named_locks_guard = threading.Lock()
+
+def _named_lock(name):
+    with _named_locks_guard:
+        return _named_locks.setdefault(name, threading.Lock())
+
+def _hash_prefix(path, length):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while length > 0:
+            block = f.read(min(length, DOWNLOAD_CHUNK_SIZE))
+            if not block:
+                break
+            h.update(block)
+            length -= len(block)
+    return h
+
+def _preallocate(f, size):
+    """Reserva o tamanho final do arquivo de uma vez (menos fragmentação; disco cheio falha já no início)."""
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise
+            # sistema de arquivos sem fallocate: o truncate abaixo ainda fixa o tamanho
+    f.truncate(size)
+
+def _fsync_dir(path):
+    # a renomeação só fica gravada com o fsync da pasta (POSIX; no Windows não se abre pasta)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _move_into_place(src, dest):
+    # mesma pasta/volume: renomeação (substitui dest, inclusive um nome reservado vazio)
+    try:
+        os.replace(src, dest)
+    except OSError:
+        shutil.move(src, dest)
+
+def chunked_download(url, out_path, progress=None, part_path=None, limiter=None, cancel=None, expected_size=None,
+                     durable=False):
+    """Baixa url para out_path em blocos, retomando o .part com Range/If-Range.
+
+    progress(done, total, bytes_per_sec, eta_seconds) é chamado no máximo a cada
+    PROGRESS_INTERVAL segundos (total/eta podem ser None). Funciona com qualquer
+    servidor HTTP, não só o Drive. Cancelado (cancel), lança Cancelled e mantém o
+    .part para retomar depois. Retorna o sha256 (hex), calculado enquanto os bytes
+    chegam; com expected_size, um tamanho diferente no servidor lança IntegrityError
+    antes de baixar o corpo.
+
+    durable: o .part nasce com o tamanho final (pré-alocado), recebe fsync a cada
+    DURABLE_SYNC_BYTES (o ponto de retomada fica no .json, já que o tamanho do .part
+    não diz mais quanto chegou) e outro fsync antes de virar out_path.
+    """
+    part = part_path or partial_path_for(url)
+    import requests
+    # a sessão (e a conexão do pool) fecha ao fim do download, com sucesso ou não
+    with _named_lock(part), requests.Session() as session:
+        return _chunked_download(url, out_path, part, session, progress, limiter, cancel, expected_size, durable)
+
+def _chunked_download(url, out_path, part, session, progress, limiter, cancel, expected_size, durable=False):
+    import requests
+    os.makedirs(os.path.dirname(part), exist_ok=True)
+    meta = _load_part_meta(part)
+    target = None
+    failures = 0
+    forget_abort = None
+    hasher = None
+    hashed = 0  # bytes do .part já incluídos em hasher
+    while True:
+        if cancel is not None:
+            cancel.check()
+        try:
+            if target is None:
+                target = resolve_download_url(session, url)
+            if not os.path.exists(part):
+                have = 0
+            elif meta.get("preallocated"):
+                have = meta.get("done", 0)  # o resto do .part pré-alocado ainda é espaço vazio
+            else:
+                have = os.path.getsize(part)
+            headers = {}
+            if have:
+                headers["Range"] = f"bytes={have}-"
+                # se o arquivo mudou no servidor, If-Range faz ele devolver o arquivo inteiro (200)
+                if meta.get("validator"):
+                    headers["If-Range"] = meta["validator"]
+            with session.get(target, headers=headers, stream=True, timeout=(15, 60)) as r:
+                forget_abort = cancel.on_cancel(lambda: _abort_response(r)) if cancel is not None else None
+                if r.status_code == 416:
+                    _, total = _parse_content_range(r.headers.get("Content-Range"))
+                    if total is not None and total == have:
+                        break
+                    write_log(f"Download: .part inconsistente com o servidor ({have} bytes), recomeçando: {url}")
+                    _discard_part(part)
+                    meta = {}
+                    continue
+                r.raise_for_status()
+                if r.status_code == 206:
+                    start, total = _parse_content_range(r.headers.get("Content-Range"))
+                    if start != have:
+                        raise IncompleteDownload(f"Servidor devolveu faixa inesperada (início {start}, esperado {have})")
+                    mode = "ab"
+                else:
+                    if have:
+                        write_log(f"Download: servidor não retomou (HTTP {r.status_code}), recomeçando do zero: {url}")
+                    have = 0
+                    length = r.headers.get("Content-Length")
+                    total = int(length) if length and length.isdigit() else None
+                    mode = "wb"
+                if expected_size is not None and total is not None and total != expected_size:
+                    raise IntegrityError(f"O servidor informa {total} bytes; o catálogo diz {expected_size}")
+                validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+                preallocated = durable and total is not None and (mode == "wb" or meta.get("preallocated", False))
+                meta = {"url": url, "total": total, "validator": validator}
+                if preallocated:
+                    meta.update(preallocated=True, done=have)
+                elif mode == "ab" and durable and os.path.getsize(part) != have:
+                    # sem o tamanho total não há pré-alocação: volta ao .part comum
+                    with open(part, "r+b") as f:
+                        f.truncate(have)
+                _save_part_meta(part, meta)
+                if mode == "wb":
+                    hasher, hashed = hashlib.sha256(), 0
+                elif hasher is None or hashed != have:
+                    # retomada de outra sessão: lê uma vez só o que já estava no disco
+                    hasher, hashed = _hash_prefix(part, have), have
+
+                done = have
+                started = time.monotonic()
+                session_bytes = 0
+                last_report = 0.0
+                if preallocated:
+                    mode = "r+b" if mode == "ab" else "wb"
+                synced = done
+                with open(part, mode) as f:
+                    if preallocated:
+                        if mode == "wb":
+                            _preallocate(f, total)
+                        f.seek(have)
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_READ_SIZE):
+                        if cancel is not None:
+                            cancel.check()
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        hashed += len(chunk)
+                        if limiter:
+                            limiter.consume(len(chunk))
+                        done += len(chunk)
+                        session_bytes += len(chunk)
+                        failures = 0
+                        if durable and done - synced >= DURABLE_SYNC_BYTES:
+                            f.flush()
+                            os.fsync(f.fileno())
+                            synced = done
+                            if preallocated:
+                                meta["done"] = done
+                                _save_part_meta(part, meta)
+                        now = time.monotonic()
+                        if progress and now - last_report >= PROGRESS_INTERVAL:
+                            last_report = now
+                            rate = session_bytes / max(now - started, 1e-6)
+                            eta = (total - done) / rate if total and rate > 0 else None
+                            progress(done, total, rate, eta)
+                    if durable:
+                        if total is not None and done > total:
+                            raise IncompleteDownload(f"Servidor enviou {done} bytes, mais que os {total} anunciados")
+                        f.flush()
+                        os.fsync(f.fileno())
+                        if preallocated:
+                            meta["done"] = done
+                            _save_part_meta(part, meta)
+                if total is not None and done < total:
+                    raise IncompleteDownload(f"Conexão encerrada com {done} de {total} bytes")
+                if expected_size is not None and done > expected_size:
+                    raise IntegrityError(f"Recebidos {done} bytes; o catálogo diz {expected_size}")
+                if progress:
+                    progress(done, total or done, session_bytes / max(time.monotonic() - started, 1e-6), 0)
+                break
+        except (DriveLinkError, Cancelled, IntegrityError):
+            raise
+        except (requests.RequestException, IncompleteDownload) as e:
+            if cancel is not None and cancel.cancelled:
+                # a conexão foi interrompida pelo próprio cancelamento
+                raise Cancelled("Download cancelado") from e
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status is not None and 400 <= status < 500 and status not in (408, 429):
+                raise
+            failures += 1
+            if failures > DOWNLOAD_RETRIES:
+                write_log(f"Download desistiu após {DOWNLOAD_RETRIES} tentativas ({url}): {e}")
+                raise
+            delay = min(60.0, DOWNLOAD_BACKOFF * (2 ** (failures - 1)))
+            write_log(f"Download falhou ({e}); nova tentativa {failures}/{DOWNLOAD_RETRIES} em {delay:.0f}s")
+            if cancel is None:
+                time.sleep(delay)
+            elif cancel.wait(delay):
+                raise Cancelled("Download cancelado")
+            target = None  # o link de confirmação do Drive pode expirar
+        except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                raise Cancelled("Download cancelado") from e
+            raise
+        finally:
+            if forget_abort is not None:
+                forget_abort()
+                forget_abort = None
+    size = os.path.getsize(part)
+    if hasher is None or hashed != size:
+        hasher = _hash_prefix(part, size)  # .part já estava completo (HTTP 416)
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    _move_into_place(part, out_path)
+    if durable:
+        _fsync_dir(out_dir)
+    _discard_part(part)
+    return hasher.hexdigest()
+
+def robust_download(url, out_path, progress=None, limiter=None, cancel=None, expected_size=None,
+                    part_path=None, durable=False):
+    """Download retomável; se o Drive não liberar o link direto, recorre ao gdown.
+
+    Retorna o sha256 do arquivo, ou None quando veio pelo gdown (sem hash no caminho).
+    O gdown não pode ser interrompido no meio: o cancelamento vale antes e depois dele.
+    part_path/durable seguem para chunked_download.
+    """
+    require_gdown_or_fail()
+    try:
+        return chunked_download(url, out_path, progress=progress, part_path=part_path, limiter=limiter,
+                                cancel=cancel, expected_size=expected_size, durable=durable)
+    except DriveLinkError as e:
+        write_log(f"Link direto indisponível ({e}); usando gdown para {url}")
+        if cancel is not None:
+            cancel.check()
+        # o gdown grava ao lado do destino e a troca é uma renomeação (out_path pode
+        # ser um nome reservado vazio, que o gdown não sobrescreveria sem copiar)
+        tmp = out_path + ".gdown"
+        try:
+            robust_download_with_gdown(url, tmp)
+            if durable:
+                with open(tmp, "rb+") as f:
+                    os.fsync(f.fileno())
+            _move_into_place(tmp, out_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return None
+
+# ---------- cache de downloads (ID do Drive + hash do conteúdo) ----------
+# Cada download concluído vira ARCHIVE_CACHE_FOLDER/<sha256>.bin; index.json liga
+# o ID do arquivo no Drive ao hash. Links repetidos no catálogo e reinstalações
+# são servidos do disco. Acima de CACHE_MAX_GB saem os arquivos usados há mais tempo.
+CACHE_MAX_GB = 20
+
+_cache_lock = threading.Lock()
+_cache_pins = {}  # caminho -> nº de instalações/RAW usando o arquivo agora (não pode ser removido)
+
+def hash_file(path, algo="sha256"):
+    h = hashlib.new(algo)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def is_html_download(path):
+    # o Drive devolve páginas HTML (erro, permissão, cota) no lugar do arquivo
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4096)
+        head_text = head.decode('utf-8', errors='ignore').strip().lower()
+    except Exception:
+        head_text = ""
+    return head_text.startswith("<!doctype") or head_text.startswith("<html") or "drive.google.com" in head_text
+
+def _blob_path(sha):
+    return os.path.join(ARCHIVE_CACHE_FOLDER, sha + ".bin")
+
+def _load_cache_index():
+    try:
+        with open(CACHE_INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except Exception:
+        index = {}
+    index.setdefault("links", {})  # chave do link -> sha256
+    index.setdefault("blobs", {})  # sha256 -> {size, mtime, last_used}
+    return index
+
+def _save_cache_index(index):
+    tmp = CACHE_INDEX_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, CACHE_INDEX_FILE)
+
+def _drop_blob(index, sha):
+    index["blobs"].pop(sha, None)
+    for key in [k for k, v in index["links"].items() if v == sha]:
+        del index["links"][key]
+
+def _pin(path):
+    _cache_pins[path] = _cache_pins.get(path, 0) + 1
+
+def _evict_cache(index, max_bytes=None):
+    limit = CACHE_MAX_GB * 1024 ** 3 if max_bytes is None else max_bytes
+    total = sum(b["size"] for b in index["blobs"].values())
+    for sha, blob in sorted(index["blobs"].items(), key=lambda kv: kv[1]["last_used"]):
+        if total <= limit:
+            break
+        path = _blob_path(sha)
+        if _cache_pins.get(path):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            write_log(f"Cache: não foi possível remover {path}: {e}")
+            continue
+        total -= blob["size"]
+        _drop_blob(index, sha)
+        write_log(f"Cache: removido {sha[:12]} ({format_bytes(blob['size'])}) para respeitar o limite")
+    return total
+
+def cache_lookup(url, sha256=None):
+    """Caminho do arquivo em cache para url (já preso com _pin) ou None.
+
+    Com sha256 (publicado no catálogo), só serve esse conteúdo: um link cujo arquivo
+    mudou não é atendido pelo cache antigo, e o mesmo conteúdo baixado por outro
+    link é aproveitado.
+    """
+    key = cache_key_for(url)
+    with _cache_lock:
+        index = _load_cache_index()
+        sha = index["links"].get(key)
+        if sha256 and sha != sha256:
+            sha = sha256 if sha256 in index["blobs"] else None
+            if sha:
+                index["links"][key] = sha
+        blob = index["blobs"].get(sha) if sha else None
+        if not blob:
+            return None
+        path = _blob_path(sha)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or st.st_size != blob["size"] or int(st.st_mtime) != blob["mtime"]:
+            # apagado ou alterado fora do instalador: não confiar mais
+            _drop_blob(index, sha)
+            _save_cache_index(index)
+            return None
+        blob["last_used"] = time.time()
+        _save_cache_index(index)
+        _pin(path)
+        return path
+
+def cache_store(url, path, sha=None):
+    """Move um download concluído para o cache e devolve o caminho final (preso com _pin).
+
+    sha: sha256 já calculado durante o download (evita reler o arquivo).
+    """
+    sha = sha or hash_file(path)
+    dest = _blob_path(sha)
+    with _cache_lock:
+        index = _load_cache_index()
+        if sha in index["blobs"] and os.path.exists(dest):
+            os.remove(path)  # mesmo conteúdo já estava no cache por outro link
+        else:
+            os.replace(path, dest)
+        st = os.stat(dest)
+        index["blobs"][sha] = {"size": st.st_size, "mtime": int(st.st_mtime), "last_used": time.time()}
+        index["links"][cache_key_for(url)] = sha
+        _pin(dest)
+        _evict_cache(index)
+        _save_cache_index(index)
+    return dest
+
+def check_archive(path, expect, sha=None):
+    """Confere path contra expect ({"size", "sha256"} do catálogo); retorna o sha256 usado."""
+    size = os.path.getsize(path)
+    if expect.get("size") is not None and size != expect["size"]:
+        raise IntegrityError(f"Arquivo baixado tem {size} bytes; o catálogo diz {expect['size']}")
+    if expect.get("sha256"):
+        sha = sha or hash_file(path)
+        if sha != expect["sha256"]:
+            raise IntegrityError(f"sha256 do arquivo baixado ({sha[:12]}...) difere do catálogo ({expect['sha256'][:12]}...)")
+    return sha
+
+def fetch_archive(url, progress=None, limiter=None, cancel=None, expect=None):
+    """Devolve o caminho local do arquivo de url, baixando só se não estiver no cache.
+
+    O arquivo fica protegido contra remoção até release_archive(caminho). expect
+    (catalog_integrity) traz tamanho/sha256 esperados: um download diferente lança
+    IntegrityError e não entra no cache.
+    """
+    expect = expect or {}
+    key = cache_key_for(url)
+    with _named_lock("fetch:" + key):
+        path = cache_lookup(url, sha256=expect.get("sha256"))
+        if path:
+            write_log(f"Cache: usando arquivo já baixado para {url} ({path})")
+            return path
+        incoming = os.path.join(ARCHIVE_CACHE_FOLDER, f"incoming_{key}_{threading.get_ident()}")
+        part = partial_path_for(url)
+        resumed = os.path.getsize(part) if os.path.exists(part) else 0
+        with log_span("download", url=url, resumed=resumed) as span:
+            sha = robust_download(url, incoming, progress=progress, limiter=limiter, cancel=cancel,
+                                  expected_size=expect.get("size"))
+            span["bytes"] = os.path.getsize(incoming) - resumed  # só o que veio pela rede
+        if is_html_download(incoming):
+            # página de erro do Drive: usada só para o diagnóstico, não entra no cache
+            with _cache_lock:
+                _pin(incoming)
+            return incoming
+        try:
+            sha = check_archive(incoming, expect, sha)
+        except IntegrityError as e:
+            write_log(f"Download rejeitado ({url}): {e}")
+            os.remove(incoming)
+            raise
+        return cache_store(url, incoming, sha=sha)
+
+def release_archive(path):
+    with _cache_lock:
+        left = _cache_pins.get(path, 0) - 1
+        if left > 0:
+            _cache_pins[path] = left
+        else:
+            _cache_pins.pop(path, None)
+    if os.path.basename(path).startswith("incoming_"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def clear_download_cache():
+    """Remove do cache tudo que não está em uso; retorna bytes liberados."""
+    with _cache_lock:
+        index = _load_cache_index()
+        before = sum(b["size"] for b in index["blobs"].values())
+        after = _evict_cache(index, max_bytes=0)
+        _save_cache_index(index)
+    return before - after
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024.0
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+def describe_download_progress(done, total, rate, eta):
+    if total:
+        return f"{format_bytes(done)} de {format_bytes(total)} - {format_bytes(rate)}/s - restam {format_eta(eta)}"
+    return f"{format_bytes(done)} - {format_bytes(rate)}/s"
+
+# ---------- detectar/operar sobre mods/profiles (direto do ZIP) ----------
+MODS_DIR_NAMES = ("mods", "mod")
+PROFILES_DIR_NAMES = ("perfil", "profile", "profiles")
+COPY_BUFFER_SIZE = 1024 * 1024
+EXTRACT_WORKERS = min(8, os.cpu_count() or 2)  # entradas do ZIP gravadas ao mesmo tempo
+EXTRACT_QUEUE_PER_WORKER = 4                   # entradas enfileiradas por thread (limita a memória)
+# Entradas sem compressão (.scs costumam ir assim) a partir deste tamanho são copiadas
+# pelo kernel, direto do arquivo ZIP para o destino (copy_file_range/sendfile; em
+# btrfs/xfs pode virar reflink). O CRC ainda é conferido numa leitura do destino, que
+# também alimenta o sha256 do manifesto. Sem as chamadas (Windows, macOS), copia pelo Python.
+KERNEL_COPY = hasattr(os, "copy_file_range") or (sys.platform.startswith("linux") and hasattr(os, "sendfile"))
+KERNEL_COPY_MIN = 4 * 1024 * 1024
+KERNEL_COPY_CHUNK = 64 * 1024 * 1024  # por chamada; entre elas o cancelamento é conferido
+
+def split_zip_path(name):
+    # normaliza separadores e recusa caminhos que escapariam da pasta de destino
+    parts = [p for p in name.replace("\\", "/").split("/") if p and p != "."]
+    if any(p == ".." or ":" in p for p in parts):
+        return None
+    return parts
+
+def classify_zip_entries(zip_ref):
+    """Classifica cada entrada do ZIP como mods/perfil usando apenas o central directory.
+
+    A primeira pasta do caminho chamada mods/mod ou perfil/profile/profiles define
+    o destino; o restante do caminho é relativo a MODS_FOLDER ou PROFILES_FOLDER.
+    Entradas fora dessas pastas vão para "ignored" e caminhos perigosos para "unsafe".
+    """
+    mods_entries = []
+    profiles_entries = []
+    mods_roots = set()
+    profiles_roots = set()
+    ignored = []
+    unsafe = []
+    for info in zip_ref.infolist():
+        parts = split_zip_path(info.filename)
+        if parts is None:
+            unsafe.append(info)
+            continue
+        if not parts:
+            continue
+        dir_parts = parts if info.is_dir() else parts[:-1]
+        for i, part in enumerate(dir_parts):
+            lower = part.lower()
+            if lower in MODS_DIR_NAMES:
+                mods_roots.add("/".join(parts[:i + 1]))
+                if parts[i + 1:]:
+                    mods_entries.append((info, parts[i + 1:]))
+                break
+            if lower in PROFILES_DIR_NAMES:
+                profiles_roots.add("/".join(parts[:i + 1]))
+                if parts[i + 1:]:
+                    profiles_entries.append((info, parts[i + 1:]))
+                break
+        else:
+            if not info.is_dir():
+                ignored.append(info)
+    return {"mods_entries": mods_entries, "profiles_entries": profiles_entries,
+            "mods_roots": sorted(mods_roots), "profiles_roots": sorted(profiles_roots),
+            "ignored": ignored, "unsafe": unsafe}
+
+def _entries_summary(entries):
+    files = [info for info, _ in entries if not info.is_dir()]
+    return {"files": len(files), "bytes": sum(i.file_size for i in files),
+            "compressed": sum(i.compress_size for i in files),
+            # o que aparece direto em mod/ ou profiles/ (arquivos .scs, pastas de perfil)
+            "top_level": sorted({rel[0] for _, rel in entries})}
+
+def analyze_zip_layout(zip_ref, sample=20):
+    """Resumo do pacote lido só do central directory: raízes, contagens e tamanhos.
+
+    Nada é extraído; serve para a pré-visualização e para checar o pacote antes de
+    instalar.
+    """
+    structure = classify_zip_entries(zip_ref)
+    mods = _entries_summary(structure["mods_entries"])
+    profiles = _entries_summary(structure["profiles_entries"])
+    ignored = structure["ignored"]
+    return {
+        "mods_roots": structure["mods_roots"],
+        "profiles_roots": structure["profiles_roots"],
+        "mods": mods,
+        "profiles": profiles,
+        "ignored": {"files": len(ignored), "bytes": sum(i.file_size for i in ignored),
+                    "sample": [i.filename for i in ignored[:sample]]},
+        "unsafe": [i.filename for i in structure["unsafe"][:sample]],
+        "total_entries": len(zip_ref.infolist()),
+        "install_bytes": mods["bytes"] + profiles["bytes"],
+    }
+
+def stream_zip_member(zip_ref, info, dest, cancel=None, hasher=None):
+    """Grava uma entrada do ZIP direto no destino final; retorna bytes escritos.
+
+    hasher (ex.: hashlib.sha256()) recebe os mesmos blocos gravados, sem reler o
+    arquivo. Cancelado no meio, apaga o arquivo incompleto e lança Cancelled.
+    """
+    if info.is_dir():
+        os.makedirs(dest, exist_ok=True)
+        return 0
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        with open(dest, "wb") as out:
+            kernel = _kernel_copy_member(zip_ref, info, out, cancel)
+            if not kernel:
+                with zip_ref.open(info) as src:
+                    while True:
+                        if cancel is not None:
+                            cancel.check()
+                        block = src.read(COPY_BUFFER_SIZE)
+                        if not block:
+                            break
+                        out.write(block)
+                        if hasher is not None:
+                            hasher.update(block)
+        if kernel:
+            _check_copied_member(info, dest, cancel, hasher)
+    except Cancelled:
+        os.remove(dest)
+        raise
+    # preservar a data do arquivo como o copy2 fazia
+    try:
+        ts = time.mktime(info.date_time + (0, 0, -1))
+        os.utime(dest, (ts, ts))
+    except Exception:
+        pass
+    return info.file_size
+
+def _kernel_copy_member(zip_ref, info, out, cancel):
+    """Copia uma entrada sem compressão do arquivo ZIP para out pelo kernel; False se não der."""
+    if (not KERNEL_COPY or info.file_size < KERNEL_COPY_MIN or info.compress_type != zipfile.ZIP_STORED
+            or info.flag_bits & 0x1 or not isinstance(zip_ref.filename, str)):
+        return False
+    fd = os.open(zip_ref.filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        header = os.pread(fd, 30, info.header_offset)
+        if len(header) != 30 or header[:4] != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"cabeçalho local inválido em {info.filename}")
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        offset = info.header_offset + 30 + name_len + extra_len
+        left = info.file_size
+        while left:
+            if cancel is not None:
+                cancel.check()
+            n = min(left, KERNEL_COPY_CHUNK)
+            try:
+                if hasattr(os, "copy_file_range"):
+                    sent = os.copy_file_range(fd, out.fileno(), n, offset)
+                else:
+                    sent = os.sendfile(out.fileno(), fd, offset, n)
+            except OSError:
+                if left != info.file_size:
+                    raise
+                return False  # volume/kernel sem suporte: cópia comum
+            if not sent:
+                raise zipfile.BadZipFile(f"arquivo ZIP truncado em {info.filename}")
+            offset += sent
+            left -= sent
+        return True
+    finally:
+        os.close(fd)
+
+def _check_copied_member(info, dest, cancel, hasher):
+    """Relê dest (copiado pelo kernel) conferindo o CRC do ZIP e alimentando hasher."""
+    crc = 0
+    with open(dest, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            if cancel is not None:
+                cancel.check()
+            crc = zlib.crc32(block, crc)
+            if hasher is not None:
+                hasher.update(block)
+    if crc != info.CRC:
+        raise zipfile.BadZipFile(f"CRC-32 incorreto em {info.filename}")
+
+def run_member_jobs(zip_ref, jobs, handler, workers=None, cancel=None, progress=None, on_error=None):
+    """Chama handler(zip_handle, info, rel) para cada (info, rel) de jobs em até workers threads.
+
+    Cada thread abre o próprio ZipFile, então leitura e descompressão não disputam um
+    arquivo aberto só; no máximo EXTRACT_QUEUE_PER_WORKER entradas por thread ficam
+    enfileiradas. handler retorna os bytes gravados, que vão para progress(bytes) nesta
+    thread. Erros de uma entrada vão para on_error((info, rel), exceção), também nesta
+    thread; Cancelled e IntegrityError interrompem tudo.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    workers = min(EXTRACT_WORKERS if workers is None else workers, len(jobs))
+
+    def finished(job, fn):
+        try:
+            written = fn()
+        except (Cancelled, IntegrityError):
+            raise
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(job, e)
+            return
+        if progress and written:
+            progress(written)
+
+    if workers <= 1 or not isinstance(zip_ref.filename, str):
+        for job in jobs:
+            if cancel is not None:
+                cancel.check()
+            finished(job, lambda: handler(zip_ref, *job))
+        return
+
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+
+    def run(job):
+        if cancel is not None:
+            cancel.check()
+        handle = getattr(local, "zip", None)
+        if handle is None:
+            handle = local.zip = zipfile.ZipFile(zip_ref.filename)
+            with handles_lock:
+                handles.append(handle)
+        return handler(handle, *job)
+
+    # maiores primeiro: as threads terminam juntas em vez de esperar o último arquivo grande
+    queued = iter(sorted(jobs, key=lambda job: job[0].file_size, reverse=True))
+    pending = {}
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            for job in queued:
+                pending[pool.submit(run, job)] = job
+                if len(pending) >= workers * EXTRACT_QUEUE_PER_WORKER:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished(pending.pop(future), future.result)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for handle in handles:
+            handle.close()
+
+# ---------- pré-visualização (central directory remoto) ----------
+# O ZipFile só precisa do fim do arquivo e do central directory; com HTTP Range a
+# pré-visualização de um pacote de vários GB baixa poucos KB.
+class HttpRangeFile:
+    """Arquivo somente leitura sobre HTTP Range (seek/read), com uma janela de cache."""
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, url, session=None):
+        import requests
+        self.session = session or requests.Session()
+        self.url = resolve_download_url(self.session, url)
+        with self.session.get(self.url, headers={"Range": "bytes=0-0"}, stream=True, timeout=(15, 60)) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise IOError("Servidor não aceita leitura parcial (Range)")
+            _, total = _parse_content_range(r.headers.get("Content-Range"))
+        if not total:
+            raise IOError("Tamanho do arquivo remoto desconhecido")
+        self.size = total
+        self.pos = 0
+        self.bytes_read = 0
+        self.requests = 1
+        self._window = (0, b"")
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.size
+        self.pos = max(0, offset)
+        return self.pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self.pos
+        n = min(n, self.size - self.pos)
+        if n <= 0:
+            return b""
+        start, data = self._window
+        if not (start <= self.pos and self.pos + n <= start + len(data)):
+            # janela de pelo menos BLOCK_SIZE cobrindo o pedido; perto do fim ela recua,
+            # assim a leitura do registro final já traz o central directory de pacotes pequenos
+            length = max(n, self.BLOCK_SIZE)
+            start = max(0, min(self.pos, self.size - length))
+            end = min(self.size, start + length) - 1
+            r = self.session.get(self.url, headers={"Range": f"bytes={start}-{end}"}, timeout=(15, 60))
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise IOError("Servidor ignorou o pedido de leitura parcial")
+            data = r.content
+            self._window = (start, data)
+            self.bytes_read += len(data)
+            self.requests += 1
+        chunk = data[self.pos - start:self.pos - start + n]
+        self.pos += len(chunk)
+        return chunk
+
+    def close(self):
+        self.session.close()
+
+def preview_archive(url, progress=None):
+    """Layout do pacote de url sem instalar: arquivo em cache, central directory remoto
+    ou, se o servidor não aceitar Range, o download completo (que fica no cache)."""
+    path = cache_lookup(url)
+    if path:
+        try:
+            with zipfile.ZipFile(path) as zip_ref:
+                return dict(analyze_zip_layout(zip_ref), source="cache", archive_bytes=os.path.getsize(path))
+        finally:
+            release_archive(path)
+    try:
+        remote = HttpRangeFile(url)
+    except Exception as e:
+        write_log(f"Pré-visualização: leitura parcial indisponível ({e}); baixando {url}")
+    else:
+        try:
+            with zipfile.ZipFile(remote) as zip_ref:
+                layout = analyze_zip_layout(zip_ref)
+            write_log(f"Pré-visualização remota de {url}: {format_bytes(remote.bytes_read)} lidos em {remote.requests} pedidos")
+            return dict(layout, source="remote", archive_bytes=remote.size, bytes_read=remote.bytes_read)
+        except zipfile.BadZipFile:
+            raise
+        except Exception as e:
+            write_log(f"Pré-visualização remota falhou ({e}); baixando {url}")
+        finally:
+            remote.close()
+    path = fetch_archive(url, progress=progress)
+    try:
+        with zipfile.ZipFile(path) as zip_ref:
+            return dict(analyze_zip_layout(zip_ref), source="download", archive_bytes=os.path.getsize(path))
+    finally:
+        release_archive(path)
+
+def describe_layout(layout):
+    """Resumo do layout em poucas linhas de texto (janela e logs)."""
+    lines = []
+    for key, label, roots_key in (("mods", "Mods", "mods_roots"), ("profiles", "Perfis", "profiles_roots")):
+        part = layout[key]
+        if layout[roots_key]:
+            lines.append(f"{label}: {part['files']} arquivos, {format_bytes(part['bytes'])} "
+                         f"(pastas: {', '.join(layout[roots_key])})")
+        else:
+            lines.append(f"{label}: nenhuma pasta encontrada")
+    if layout["ignored"]["files"]:
+        lines.append(f"Ignorados (fora de mods/perfil): {layout['ignored']['files']} arquivos, "
+                     f"{format_bytes(layout['ignored']['bytes'])}")
+    if layout["unsafe"]:
+        lines.append(f"Caminhos recusados (fora da pasta de destino): {len(layout['unsafe'])}")
+    lines.append(f"Total a gravar: {format_bytes(layout['install_bytes'])}")
+    return "\n".join(lines)
+
+# ---------- manifesto de instalação (por pacote) ----------
+# Para cada pacote guardamos caminho -> tamanho, mtime, CRC32 e sha256 de tudo que foi
+# instalado. Na reinstalação, uma entrada do ZIP só é gravada se o arquivo no
+# destino for diferente dela (mesmo tamanho + CRC32 = nada a fazer). O sha256 é
+# calculado enquanto a entrada é gravada e serve para verify_installed.
+def manifest_path_for(package_name):
+    slug = re.sub(r"[^\w.-]+", "_", package_name).strip("_")[:60]
+    digest = hashlib.sha1(package_name.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(MANIFEST_FOLDER, f"{slug}_{digest}.json")
+
+def file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            crc = zlib.crc32(block, crc)
+    return crc & 0xFFFFFFFF
+
+class InstallManifest:
+    """Arquivos instalados por um pacote e contagem de novos/atualizados/sem alteração."""
+
+    def __init__(self, package_name, expected=None):
+        self.package_name = package_name
+        self.expected = expected or {}  # chave -> {"sha256", "size"} publicados no catálogo
+        self.path = manifest_path_for(package_name)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = {}
+        self.files = data.get("files", {})
+        self.version = data.get("version")  # "version" do catálogo na última instalação
+        self.counts = {"new": 0, "updated": 0, "unchanged": 0}
+        self.linked_bytes = 0  # gravados como hardlink de um arquivo igual já guardado
+        self.written_bytes = 0  # realmente extraídos do ZIP (iguais e hardlinks não contam)
+        self._lock = threading.Lock()  # install_member roda em várias threads (run_member_jobs)
+
+    @staticmethod
+    def key_for(dest):
+        return os.path.relpath(dest, EUROTRUCK_PATH).replace(os.sep, "/")
+
+    def is_unchanged(self, info, dest):
+        try:
+            st = os.stat(dest)
+        except OSError:
+            return False
+        if st.st_size != info.file_size:
+            return False
+        record = self.files.get(self.key_for(dest))
+        if record and record["size"] == st.st_size and record["mtime_ns"] == st.st_mtime_ns:
+            # arquivo intacto desde a última instalação: basta comparar o CRC registrado
+            return record["crc32"] == info.CRC
+        # sem registro confiável: ler o arquivo existente ainda é mais barato que regravá-lo
+        return file_crc32(dest) == info.CRC
+
+    @staticmethod
+    def use_store(key, info):
+        return STORE_ENABLED and info.file_size >= STORE_MIN_SIZE and key.startswith(InstallManifest.key_for(MODS_FOLDER) + "/")
+
+    def install_member(self, zip_ref, info, dest, txn=None, cancel=None, stats=None):
+        """Grava a entrada só se mudou; retorna os bytes processados (para o progresso).
+
+        Com txn, a versão nova vai para a área de preparo da transação; dest continua
+        sendo o caminho final (chave do manifesto). stats (dict) soma desta chamada:
+        "written"/"bytes_written" (extraídos do ZIP), "linked"/"bytes_linked" (hardlink
+        de uma cópia já guardada, nenhum byte gravado) e "unchanged" (iguais).
+        """
+        in_tree = txn is not None and txn.in_tree(dest)
+        if info.is_dir():
+            os.makedirs(txn.tree_path(dest) if in_tree else dest, exist_ok=True)
+            return 0
+        key = self.key_for(dest)
+        target = dest
+        if self.is_unchanged(info, dest):
+            with self._lock:
+                self.counts["unchanged"] += 1
+                if stats is not None:
+                    stats["unchanged"] = stats.get("unchanged", 0) + 1
+            if in_tree:
+                # a pasta inteira será trocada: o arquivo igual entra por snapshot, sem reextrair;
+                # perfil nunca por hardlink (o save do jogo mudaria também o backup do rollback)
+                target = txn.tree_path(dest)
+                snapshot_file(dest, target, link=not key.startswith(self.key_for(PROFILES_FOLDER) + "/"))
+            previous = self.files.get(key) or {}
+            sha = previous.get("sha256") if previous.get("crc32") == info.CRC else None
+        else:
+            with self._lock:
+                self.counts["updated" if os.path.exists(dest) else "new"] += 1
+            if txn is not None:
+                target = txn.stage(dest)
+            wanted = self.expected.get(key)
+            use_store = self.use_store(key, info)
+            blob = store_lookup(wanted["sha256"], info.file_size) if wanted and use_store else None
+            if blob is not None and store_link(blob, target):
+                # o catálogo diz qual é o conteúdo e ele já está guardado: nada a extrair
+                sha = wanted["sha256"]
+                with self._lock:
+                    self.linked_bytes += info.file_size
+                    if stats is not None:
+                        stats["linked"] = stats.get("linked", 0) + 1
+                        stats["bytes_linked"] = stats.get("bytes_linked", 0) + info.file_size
+            else:
+                hasher = hashlib.sha256()
+                stream_zip_member(zip_ref, info, target, cancel=cancel, hasher=hasher)
+                sha = hasher.hexdigest()
+                with self._lock:
+                    self.written_bytes += info.file_size
+                    if stats is not None:
+                        stats["written"] = stats.get("written", 0) + 1
+                        stats["bytes_written"] = stats.get("bytes_written", 0) + info.file_size
+                if wanted and (wanted.get("sha256", sha) != sha or wanted.get("size", info.file_size) != info.file_size):
+                    os.remove(target)
+                    raise IntegrityError(f"{key}: conteúdo diferente do publicado no catálogo (sha256 {sha[:12]}...)")
+                if use_store and store_adopt(target, sha) == "linked":
+                    with self._lock:
+                        self.linked_bytes += info.file_size
+        st = os.stat(target)
+        record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "crc32": info.CRC}
+        if sha:
+            record["sha256"] = sha
+        with self._lock:
+            self.files[key] = record
+        return info.file_size
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"package": self.package_name, "version": self.version,
+                       "updated": datetime.now().isoformat(timespec="seconds"), "files": self.files}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def summary(self):
+        c = self.counts
+        text = f"arquivos: {c['new']} novos, {c['updated']} atualizados, {c['unchanged']} sem alteração"
+        if c['new'] or c['updated']:
+            text += f", {format_bytes(self.written_bytes)} gravados"
+        if self.linked_bytes:
+            text += f" ({format_bytes(self.linked_bytes)} reaproveitados de arquivos iguais)"
+        return text
+
+# ---------- verificação dos arquivos instalados ----------
+# Relê o que está em mod/ e compara com os manifestos (tamanho + sha256, ou CRC32
+# nos registros antigos). Vários arquivos são lidos ao mesmo tempo: hashlib e zlib
+# liberam o GIL, então o limite passa a ser o disco. profiles/ fica de fora porque
+# o jogo regrava os perfis.
+VERIFY_WORKERS = min(8, os.cpu_count() or 2)
+
+def load_manifests():
+    """{nome do pacote: {chave: registro}} de todos os manifestos salvos."""
+    manifests = {}
+    try:
+        names = os.listdir(MANIFEST_FOLDER)
+    except OSError:
+        return manifests
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(MANIFEST_FOLDER, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        manifests[data.get("package", name)] = data.get("files", {})
+    return manifests
+
+def _verify_file(path, record, cancel):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "missing"
+    if st.st_size != record["size"]:
+        return "corrupt"
+    sha = hashlib.sha256() if record.get("sha256") else None
+    crc = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            if cancel is not None:
+                cancel.check()
+            if sha is not None:
+                sha.update(block)
+            else:
+                crc = zlib.crc32(block, crc)
+    if sha is not None:
+        return "ok" if sha.hexdigest() == record["sha256"] else "corrupt"
+    return "ok" if (crc & 0xFFFFFFFF) == record["crc32"] else "corrupt"
+
+def verify_installed(packages=None, workers=VERIFY_WORKERS, progress=None, cancel=None):
+    """Confere os arquivos de mod/ instalados pelos pacotes (padrão: todos).
+
+    Um arquivo gravado por mais de um pacote é comparado com o registro mais recente.
+    progress(bytes_lidos, bytes_total) é chamado a cada arquivo. Retorna um dict com
+    checked, bytes, elapsed, missing/corrupt (chaves "mod/...") e packages
+    ({pacote: chaves com problema}).
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    started = time.monotonic()
+    manifests = load_manifests()
+    prefix = InstallManifest.key_for(MODS_FOLDER) + "/"
+    latest = {}
+    owners = {}
+    for package, files in manifests.items():
+        for key, record in files.items():
+            if not key.startswith(prefix):
+                continue
+            if key not in latest or record["mtime_ns"] > latest[key]["mtime_ns"]:
+                latest[key] = record
+            owners.setdefault(key, []).append(package)
+    wanted = set(packages) if packages is not None else None
+    keys = [k for k in latest if wanted is None or wanted.intersection(owners[k])]
+    keys.sort(key=lambda k: latest[k]["size"], reverse=True)  # maiores primeiro: divide melhor entre as threads
+    total = sum(latest[k]["size"] for k in keys)
+    result = {"checked": len(keys), "bytes": total, "missing": [], "corrupt": [], "packages": {}}
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_verify_file, os.path.join(EUROTRUCK_PATH, *k.split("/")), latest[k], cancel): k
+                   for k in keys}
+        try:
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    outcome = future.result()
+                except Cancelled:
+                    raise
+                except OSError as e:
+                    write_log(f"Verificação: não foi possível ler {key}: {e}")
+                    outcome = "corrupt"
+                if outcome != "ok":
+                    result[outcome].append(key)
+                    for package in owners[key]:
+                        if wanted is None or package in wanted:
+                            result["packages"].setdefault(package, []).append(key)
+                done += latest[key]["size"]
+                if progress:
+                    progress(done, total)
+        except Cancelled:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    result["missing"].sort()
+    result["corrupt"].sort()
+    result["elapsed"] = time.monotonic() - started
+    write_log(f"Verificação: {len(keys)} arquivos ({format_bytes(total)}) em {result['elapsed']:.1f}s; "
+              f"{len(result['missing'])} ausentes, {len(result['corrupt'])} corrompidos.")
+    return result
+
+# ---------- arquivos iguais em mod/ (armazenamento por conteúdo) ----------
+# STORE_FOLDER/<sha256[:2]>/<sha256> guarda uma cópia de cada .scs instalado e o arquivo
+# em mod/ é um hardlink para ela: pacotes que trazem o mesmo arquivo (mesmo tamanho e
+# sha256) ocupam o espaço uma vez só. Só vale para mod/, porque o jogo regrava os
+# perfis no lugar e um hardlink levaria a alteração a todas as cópias. O instalador
+# nunca altera um arquivo no lugar (grava ao lado e renomeia), então trocar um pacote
+# não mexe nos outros. Sem hardlink possível (outro volume, FAT32), tudo segue como antes.
+STORE_ENABLED = True
+STORE_MIN_SIZE = 256 * 1024  # arquivos menores não compensam o hardlink
+_store_warned = False
+_store_lock = threading.Lock()  # duas threads guardando o mesmo sha256 ao mesmo tempo
+
+def _store_blob(sha):
+    return os.path.join(STORE_FOLDER, sha[:2], sha)
+
+def _store_failed(e):
+    global _store_warned
+    if not _store_warned:
+        _store_warned = True
+        write_log(f"Armazenamento de arquivos iguais indisponível neste volume (hardlink falhou): {e}")
+
+def _link_replace(src, dest):
+    """Troca dest por um hardlink de src sem janela em que dest não existe."""
+    tmp = dest + ".ets2link"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.link(src, tmp)
+    os.replace(tmp, dest)
+
+def store_lookup(sha, size):
+    """Cópia guardada com esse sha256 e tamanho, ou None."""
+    blob = _store_blob(sha)
+    try:
+        return blob if os.stat(blob).st_size == size else None
+    except OSError:
+        return None
+
+def store_link(blob, dest):
+    """Cria dest como hardlink de blob; False se o volume não permitir."""
+    try:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        _link_replace(blob, dest)
+        return True
+    except OSError as e:
+        _store_failed(e)
+        return False
+
+def store_adopt(path, sha):
+    """Liga path ao armazenamento: vira hardlink da cópia igual já guardada ou passa a ser ela.
+
+    Retorna "linked" (path agora divide o espaço com outro arquivo), "stored", "same"
+    (já era a cópia guardada) ou None (hardlink impossível).
+    """
+    blob = _store_blob(sha)
+    try:
+        with _store_lock:
+            st = os.stat(path)
+            try:
+                bst = os.stat(blob)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.link(path, blob)
+                return "stored"
+            if (bst.st_dev, bst.st_ino) == (st.st_dev, st.st_ino):
+                return "same"
+            if bst.st_size != st.st_size:
+                return None
+            _link_replace(blob, path)
+            return "linked"
+    except OSError as e:
+        _store_failed(e)
+        return None
+
+def _store_entries():
+    try:
+        prefixes = os.listdir(STORE_FOLDER)
+    except OSError:
+        return
+    for prefix in prefixes:
+        folder = os.path.join(STORE_FOLDER, prefix)
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                yield path, os.stat(path)
+            except OSError:
+                continue
+
+def store_gc():
+    """Apaga as cópias guardadas que nenhum arquivo usa mais (só o próprio link); retorna bytes liberados."""
+    freed = 0
+    for path, st in list(_store_entries()):
+        if st.st_nlink <= 1:
+            try:
+                os.remove(path)
+                freed += st.st_size
+            except OSError:
+                pass
+    return freed
+
+def store_report():
+    """{"files", "bytes", "saved"}: cópias guardadas e quanto os hardlinks extras estão poupando."""
+    report = {"files": 0, "bytes": 0, "saved": 0}
+    for _, st in _store_entries():
+        report["files"] += 1
+        report["bytes"] += st.st_size
+        # um link é o próprio armazenamento; cada uso além do primeiro seria uma cópia inteira
+        report["saved"] += st.st_size * max(0, st.st_nlink - 2)
+    return report
+
+def _hash_with_cancel(path, cancel):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            if cancel is not None:
+                cancel.check()
+            h.update(block)
+    return h.hexdigest()
+
+def _refresh_manifest_mtimes(paths):
+    """Depois de trocar arquivos por hardlinks (mtime da cópia guardada), atualiza os registros."""
+    keys = {}
+    for path in paths:
+        try:
+            keys[InstallManifest.key_for(path)] = os.stat(path)
+        except OSError:
+            pass
+    try:
+        names = [n for n in os.listdir(MANIFEST_FOLDER) if n.endswith(".json")]
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(MANIFEST_FOLDER, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        touched = False
+        for key, record in data.get("files", {}).items():
+            st = keys.get(key)
+            if st is not None and record["size"] == st.st_size and record["mtime_ns"] != st.st_mtime_ns:
+                record["mtime_ns"] = st.st_mtime_ns
+                touched = True
+        if touched:
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, path)
+
+def dedupe_mods(dry_run=False, workers=VERIFY_WORKERS, progress=None, cancel=None):
+    """Troca .scs idênticos em mod/ (instalados antes do armazenamento ou copiados à mão) por hardlinks.
+
+    Só lê arquivos cujo tamanho se repete (entre si ou com o armazenamento); os já
+    ligados a uma cópia guardada nem são lidos. progress(lidos, total) a cada arquivo.
+    Com dry_run, só calcula. Retorna {scanned, hashed, linked, bytes_saved, elapsed,
+    store}. Chamar com INSTALL_LOCK.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    started = time.monotonic()
+    files = []
+    for root, _, names in os.walk(MODS_FOLDER):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode) and st.st_size >= STORE_MIN_SIZE:
+                files.append((path, st))
+    stored = {}       # (dev, inode) -> sha256 das cópias guardadas
+    store_sizes = {}  # tamanho -> nº de cópias guardadas
+    for blob, st in _store_entries():
+        stored[(st.st_dev, st.st_ino)] = os.path.basename(blob)
+        store_sizes[st.st_size] = store_sizes.get(st.st_size, 0) + 1
+    by_size = {}
+    for path, st in files:
+        by_size.setdefault(st.st_size, []).append((path, st))
+    to_hash = []
+    for size, group in by_size.items():
+        inodes = {(st.st_dev, st.st_ino) for _, st in group}
+        if len(inodes) + store_sizes.get(size, 0) < 2:
+            continue  # tamanho único: não há com quem ser igual
+        to_hash.extend((path, st) for path, st in group if (st.st_dev, st.st_ino) not in stored)
+    total = sum(st.st_size for _, st in to_hash)
+    done = 0
+    groups = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        try:
+            for (path, st), sha in zip(to_hash, pool.map(lambda item: _hash_with_cancel(item[0], cancel), to_hash)):
+                groups.setdefault(sha, []).append((path, st))
+                done += st.st_size
+                if progress:
+                    progress(done, total)
+        except Cancelled:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    for path, st in files:
+        sha = stored.get((st.st_dev, st.st_ino))
+        if sha in groups:
+            groups[sha].append((path, st))  # já ligado: entra só para a conta
+    result = {"scanned": len(files), "hashed": len(to_hash), "linked": 0, "bytes_saved": 0, "dry_run": dry_run}
+    relinked = []
+    for sha, group in groups.items():
+        blob = _store_blob(sha)
+        try:
+            bst = os.stat(blob)
+            keep = (bst.st_dev, bst.st_ino)
+        except OSError:
+            keep = (group[0][1].st_dev, group[0][1].st_ino)
+        paths_by_inode = {}
+        for path, st in group:
+            paths_by_inode.setdefault((st.st_dev, st.st_ino), []).append((path, st))
+        if len(paths_by_inode) < 2 and keep in paths_by_inode:
+            continue
+        if not dry_run:
+            for path, _ in paths_by_inode.get(keep, []):
+                store_adopt(path, sha)  # a cópia mantida vira a guardada, se ainda não era
+        for inode, members in paths_by_inode.items():
+            if inode == keep:
+                continue
+            st = members[0][1]
+            # o espaço só volta se todos os links desse arquivo estiverem sendo trocados
+            if st.st_nlink == len(members):
+                result["bytes_saved"] += st.st_size
+            result["linked"] += len(members)
+            if not dry_run:
+                for path, _ in members:
+                    if cancel is not None:
+                        cancel.check()
+                    if store_adopt(path, sha) == "linked":
+                        relinked.append(path)
+    if relinked:
+        _refresh_manifest_mtimes(relinked)
+    if not dry_run:
+        store_gc()
+    result["elapsed"] = time.monotonic() - started
+    result["store"] = store_report()
+    write_log(f"Deduplicação{' (simulação)' if dry_run else ''}: {result['scanned']} arquivos, {result['hashed']} lidos, "
+              f"{result['linked']} trocados por hardlink, {format_bytes(result['bytes_saved'])} economizados "
+              f"em {result['elapsed']:.1f}s.")
+    return result
+
+# ---------- transações de instalação ----------
+# Tudo que uma instalação grava vai antes para TRANSACTIONS_FOLDER/<id>/staged (mesmo
+# volume do jogo) e entra no lugar com renomeações no commit; o que estava no destino
+# é renomeado para <id>/backup. Desfazer = renomear de volta, O(entradas), sem copiar.
+# Pastas de perfil substituídas vão inteiras para o backup e a versão nova reaproveita
+# os arquivos iguais por reflink (cópia sob demanda) ou hardlink, sem ocupar espaço.
+TRANSACTIONS_KEEP = 5  # instalações que ainda podem ser desfeitas
+FICLONE = 0x40049409   # ioctl de reflink no Linux (btrfs, xfs)
+
+def snapshot_file(src, dst, link=True):
+    """Cópia instantânea de src: reflink, hardlink ou, em último caso, cópia comum.
+
+    link=False pula o hardlink: arquivos que o jogo regrava no lugar (perfis) ficariam
+    com o mesmo conteúdo nos dois nomes, e o backup da transação deixaria de ser o de antes.
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if sys.platform.startswith("linux"):
+        try:
+            import fcntl
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            shutil.copystat(src, dst)
+            return "reflink"
+        except (OSError, ImportError):
+            try:
+                os.remove(dst)
+            except OSError:
+                pass
+    if link:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+def _rename(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.replace(src, dst)
+    except OSError:
+        if not os.path.lexists(src):
+            raise
+        # mod/ apontando para outro disco (link/junção): renomear não atravessa volumes
+        shutil.move(src, dst)
+
+def _remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def _prune_empty_dirs(path):
+    # apaga pastas que ficaram vazias, sem subir além de mod/ e profiles/
+    stop = (os.path.abspath(MODS_FOLDER), os.path.abspath(PROFILES_FOLDER), os.path.abspath(EUROTRUCK_PATH))
+    path = os.path.abspath(path)
+    while path not in stop and path.startswith(os.path.abspath(EUROTRUCK_PATH) + os.sep):
+        try:
+            os.rmdir(path)
+        except OSError:
+            return
+        path = os.path.dirname(path)
+
+def _undo_ops(ops):
+    """Desfaz operações de commit (também as de um commit interrompido no meio)."""
+    for op in reversed(ops):
+        dest, staged, backup = op["dest"], op["staged"], op["backup"]
+        if op.get("remove"):
+            # remoção: só volta o que já tinha ido para o backup
+            if os.path.lexists(backup):
+                _rename(backup, dest)
+            continue
+        if not os.path.lexists(staged) and os.path.lexists(dest):
+            _remove_path(dest)  # versão nova, que entrou no commit
+        if os.path.lexists(backup):
+            _rename(backup, dest)
+        else:
+            _prune_empty_dirs(os.path.dirname(dest))
+
+class InstallTransaction:
+    """Arquivos preparados de uma instalação, aplicados de uma vez por commit().
+
+    action ("install" ou "uninstall") vai para o journal, para o desfazer dizer o que volta.
+    """
+
+    def __init__(self, package_name, action="install"):
+        self.package_name = package_name
+        self.action = action
+        self.id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")  # ordem alfabética = ordem das instalações
+        self.root = os.path.join(TRANSACTIONS_FOLDER, self.id)
+        self.ops = []
+        self._trees = {}  # pasta de destino substituída inteira -> pasta preparada
+        self._lock = threading.Lock()  # stage() é chamado pelas threads de extração
+        self.state = "staging"
+
+    @property
+    def committed(self):
+        return self.state == "committed"
+
+    def _paths(self, dest):
+        rel = os.path.relpath(dest, EUROTRUCK_PATH)
+        return os.path.join(self.root, "staged", rel), os.path.join(self.root, "backup", rel)
+
+    def _tree_for(self, dest):
+        for tree_dest, staged in self._trees.items():
+            if dest == tree_dest or dest.startswith(tree_dest + os.sep):
+                return os.path.join(staged, os.path.relpath(dest, tree_dest))
+        return None
+
+    def in_tree(self, dest):
+        return self._tree_for(dest) is not None
+
+    def tree_path(self, dest):
+        return self._tree_for(dest)
+
+    def stage_tree(self, dest):
+        """Prepara dest (pasta) para ser trocada inteira; devolve a pasta preparada."""
+        staged, backup = self._paths(dest)
+        os.makedirs(staged, exist_ok=True)
+        self._trees[dest] = staged
+        self.ops.append({"dest": dest, "staged": staged, "backup": backup})
+        return staged
+
+    def stage(self, dest):
+        """Caminho onde gravar a versão nova de dest (arquivo)."""
+        path = self._tree_for(dest)
+        if path is None:
+            path, backup = self._paths(dest)
+            with self._lock:
+                self.ops.append({"dest": dest, "staged": path, "backup": backup})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def remove(self, dest):
+        """Marca dest para sair no commit (vai para o backup, como um arquivo substituído)."""
+        staged, backup = self._paths(dest)
+        self.ops.append({"dest": dest, "staged": staged, "backup": backup, "remove": True})
+
+    def discard(self, dest):
+        """Tira do commit dest e tudo abaixo dele (item que falhou ao ser gravado)."""
+        keep = []
+        for op in self.ops:
+            if op["dest"] == dest or op["dest"].startswith(dest + os.sep):
+                if os.path.lexists(op["staged"]):
+                    _remove_path(op["staged"])
+            else:
+                keep.append(op)
+        self.ops = keep
+        self._trees.pop(dest, None)
+
+    def _write_journal(self, state, manifest_path=None):
+        journal = os.path.join(self.root, "journal.json")
+        data = {"id": self.id, "package": self.package_name, "action": self.action, "state": state,
+                "created": datetime.now().isoformat(timespec="seconds"), "ops": self.ops}
+        if manifest_path is not None:
+            data["manifest"] = manifest_path
+        tmp = journal + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, journal)
+        self.state = state
+
+    def commit(self, manifest=None):
+        """Aplica tudo com renomeações; se algo falhar no meio, desfaz o que já entrou."""
+        if not self.ops:
+            self.abort()
+            return 0
+        os.makedirs(self.root, exist_ok=True)
+        manifest_path = None
+        if manifest is not None:
+            # o manifesto anterior acompanha o backup, para o desfazer voltar a ele
+            manifest_path = manifest.path
+            if os.path.exists(manifest.path):
+                shutil.copy2(manifest.path, os.path.join(self.root, "manifest.json"))
+        self._write_journal("committing", manifest_path)
+        try:
+            for op in self.ops:
+                if os.path.lexists(op["dest"]):
+                    _rename(op["dest"], op["backup"])
+                if op.get("remove"):
+                    _prune_empty_dirs(os.path.dirname(op["dest"]))
+                else:
+                    _rename(op["staged"], op["dest"])
+        except Exception:
+            _undo_ops(self.ops)
+            self._write_journal("rolled_back", manifest_path)
+            raise
+        self._write_journal("committed", manifest_path)
+        prune_transactions()
+        return len(self.ops)
+
+    def abort(self):
+        # commit interrompido no meio (processo morrendo): o journal fica para recover_transactions
+        if self.state != "committing":
+            shutil.rmtree(self.root, ignore_errors=True)
+
+def _load_journal(txn_dir):
+    try:
+        with open(os.path.join(txn_dir, "journal.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def list_transactions():
+    """Transações com journal, da mais recente para a mais antiga."""
+    try:
+        names = sorted(os.listdir(TRANSACTIONS_FOLDER), reverse=True)
+    except OSError:
+        return []
+    found = []
+    for name in names:
+        journal = _load_journal(os.path.join(TRANSACTIONS_FOLDER, name))
+        if journal:
+            found.append(journal)
+    return found
+
+def prune_transactions():
+    """Mantém só as TRANSACTIONS_KEEP últimas instalações que podem ser desfeitas."""
+    kept = 0
+    for journal in list_transactions():
+        if journal["state"] == "committed" and kept < TRANSACTIONS_KEEP:
+            kept += 1
+            continue
+        if journal["state"] != "committing":
+            shutil.rmtree(os.path.join(TRANSACTIONS_FOLDER, journal["id"]), ignore_errors=True)
+    # backups apagados podem ter sido o último uso de uma cópia guardada
+    store_gc()
+
+def recover_transactions():
+    """Na abertura: desfaz commits interrompidos (queda de energia, processo morto)."""
+    try:
+        names = os.listdir(TRANSACTIONS_FOLDER)
+    except OSError:
+        return 0
+    recovered = 0
+    for name in names:
+        txn_dir = os.path.join(TRANSACTIONS_FOLDER, name)
+        journal = _load_journal(txn_dir)
+        if journal is None:
+            shutil.rmtree(txn_dir, ignore_errors=True)  # preparo que nunca chegou ao commit
+        elif journal["state"] == "committing":
+            write_log(f"Transação {name} ({journal['package']}) interrompida no commit; desfazendo.")
+            _rollback(journal)
+            recovered += 1
+    return recovered
+
+def _rollback(journal):
+    txn_dir = os.path.join(TRANSACTIONS_FOLDER, journal["id"])
+    _undo_ops(journal["ops"])
+    manifest_path = journal.get("manifest")
+    if manifest_path:
+        saved = os.path.join(txn_dir, "manifest.json")
+        if os.path.exists(saved):
+            os.replace(saved, manifest_path)
+        elif os.path.exists(manifest_path):
+            os.remove(manifest_path)
+    journal["state"] = "rolled_back"
+    with open(os.path.join(txn_dir, "journal.json"), "w", encoding="utf-8") as f:
+        json.dump(journal, f, indent=1)
+    shutil.rmtree(os.path.join(txn_dir, "staged"), ignore_errors=True)
+    shutil.rmtree(os.path.join(txn_dir, "backup"), ignore_errors=True)
+
+def rollback_last(txn_id=None):
+    """Desfaz a instalação mais recente ainda não desfeita; devolve o journal ou None.
+
+    Só a mais recente pode ser desfeita (as anteriores, em sequência). Com txn_id,
+    confere que ela ainda é a mais recente. Chamar com INSTALL_LOCK.
+    """
+    for journal in list_transactions():
+        if journal["state"] == "committed":
+            if txn_id is not None and journal["id"] != txn_id:
+                raise RuntimeError("Outra instalação terminou depois desta; confira de novo antes de desfazer.")
+            _rollback(journal)
+            what = "Remoção" if journal.get("action") == "uninstall" else "Instalação"
+            write_log(f"{what} desfeita: {journal['package']} ({journal['id']}, {len(journal['ops'])} itens)")
+            return journal
+    return None
+
+# ---------- índice do que está instalado ----------
+# Os manifestos (um por pacote) já dizem pacote -> arquivos -> tamanho/hash. O índice
+# junta todos em memória (arquivo -> pacotes donos) e, a cada consulta, só relê os
+# manifestos cujo mtime mudou. Um arquivo que dois pacotes trazem (mesmo .scs) tem dois
+# donos e só sai do disco quando o último deles é removido.
+_index_lock = threading.Lock()
+_index_cache = {}  # caminho do manifesto -> (mtime_ns, pacote, atualizado, versão, registros)
+
+def installed_index():
+    """{"packages": {nome: {files, bytes, updated, version, manifest, top_level}}, "owners": {chave: [pacotes]}}."""
+    with _index_lock:
+        try:
+            names = [n for n in os.listdir(MANIFEST_FOLDER) if n.endswith(".json")]
+        except OSError:
+            names = []
+        seen = set()
+        for name in names:
+            path = os.path.join(MANIFEST_FOLDER, name)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(path)
+            cached = _index_cache.get(path)
+            if cached and cached[0] == mtime:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                continue
+            _index_cache[path] = (mtime, data.get("package", name), data.get("updated", ""), data.get("version"),
+                                  data.get("files", {}))
+        for path in set(_index_cache) - seen:
+            del _index_cache[path]
+        entries = list(_index_cache.items())
+    packages = {}
+    owners = {}
+    for path, (_, package, updated, version, files) in entries:
+        top_level = set()
+        for key in files:
+            owners.setdefault(key, []).append(package)
+            parts = key.split("/")
+            if len(parts) > 1:
+                top_level.add("/".join(parts[:2]))
+        packages[package] = {"files": len(files), "bytes": sum(r["size"] for r in files.values()),
+                             "updated": updated, "version": version, "manifest": path, "top_level": sorted(top_level)}
+    return {"packages": packages, "owners": owners}
+
+def uninstall_package(package_name):
+    """Remove do disco os arquivos instalados por um pacote, numa transação (pode ser desfeita).
+
+    Ficam no lugar os arquivos que outro pacote também instalou e os que foram
+    alterados depois da instalação (ex.: perfil salvo pelo jogo). Retorna
+    {removed, shared, modified, missing, transaction}. Chamar com INSTALL_LOCK.
+    """
+    index = installed_index()
+    if package_name not in index["packages"]:
+        raise KeyError(f"Pacote não instalado: {package_name}")
+    manifest = InstallManifest(package_name)
+    result = {"removed": [], "shared": [], "modified": [], "missing": [], "transaction": None}
+    txn = InstallTransaction(package_name, action="uninstall")
+    for key, record in sorted(manifest.files.items()):
+        path = os.path.join(EUROTRUCK_PATH, *key.split("/"))
+        if len(index["owners"].get(key, [])) > 1:
+            result["shared"].append(key)
+            continue
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            result["missing"].append(key)
+            continue
+        unchanged = st.st_size == record["size"] and st.st_mtime_ns == record["mtime_ns"]
+        if not unchanged and _verify_file(path, record, None) != "ok":
+            result["modified"].append(key)
+            continue
+        txn.remove(path)
+        result["removed"].append(key)
+    try:
+        if txn.ops:
+            txn.commit(manifest)
+            result["transaction"] = txn.id
+        os.remove(manifest.path)
+    finally:
+        if not txn.committed:
+            txn.abort()
+    write_log(f"Pacote removido: {package_name} ({len(result['removed'])} arquivos; "
+              f"{len(result['shared'])} compartilhados e {len(result['modified'])} alterados ficaram)")
+    return result
+
+def _install_one(zip_ref, info, dest, txn, cancel):
+    # sem manifesto: extrai sempre (com transação, para a área de preparo)
+    return stream_zip_member(zip_ref, info, txn.stage(dest) if txn is not None else dest, cancel=cancel)
+
+def copy_mods_from_zip(zip_ref, mods_entries, progress=None, manifest=None, txn=None, cancel=None, workers=None):
+    stats = {"written": 0, "bytes_written": 0, "linked": 0, "bytes_linked": 0, "unchanged": 0}
+    copied = {"mods_files": [], "mods_folders": [], "stats": stats}
+    top_items = {}
+    for info, rel in mods_entries:
+        # item de topo é pasta se tiver algo abaixo dele ou se for entrada de diretório
+        is_dir = len(rel) > 1 or info.is_dir()
+        top_items[rel[0]] = top_items.get(rel[0], False) or is_dir
+    failed = set()
+    stats_lock = threading.Lock()
+
+    def install(zip_handle, info, rel):
+        if rel[0] in failed:
+            return 0
+        dest = os.path.join(MODS_FOLDER, *rel)
+        if manifest is not None:
+            return manifest.install_member(zip_handle, info, dest, txn=txn, cancel=cancel, stats=stats)
+        written = _install_one(zip_handle, info, dest, txn, cancel)
+        with stats_lock:
+            stats["written"] += 1
+            stats["bytes_written"] += written
+        return written
+
+    def on_error(job, e):
+        info, rel = job
+        failed.add(rel[0])
+        write_log(f"ERRO ao copiar mod {info.filename} -> {os.path.join(MODS_FOLDER, *rel)}: {e}")
+
+    run_member_jobs(zip_ref, mods_entries, install, workers=workers, cancel=cancel, progress=progress, on_error=on_error)
+    if txn is not None:
+        # só depois das threads: uma entrada ainda em andamento voltaria a preparar o item
+        for item in failed:
+            txn.discard(os.path.join(MODS_FOLDER, item))
+    for item, is_dir in top_items.items():
+        if item in failed:
+            continue
+        dest = os.path.join(MODS_FOLDER, item)
+        if is_dir:
+            copied["mods_folders"].append(dest)
+            write_log(f"Copiado diretório de mod: {dest}")
+        else:
+            copied["mods_files"].append(dest)
+            write_log(f"Copiado arquivo de mod: {dest}")
+    copied["total_items"] = len(top_items)
+    return copied
+
+def prepare_profiles_copy_list(profiles_entries):
+    to_copy = {}
+    for info, rel in profiles_entries:
+        item = to_copy.get(rel[0])
+        if item is None:
+            dest = os.path.join(PROFILES_FOLDER, rel[0])
+            item = {"name": rel[0], "dest": dest, "is_dir": False, "exists": os.path.exists(dest), "entries": []}
+            to_copy[rel[0]] = item
+        item["is_dir"] = item["is_dir"] or len(rel) > 1 or info.is_dir()
+        item["entries"].append((info, rel))
+    return list(to_copy.values())
+
+# O que fazer com um perfil do pacote que já existe em profiles/:
+#   keep    - não mexe
+#   replace - o perfil fica igual ao do pacote (arquivos a mais no local saem); com
+#             transação a pasta é trocada inteira, mas arquivos iguais não são regravados
+#   merge   - arquivo a arquivo: entra o que falta e o que mudou, a não ser que a cópia
+#             local seja mais nova (save feito depois do pacote); nada é apagado
+PROFILE_POLICIES = ("keep", "replace", "merge")
+
+def profile_policies(answer, conflicts):
+    """Resposta de ask_overwrite -> {perfil: política}.
+
+    Aceita bool (True = replace para todos, False = keep), uma política para todos ou
+    um dict {perfil: política} (perfis fora dele ficam com keep).
+    """
+    if isinstance(answer, dict):
+        chosen = {name: answer.get(name, "keep") for name in conflicts}
+    elif isinstance(answer, str):
+        chosen = dict.fromkeys(conflicts, answer)
+    else:
+        chosen = dict.fromkeys(conflicts, "replace" if answer else "keep")
+    for name, policy in chosen.items():
+        if policy not in PROFILE_POLICIES:
+            write_log(f"Política de perfil desconhecida para {name}: {policy!r}; mantendo o perfil atual")
+            chosen[name] = "keep"
+    return chosen
+
+def _local_is_newer(info, dest):
+    try:
+        local = os.stat(dest).st_mtime
+    except OSError:
+        return False
+    # datas no ZIP têm resolução de 2 s
+    return local > time.mktime(info.date_time + (0, 0, -1)) + 2
+
+def copy_profiles_with_decision(zip_ref, to_copy, overwrite=False, progress=None, manifest=None, txn=None, cancel=None,
+                                replace_trees=True, workers=None, policies=None):
+    """Grava os perfis de to_copy (prepare_profiles_copy_list) conforme a política de cada um.
+
+    policies: {nome do perfil: "keep"/"replace"/"merge"} para os que já existem; os
+    ausentes do dict seguem overwrite (replace ou keep). Retorna copied/merged/skipped/
+    errors (pastas) e stats ({perfil: política, arquivos e bytes gravados, iguais,
+    mantidos por serem mais novos}).
+    """
+    copied = []
+    merged = []
+    skipped = []
+    errors = []
+    selected = []
+    failed = {}
+    stats = {}
+    policies = policies or {}
+    for item in to_copy:
+        dest = item["dest"]
+        policy = policies.get(item["name"], "replace" if overwrite else "keep") if item["exists"] else "replace"
+        item_stats = stats[item["name"]] = {"policy": policy, "written": 0, "bytes_written": 0, "unchanged": 0,
+                                            "kept_newer": 0}
+        if policy == "keep":
+            skipped.append(dest)
+            if item["is_dir"]:
+                write_log(f"Ignorado profile (já existe): {dest}")
+            else:
+                write_log(f"Ignorado arquivo de profile (já existe): {dest}")
+            continue
+        item["policy"] = policy
+        item["stats"] = item_stats
+        selected.append(item)
+        if policy == "merge":
+            continue
+        try:
+            if item["is_dir"] and txn is not None and replace_trees:
+                # perfil trocado inteiro no commit; o atual vai para o backup da transação
+                txn.stage_tree(dest)
+            elif item["exists"] and item["is_dir"] and os.path.isdir(dest) and txn is None:
+                # sem transação não há backup: remove e copia
+                try:
+                    shutil.rmtree(dest)
+                except Exception:
+                    pass
+        except Exception as e:
+            failed[item["name"]] = e
+
+    by_name = {item["name"]: item for item in selected}
+    stats_lock = threading.Lock()
+
+    # todas as entradas dos perfis escolhidos de uma vez: perfis com milhares de
+    # arquivos pequenos são o caso em que uma thread só deixa o disco ocioso
+    def install(zip_handle, info, rel):
+        if rel[0] in failed:
+            return 0
+        item = by_name[rel[0]]
+        dest = os.path.join(PROFILES_FOLDER, *rel)
+        if item["policy"] == "merge" and not info.is_dir() and _local_is_newer(info, dest):
+            if manifest is None or not manifest.is_unchanged(info, dest):
+                with stats_lock:
+                    item["stats"]["kept_newer"] += 1
+                return info.file_size
+        if manifest is not None:
+            return manifest.install_member(zip_handle, info, dest, txn=txn, cancel=cancel, stats=item["stats"])
+        written = _install_one(zip_handle, info, dest, txn, cancel)
+        with stats_lock:
+            item["stats"]["written"] += 1
+            item["stats"]["bytes_written"] += written
+        return written
+
+    def on_error(job, e):
+        failed.setdefault(job[1][0], e)
+
+    jobs = [job for item in selected if item["name"] not in failed for job in item["entries"]]
+    run_member_jobs(zip_ref, jobs, install, workers=workers, cancel=cancel, progress=progress, on_error=on_error)
+    for item in selected:
+        dest = item["dest"]
+        e = failed.get(item["name"])
+        if e is not None:
+            if txn is not None:
+                txn.discard(dest)
+            errors.append({"src": item["name"], "dest": dest, "error": str(e)})
+            write_log(f"ERRO ao copiar profile {item['name']} -> {dest}: {e}")
+            continue
+        s = item["stats"]
+        written = f"{s['written']} arquivos ({format_bytes(s['bytes_written'])}) gravados, {s['unchanged']} iguais"
+        if item["policy"] == "merge":
+            merged.append(dest)
+            write_log(f"Mesclado profile: {dest}: {written}, {s['kept_newer']} mantidos (cópia local mais nova)")
+        else:
+            copied.append(dest)
+            kind = "profile (diretório)" if item["is_dir"] else "arquivo de profile"
+            write_log(f"{'Substituído' if item['exists'] else 'Copiado'} {kind}: {dest}: {written}")
+    return {"copied": copied, "merged": merged, "skipped": skipped, "errors": errors, "stats": stats}
+
+# ---------- perfis do jogo (profile.sii) ----------
+# Nome, empresa, XP e último save de cada pasta de profiles/ e steam_profiles/ (as
+# pastas têm o nome em hexadecimal). O índice fica em CACHE_FOLDER/profiles.json e
+# só relê o profile.sii que mudou de tamanho ou mtime.
+_profile_index = None
+_profile_index_lock = threading.Lock()
+
+def list_profiles():
+    """Perfis (dicts de profiles.read_profile) de profiles/ e steam_profiles/, em ordem de nome."""
+    global _profile_index
+    with _profile_index_lock:
+        if _profile_index is None or _profile_index.cache_file != PROFILE_INDEX_FILE:
+            _profile_index = ProfileIndex(PROFILE_INDEX_FILE)
+        index = _profile_index
+    started = time.monotonic()
+    profiles = index.refresh([(PROFILES_FOLDER, "profiles"), (STEAM_PROFILES_FOLDER, "steam_profiles")])
+    if index.last_reread:
+        write_log(f"Perfis: {len(profiles)} encontrados, {index.last_reread} relidos em {time.monotonic() - started:.2f}s",
+                  profiles=len(profiles), reread=index.last_reread)
+    return profiles
+
+# ---------- conteúdo dos mods (.scs) ----------
+# Lista de arquivos e manifest.sii de cada .scs/.zip de mod/, lidos sem extrair (ver
+# scs.py), e caminhos que mais de um mod sobrescreve. O índice fica em
+# CACHE_FOLDER/scs.json; o sha256 dos manifestos de instalação deixa reaproveitar o
+# resumo de um arquivo igual já lido com outro nome.
+_scs_index = None
+_scs_index_lock = threading.Lock()
+
+def installed_mod_hashes():
+    """nome do arquivo em mod/ -> (tamanho, mtime_ns, sha256) registrados na instalação."""
+    installed_index()
+    prefix = InstallManifest.key_for(MODS_FOLDER) + "/"
+    known = {}
+    with _index_lock:
+        for _, _, _, _, files in _index_cache.values():
+            for key, record in files.items():
+                name = key[len(prefix):]
+                if key.startswith(prefix) and "/" not in name and record.get("sha256"):
+                    known[name] = (record["size"], record["mtime_ns"], record["sha256"])
+    return known
+
+def inspect_mods():
+    """{"mods": [resumos de scs.inspect_mod], "conflicts": [{"mods", "files", "sample"}]} de mod/."""
+    global _scs_index
+    with _scs_index_lock:
+        if _scs_index is None or _scs_index.cache_file != SCS_INDEX_FILE:
+            _scs_index = ScsIndex(SCS_INDEX_FILE)
+        index = _scs_index
+    started = time.monotonic()
+    mods = index.refresh(MODS_FOLDER, installed_mod_hashes())
+    conflicts = find_conflicts([m for m in mods if not m["error"]])
+    if index.last_reread:
+        write_log(f"Mods: {len(mods)} arquivos, {index.last_reread} relidos, {len(conflicts)} conflitos "
+                  f"em {time.monotonic() - started:.2f}s", mods=len(mods), reread=index.last_reread)
+    return {"mods": mods, "conflicts": conflicts}
+
+# ---------- planejamento de espaço em disco ----------
+# Antes de baixar: tamanho do download (cabeçalhos HTTP) e total descompactado
+# (central directory remoto) contra o espaço livre do volume do cache e do volume do
+# ETS2. A instalação grava direto do ZIP no destino, então o pico é o arquivo baixado
+# mais os arquivos novos; no mesmo volume, o cache antigo (fora de uso) é liberado
+# antes quando isso basta para caber.
+DISK_SAFETY_MARGIN = 256 * 1024 * 1024
+_space_lock = threading.RLock()
+_space_reserved = {}  # st_dev -> bytes prometidos a downloads/instalações em andamento
+
+class InsufficientSpace(IOError):
+    pass
+
+def _existing_parent(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+def volume_of(path):
+    return os.stat(_existing_parent(path)).st_dev
+
+def free_space(path):
+    return shutil.disk_usage(_existing_parent(path)).free
+
+def remote_archive_size(url):
+    """Tamanho do arquivo remoto pelos cabeçalhos (Content-Range/Content-Length) ou None."""
+    import requests
+    with requests.Session() as session:
+        target = resolve_download_url(session, url)
+        with session.get(target, headers={"Range": "bytes=0-0"}, stream=True, timeout=(15, 60)) as r:
+            r.raise_for_status()
+            if r.status_code == 206:
+                return _parse_content_range(r.headers.get("Content-Range"))[1]
+            length = r.headers.get("Content-Length")
+            return int(length) if length and length.isdigit() else None
+
+def estimate_archive(url):
+    """(bytes a baixar, bytes a gravar) de url; None onde não der para saber."""
+    path = cache_lookup(url)
+    if path:
+        try:
+            with zipfile.ZipFile(path) as zip_ref:
+                return 0, analyze_zip_layout(zip_ref)["install_bytes"]
+        except zipfile.BadZipFile:
+            return 0, os.path.getsize(path)
+        finally:
+            release_archive(path)
+    try:
+        remote = HttpRangeFile(url)
+    except Exception:
+        size = remote_archive_size(url)
+    else:
+        size = remote.size
+        try:
+            with zipfile.ZipFile(remote) as zip_ref:
+                return _remaining_download(url, size), analyze_zip_layout(zip_ref)["install_bytes"]
+        except Exception:
+            pass
+        finally:
+            remote.close()
+    return _remaining_download(url, size), None
+
+def _remaining_download(url, size):
+    part = partial_path_for(url)
+    if size is None or not os.path.exists(part):
+        return size
+    return max(0, size - os.path.getsize(part))
+
+def reclaimable_cache_bytes():
+    with _cache_lock:
+        index = _load_cache_index()
+        return sum(b["size"] for sha, b in index["blobs"].items() if not _cache_pins.get(_blob_path(sha)))
+
+def plan_install(url, estimate=None):
+    """Confere se o download e a instalação de url cabem nos discos; devolve o plano.
+
+    Sem o tamanho descompactado (servidor sem Range, arquivo não-ZIP), usa o tamanho
+    do download como estimativa: pacotes .scs quase não comprimem.
+    """
+    download_bytes, install_bytes = estimate if estimate is not None else estimate_archive(url)
+    estimated = install_bytes is None
+    if install_bytes is None:
+        install_bytes = download_bytes or 0
+    download_bytes = download_bytes or 0
+    cache_dev = volume_of(ARCHIVE_CACHE_FOLDER)
+    game_dev = volume_of(MODS_FOLDER)
+    folders = {cache_dev: ARCHIVE_CACHE_FOLDER}
+    folders[game_dev] = MODS_FOLDER  # mesmo volume: um único total, identificado pela pasta do jogo
+    needs = {cache_dev: 0, game_dev: 0}
+    needs[cache_dev] += download_bytes
+    needs[game_dev] += install_bytes
+    plan = {"ok": True, "strategy": "same_volume" if cache_dev == game_dev else "separate_volumes",
+            "download_bytes": download_bytes, "install_bytes": install_bytes, "estimated": estimated,
+            "needs": {}, "free": {}, "shortfall": {}, "evict_bytes": 0, "reserved": []}
+    short = {}
+    with _space_lock:
+        for dev, need in needs.items():
+            available = free_space(folders[dev]) - _space_reserved.get(dev, 0) - DISK_SAFETY_MARGIN
+            plan["needs"][folders[dev]] = need
+            plan["free"][folders[dev]] = max(0, available)
+            plan["reserved"].append((dev, need))
+            if need > available:
+                short[dev] = need - available
+                plan["shortfall"][folders[dev]] = need - available
+    if short:
+        # só o volume do cache está curto (ou é o mesmo do jogo): apagar downloads antigos resolve?
+        if list(short) == [cache_dev] and reclaimable_cache_bytes() >= short[cache_dev]:
+            plan["strategy"] += "+evict_cache"
+            plan["evict_bytes"] = short[cache_dev]
+        else:
+            plan["ok"] = False
+    return plan
+
+def describe_plan(plan):
+    lines = [f"Download: {format_bytes(plan['download_bytes'])}; a gravar no jogo: "
+             f"{format_bytes(plan['install_bytes'])}{' (estimado)' if plan['estimated'] else ''}"]
+    for folder, missing in plan["shortfall"].items():
+        lines.append(f"Faltam {format_bytes(missing)} em {folder} (livre: {format_bytes(plan['free'][folder])})")
+    if plan["evict_bytes"]:
+        lines.append(f"Downloads antigos do cache serão removidos para liberar {format_bytes(plan['evict_bytes'])}")
+    return "\n".join(lines)
+
+def reserve_space(url):
+    """Planeja, libera cache se preciso e reserva o espaço até release_space(plano).
+
+    Lança InsufficientSpace (antes de baixar qualquer byte) se o pacote não couber.
+    """
+    estimate = estimate_archive(url)
+    with _space_lock:
+        plan = plan_install(url, estimate)
+        write_log(f"Espaço ({plan['strategy']}): {describe_plan(plan)}".replace("\n", " / "))
+        if not plan["ok"]:
+            raise InsufficientSpace("Espaço em disco insuficiente.\n" + describe_plan(plan))
+        if plan["evict_bytes"]:
+            with _cache_lock:
+                index = _load_cache_index()
+                total = sum(b["size"] for b in index["blobs"].values())
+                _evict_cache(index, max_bytes=max(0, total - plan["evict_bytes"]))
+                _save_cache_index(index)
+        for dev, need in plan["reserved"]:
+            _space_reserved[dev] = _space_reserved.get(dev, 0) + need
+    return plan
+
+def release_space(plan):
+    with _space_lock:
+        for dev, need in plan["reserved"]:
+            left = _space_reserved.get(dev, 0) - need
+            if left > 0:
+                _space_reserved[dev] = left
+            else:
+                _space_reserved.pop(dev, None)
+
+def check_install_space(entries):
+    """Bytes que as entradas acrescentam no volume do jogo; lança InsufficientSpace
+    antes de gravar qualquer arquivo.
+
+    A versão anterior de um arquivo substituído fica no backup da transação, então
+    ele conta inteiro; arquivo existente com o mesmo tamanho quase sempre é o mesmo
+    (não é regravado) e não conta.
+    """
+    added = 0
+    for info, dest in entries:
+        if info.is_dir():
+            continue
+        try:
+            if os.path.getsize(dest) == info.file_size:
+                continue
+        except OSError:
+            pass
+        added += info.file_size
+    available = free_space(MODS_FOLDER)
+    if added > available:
+        raise InsufficientSpace(f"Espaço em disco insuficiente: a instalação precisa de {format_bytes(added)} "
+                                f"e há {format_bytes(available)} livres em {EUROTRUCK_PATH}")
+    return added
+
+# ---------- atualizações parciais (delta) ----------
+# Com "version" e "files" (hash por arquivo) no catálogo, uma entrada pode oferecer
+#   "deltas": [{"from": "<versão instalada>", "drive_link": "...", "size": n, "sha256": "...",
+#               "removed": ["mod/antigo.scs", ...]}]
+# O delta é um ZIP com a mesma estrutura do pacote, só com os arquivos novos ou
+# alterados. Ele só é usado se o manifesto diz que a versão instalada é "from" e se
+# tudo em mod/ que difere do catálogo vem no delta ou está em "removed"; senão o
+# pacote completo é baixado. Perfis não entram na conta: o jogo os regrava.
+
+class DeltaMismatch(RuntimeError):
+    pass
+
+def catalog_deltas(mod):
+    """Deltas válidos de uma entrada do catálogo (exige "version" e "files")."""
+    raw = mod.get("deltas") or []
+    if not mod.get("version") or not mod.get("files") or not isinstance(raw, list):
+        return []
+    deltas = []
+    for d in raw:
+        if not isinstance(d, dict) or not isinstance(d.get("from"), str) or not isinstance(d.get("drive_link"), str):
+            write_log(f"Catálogo: delta inválido em {mod.get('name', '?')}: {d!r}")
+            continue
+        integrity = catalog_integrity({"name": f"{mod.get('name', '?')} (delta {d['from']})",
+                                       "size": d.get("size"), "sha256": d.get("sha256")})
+        removed = []
+        for key in d.get("removed") or []:
+            parts = split_zip_path(key) if isinstance(key, str) else None
+            if parts:
+                removed.append("/".join(parts))
+        deltas.append({"from": d["from"], "drive_link": d["drive_link"], "size": integrity["size"],
+                       "sha256": integrity["sha256"], "removed": removed})
+    return deltas
+
+def choose_delta(mod):
+    """Delta que leva a versão instalada à do catálogo, ou None."""
+    deltas = catalog_deltas(mod)
+    if not deltas:
+        return None
+    installed = InstallManifest(mod['name']).version
+    if installed is None or installed == mod["version"]:
+        return None
+    return next((d for d in deltas if d["from"] == installed), None)
+
+def delta_stale_keys(mod):
+    """Arquivos de mod/ listados no catálogo cujo estado local não é o publicado."""
+    manifest = InstallManifest(mod['name'])
+    prefix = InstallManifest.key_for(MODS_FOLDER) + "/"
+    stale = []
+    for key, wanted in catalog_integrity(mod)["files"].items():
+        if not key.startswith(prefix):
+            continue
+        record = manifest.files.get(key)
+        if not record or record.get("sha256") != wanted["sha256"]:
+            stale.append(key)
+            continue
+        path = os.path.join(EUROTRUCK_PATH, *key.split("/"))
+        try:
+            st = os.stat(path)
+        except OSError:
+            stale.append(key)
+            continue
+        if (st.st_size, st.st_mtime_ns) != (record["size"], record["mtime_ns"]) and _verify_file(path, record, None) != "ok":
+            stale.append(key)
+    return stale
+
+def delta_uncovered(mod, delta, zip_ref):
+    """Arquivos locais fora do estado esperado que o delta não corrige (vazio = delta aplicável)."""
+    structure = classify_zip_entries(zip_ref)
+    shipped = {InstallManifest.key_for(os.path.join(MODS_FOLDER, *rel)) for info, rel in structure["mods_entries"]}
+    shipped.update(InstallManifest.key_for(os.path.join(PROFILES_FOLDER, *rel)) for info, rel in structure["profiles_entries"])
+    shipped.update(delta["removed"])
+    return sorted(k for k in delta_stale_keys(mod) if k not in shipped)
+
+def package_url(mod):
+    """Link que fetch_package deve baixar (delta, se houver um aplicável); para planejar espaço."""
+    delta = choose_delta(mod)
+    return delta["drive_link"] if delta else mod['drive_link']
+
+def fetch_package(mod, progress=None, limiter=None, cancel=None):
+    """Baixa o que for preciso para instalar mod: o delta, se aplicável, senão o pacote completo.
+
+    Retorna (caminho, delta ou None); o caminho fica preso até release_archive e o
+    delta vai para install_archive(delta=...).
+    """
+    delta = choose_delta(mod)
+    if delta is not None:
+        path = None
+        try:
+            path = fetch_archive(delta["drive_link"], progress=progress, limiter=limiter, cancel=cancel, expect=delta)
+            with zipfile.ZipFile(path) as zip_ref:
+                uncovered = delta_uncovered(mod, delta, zip_ref)
+            if not uncovered:
+                write_log(f"{mod['name']}: usando delta {delta['from']} -> {mod['version']}")
+                return path, delta
+            write_log(f"{mod['name']}: delta não serve ({len(uncovered)} arquivos locais diferentes, ex.: {uncovered[0]}); "
+                      f"baixando o pacote completo.")
+        except Cancelled:
+            if path:
+                release_archive(path)
+            raise
+        except Exception as e:
+            write_log(f"{mod['name']}: delta indisponível ({e}); baixando o pacote completo.")
+        if path:
+            release_archive(path)
+    return fetch_archive(mod['drive_link'], progress=progress, limiter=limiter, cancel=cancel,
+                         expect=catalog_integrity(mod)), None
+
+# ---------- instalação ----------
+# Downloads podem correr em paralelo; a etapa de instalação (gravar em mod/ e
+# profiles/) é sempre serializada por INSTALL_LOCK.
+INSTALL_LOCK = threading.Lock()
+
+def install_archive(mod, archive_path, status=None, progress=None, notify=None, ask_overwrite=None, cancel=None,
+                    delta=None, extract_workers=None):
+    """Instala um arquivo já baixado; retorna (success, info, details). Chamar com INSTALL_LOCK.
+
+    status(texto) e progress(porcentagem) informam o andamento; notify(tipo, título,
+    texto) avisa o usuário (tipo "info" ou "error"); ask_overwrite(nomes) decide o que
+    fazer com perfis já existentes: True/False (substituir/preservar todos), uma
+    política de PROFILE_POLICIES ou {nome: política} (sem ele, são preservados). Cancelado
+    (cancel) antes do commit, nada muda em mod/ e profiles/. Com delta (de
+    fetch_package), archive_path é o delta: grava só o que ele traz, apaga o que está
+    em "removed" e perfis são atualizados arquivo a arquivo, sem trocar a pasta.
+    extract_workers: entradas gravadas ao mesmo tempo (padrão EXTRACT_WORKERS).
+    """
+    status = status or (lambda text: None)
+    progress = progress or (lambda pct: None)
+    notify = notify or (lambda kind, title, text: None)
+    zip_ref = None
+    txn = None
+    success = False
+    info = ""
+    details = {}
+    try:
+        status("Analisando pacote...")
+
+        try:
+            zip_ref = zipfile.ZipFile(archive_path, 'r')
+        except zipfile.BadZipFile:
+            write_log(f"{mod['name']}: Arquivo não é zip. Tentando salvar como arquivo único em mod/")
+            if is_html_download(archive_path):
+                saved = os.path.join(LOG_FOLDER, f"{mod['name']}_raw.html")
+                try:
+                    shutil.copy2(archive_path, saved)
+                    write_log(f"{mod['name']}: Conteúdo HTML salvo em {saved}")
+                except Exception:
+                    pass
+                notify("error", "Erro", f"O arquivo baixado para '{mod['name']}' parece ser uma página HTML (erro/permissão). Verifique o link no Drive.")
+                details = {"html_saved": saved}
+                success = False
+                return success, info, details
+            else:
+                guessed = (mod.get("filename") or mod['name'].replace(" ", "_")) + ".scs"
+                dest = os.path.join(MODS_FOLDER, guessed)
+                if os.path.exists(dest):
+                    base, ext = os.path.splitext(guessed)
+                    i = 1
+                    while True:
+                        cand = f"{base}_{i}{ext}"
+                        if not os.path.exists(os.path.join(MODS_FOLDER, cand)):
+                            dest = os.path.join(MODS_FOLDER, cand)
+                            break
+                        i += 1
+                try:
+                    shutil.copy2(archive_path, dest)
+                    write_log(f"{mod['name']}: Arquivo não-zip salvo em mod/: {dest}")
+                    status("Arquivo não-zip salvo em mod/")
+                    details = {"saved_as": dest}
+                    success = True
+                    return success, info, details
+                except Exception as e:
+                    write_log(f"{mod['name']}: Falha ao salvar não-zip: {e}")
+                    details = {"error_save": str(e)}
+                    success = False
+                    return success, info, details
+
+        # classificar entradas pelo central directory; nada é extraído para pasta temporária
+        with log_span("detect", os.path.getsize(archive_path), package=mod['name']) as span:
+            structure = classify_zip_entries(zip_ref)
+            span["entries"] = len(zip_ref.infolist())
+        mods_entries = structure["mods_entries"]
+        profiles_entries = structure["profiles_entries"]
+        mods_dirs = structure["mods_roots"]
+        profiles_dirs = structure["profiles_roots"]
+        if delta is not None:
+            # o estado local pode ter mudado desde o download (outra instalação no meio)
+            uncovered = delta_uncovered(mod, delta, zip_ref)
+            if uncovered:
+                raise DeltaMismatch(f"{len(uncovered)} arquivos em mod/ diferem da versão {delta['from']} "
+                                    f"(ex.: {uncovered[0]}); instale de novo para baixar o pacote completo")
+
+        # conferir o espaço antes de gravar o primeiro arquivo: disco cheio não deixa instalação pela metade
+        try:
+            check_install_space([(info, os.path.join(MODS_FOLDER, *rel)) for info, rel in mods_entries] +
+                                [(info, os.path.join(PROFILES_FOLDER, *rel)) for info, rel in profiles_entries])
+        except InsufficientSpace as e:
+            write_log(f"{mod['name']}: {e}")
+            notify("error", "Espaço insuficiente", str(e))
+            return False, str(e), {"error": str(e), "insufficient_space": True}
+
+        # progresso determinado pelo total descompactado das entradas que serão gravadas
+        total_bytes = sum(info.file_size for info, _ in mods_entries + profiles_entries)
+        written_bytes = [0]
+        def on_bytes(n):
+            written_bytes[0] += n
+            pct = (written_bytes[0] * 100.0 / total_bytes) if total_bytes else 100
+            progress(pct)
+        status("Instalando arquivos...")
+        manifest = InstallManifest(mod['name'], expected=catalog_integrity(mod)["files"])
+        # tudo é preparado ao lado e só entra em mod/ e profiles/ no commit (renomeações)
+        txn = InstallTransaction(mod['name'])
+
+        # Se não encontrou nenhuma pasta 'mods', avisar e marcar 0 mods encontrados (mensagem + log)
+        mods_detected_count = 0
+        copied_mods_info = {}
+        if not mods_dirs:
+            write_log(f"{mod['name']}: Nenhuma pasta 'mods' encontrada no pacote.")
+            # vamos definir explicitamente 0 mods encontrados no resumo
+            mods_detected_count = 0
+        else:
+            # contar itens dentro das pastas mods para saber se está vazia
+            with log_span("extract", package=mod['name'], part="mods", files=len(mods_entries)) as span:
+                copied_mods_info = copy_mods_from_zip(zip_ref, mods_entries, progress=on_bytes, manifest=manifest, txn=txn,
+                                                      cancel=cancel, workers=extract_workers)
+                # bytes = só o que saiu do ZIP para o disco (base do MB/s); os ligados do
+                # depósito não gravam nada e vão à parte, e os iguais não contam
+                span["bytes"] = copied_mods_info["stats"]["bytes_written"]
+                span["bytes_linked"] = copied_mods_info["stats"]["bytes_linked"]
+            mods_detected_count = copied_mods_info.get("total_items", 0)
+            if mods_detected_count == 0:
+                # pasta 'mods' encontrada mas vazia
+                write_log(f"{mod['name']}: Pasta 'mods' encontrada mas vazia.")
+                # user notification
+                notify("info", "Mods vazios", f"O pacote '{mod['name']}' contém uma pasta 'mods', mas ela está vazia (0 mods encontrados).")
+
+        # processar profiles conforme regras
+        profiles_result = {"copied": [], "skipped": [], "errors": []}
+        if profiles_dirs:
+            profile_copy_plan = prepare_profiles_copy_list(profiles_entries)
+            conflicts = [os.path.basename(x["dest"]) for x in profile_copy_plan if x["exists"]]
+            policies = {}
+            if conflicts:
+                try:
+                    answer = ask_overwrite(conflicts) if ask_overwrite else False
+                except Exception:
+                    answer = False
+                policies = profile_policies(answer, conflicts)
+            with log_span("extract", package=mod['name'], part="profiles", files=len(profiles_entries)) as span:
+                profiles_result = copy_profiles_with_decision(zip_ref, profile_copy_plan, policies=policies, progress=on_bytes,
+                                                              manifest=manifest, txn=txn, cancel=cancel,
+                                                              replace_trees=delta is None, workers=extract_workers)
+                span["bytes"] = sum(s["bytes_written"] for s in profiles_result["stats"].values())
+        else:
+            # nenhuma pasta de profiles encontrada
+            write_log(f"{mod['name']}: Nenhuma pasta 'perfil' encontrada no pacote.")
+
+        removed = []
+        if delta is not None:
+            owners = installed_index()["owners"]
+            for key in delta["removed"]:
+                if manifest.files.pop(key, None) is None:
+                    continue  # só apaga o que este pacote instalou
+                path = os.path.join(EUROTRUCK_PATH, *key.split("/"))
+                if len(owners.get(key, [])) <= 1 and os.path.lexists(path):
+                    txn.remove(path)
+                    removed.append(key)
+        manifest.version = mod.get("version")
+
+        # último ponto de cancelamento: o commit, uma vez começado, vai até o fim
+        if cancel is not None:
+            cancel.check()
+        status("Aplicando alterações...")
+        with log_span("copy", package=mod['name']) as span:
+            # as versões novas já estão gravadas ao lado: aqui só renomeações para mod/ e
+            # profiles/, então a etapa registra operações (ops) e não bytes nem MB/s
+            span["ops"] = txn.commit(manifest)
+
+        # compor resumo e mensagens finais
+        parts = []
+        # mods resumo
+        if delta is not None:
+            parts.append(f"atualização {delta['from']} -> {mod['version']}: {len(mods_entries) + len(profiles_entries)} "
+                         f"arquivos no delta, {len(removed)} removidos")
+        elif mods_dirs:
+            # se pasta mods existia mas vazia -> registrar 0 mods
+            if mods_detected_count == 0:
+                parts.append("0 mods encontrados (pasta mods vazia)")
+            else:
+                parts.append(f"{mods_detected_count} itens copiados para mod/")
+        else:
+            parts.append("0 mods encontrados (nenhuma pasta 'mods' no pacote)")
+
+        # profiles resumo
+        if profiles_result.get("copied"):
+            parts.append(f"{len(profiles_result['copied'])} profiles copiados")
+        if profiles_result.get("merged"):
+            parts.append(f"{len(profiles_result['merged'])} profiles mesclados")
+        if profiles_result.get("skipped"):
+            parts.append(f"{len(profiles_result['skipped'])} profiles ignorados (não substituídos)")
+        if profiles_result.get("errors"):
+            parts.append(f"{len(profiles_result['errors'])} erros ao copiar profiles")
+        if mods_entries or profiles_entries or delta is not None:
+            try:
+                manifest.save()
+            except Exception as e:
+                write_log(f"{mod['name']}: não foi possível salvar o manifesto: {e}")
+            parts.append(manifest.summary())
+
+        info = " / ".join(parts)
+        write_log(f"{mod['name']}: Resultado - {info}")
+        # notificar usuário com resumo (a fila mostra um resumo único no final)
+        notify("info", "Resumo da Instalação", f"{mod['name']}: {info}")
+
+        success = True
+        details = {"mods": copied_mods_info, "profiles": profiles_result, "files": dict(manifest.counts),
+                   "transaction": txn.id if txn.committed else None}
+        if delta is not None:
+            details["delta"] = {"from": delta["from"], "to": mod["version"], "removed": removed}
+
+    except Cancelled:
+        write_log(f"{mod['name']}: instalação cancelada; nada foi alterado.")
+        status("Instalação cancelada")
+        success = False
+        info = "Cancelado"
+        details = {"cancelled": True}
+    except DeltaMismatch as e:
+        write_log(f"{mod['name']}: delta não aplicado: {e}")
+        status("Atualização parcial não aplicável")
+        success = False
+        info = str(e)
+        details = {"delta_mismatch": True}
+    except IntegrityError as e:
+        write_log(f"{mod['name']}: arquivo corrompido no pacote, instalação desfeita: {e}")
+        notify("error", "Arquivo corrompido", f"{mod['name']}: {e}\nNada foi alterado em mod/ e profiles/.")
+        success = False
+        info = f"Arquivo corrompido: {e}"
+        details = {"integrity": str(e)}
+    except Exception as e:
+        write_log(f"{mod['name']}: ERRO inesperado - {e}")
+        success = False
+        info = f"Erro inesperado: {e}"
+        details = {"exception": str(e)}
+    finally:
+        if zip_ref is not None:
+            try: zip_ref.close()
+            except: pass
+        if txn is not None and not txn.committed:
+            txn.abort()
+    return success, info, details
+
+# ---------- fila em duas etapas ----------
+# Até `workers` downloads simultâneos alimentam uma única etapa de instalação
+# (INSTALL_LOCK). Enquanto um pacote grande é instalado, os próximos já baixam.
+def run_install_pipeline(items, workers=2, limiter=None, on_state=None, cancel=None, **install_kwargs):
+    """Baixa e instala os itens ({"mod": ...}); grava item["state"] e item["result"].
+
+    on_state(item) é chamado a cada mudança de estado/progresso. Com cancel cancelado,
+    downloads e a instalação em andamento param no bloco seguinte e os itens não
+    concluídos voltam para "queued" (o .part fica para retomar). Os demais argumentos
+    vão para install_archive. Retorna o tempo total em segundos.
+    """
+    on_state = on_state or (lambda item: None)
+    cancel = cancel or CancelToken()
+    started = time.monotonic()
+    to_download = queue.Queue()
+    to_install = queue.Queue()
+    for it in items:
+        to_download.put(it)
+
+    def set_state(item, state, progress=""):
+        item["state"] = state
+        item["progress"] = progress
+        on_state(item)
+
+    def download_worker():
+        while not cancel.cancelled:
+            try:
+                item = to_download.get_nowait()
+            except queue.Empty:
+                return
+            mod = item["mod"]
+            set_state(item, "downloading")
+            try:
+                item["space"] = reserve_space(package_url(mod))
+            except InsufficientSpace as e:
+                write_log(f"{mod['name']}: {e}")
+                item["result"] = (False, str(e), {"error": str(e), "insufficient_space": True})
+                set_state(item, "failed")
+                continue
+            except Exception as e:
+                # sem estimativa (rede/Drive): segue; install_archive ainda confere antes de gravar
+                write_log(f"{mod['name']}: não foi possível planejar o espaço: {e}")
+            def on_progress(done, total, rate, eta, item=item):
+                amount = f"{done * 100 // total}%" if total else format_bytes(done)
+                set_state(item, "downloading", f"{amount} - {format_bytes(rate)}/s")
+            try:
+                item["archive"], item["delta"] = fetch_package(mod, progress=on_progress, limiter=limiter, cancel=cancel)
+            except Cancelled:
+                write_log(f"{mod['name']}: download cancelado (fila); o parcial fica para retomar.")
+                if "space" in item:
+                    release_space(item.pop("space"))
+                set_state(item, "queued")
+                continue
+            except Exception as e:
+                write_log(f"{mod['name']}: ERRO ao baixar (fila): {e}")
+                item["result"] = (False, f"Erro ao baixar: {e}", {"error": str(e)})
+                if "space" in item:
+                    release_space(item.pop("space"))
+                set_state(item, "failed")
+                continue
+            set_state(item, "downloaded")
+            to_install.put(item)
+
+    threads = [threading.Thread(target=download_worker, daemon=True) for _ in range(min(workers, len(items)))]
+    for t in threads:
+        t.start()
+
+    # etapa de instalação: um pacote por vez, na ordem em que os downloads terminam
+    while True:
+        try:
+            item = to_install.get(timeout=0.2)
+        except queue.Empty:
+            if not any(t.is_alive() for t in threads) and to_install.empty():
+                break
+            continue
+        mod = item["mod"]
+        try:
+            if cancel.cancelled:
+                set_state(item, "queued")
+                continue
+            set_state(item, "installing")
+            with INSTALL_LOCK:
+                result = install_archive(mod, item["archive"], cancel=cancel, delta=item.pop("delta", None), **install_kwargs)
+            if result[2].get("cancelled"):
+                set_state(item, "queued")
+                continue
+            item["result"] = result
+            set_state(item, "done" if result[0] else "failed")
+        finally:
+            release_archive(item.pop("archive"))
+            if "space" in item:
+                release_space(item.pop("space"))
+
+    return time.monotonic() - started
+
+# ---------- Baixar RAW (download sem instalar) ----------
+# O ZIP vai da rede direto para a pasta de destino: <destino>/.<id>.raw.part, com o
+# tamanho final pré-alocado e fsync no fim, vira o nome reservado com uma renomeação.
+# Nada passa pelo cache (RAW não é instalado), então não há segunda cópia entre volumes;
+# se o arquivo já estiver no cache, ele é ligado (hardlink) ou copiado de lá.
+# Vários RAW rodam ao mesmo tempo: cada um tem seu nome reservado e seu .part.
+
+def reserve_raw_path(mod, folder=None):
+    """Reserva em `folder` (padrão: Downloads) um nome livre para o ZIP bruto do mod.
+
+    O arquivo é criado vazio com O_EXCL: dois RAW simultâneos nunca recebem o mesmo
+    nome. Se o download não terminar, download_raw apaga a reserva.
+    """
+    folder = folder or DOWNLOADS_FOLDER
+    os.makedirs(folder, exist_ok=True)
+    base = mod.get("filename") or mod['name'].replace(" ", "_")
+    try:
+        taken = {name.lower() for name in os.listdir(folder)}
+    except OSError:
+        taken = set()
+    i = 0
+    while True:
+        name = f"{base}.zip" if i == 0 else f"{base}_{i}.zip"
+        i += 1
+        if name.lower() in taken:
+            continue
+        path = os.path.join(folder, name)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return path
+
+def raw_part_path(url, out_path):
+    # fixo por link e pasta: um RAW cancelado continua de onde parou na próxima vez
+    return os.path.join(os.path.dirname(os.path.abspath(out_path)), f".{cache_key_for(url)}.raw.part")
+
+def _copy_from_cache(src, dest):
+    # no mesmo volume um hardlink entrega o arquivo sem copiar nenhum byte
+    tmp = dest + ".ets2copy"
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+            with open(tmp, "rb+") as f:
+                os.fsync(f.fileno())
+        _move_into_place(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def download_raw(mod, out_path, progress=None, limiter=None, cancel=None):
+    """Baixa o arquivo do mod para out_path (de reserve_raw_path), sem instalar nada."""
+    url = mod['drive_link']
+    expect = catalog_integrity(mod)
+    try:
+        cached = cache_lookup(url, sha256=expect.get("sha256"))
+        if cached:
+            try:
+                _copy_from_cache(cached, out_path)
+            finally:
+                release_archive(cached)
+            write_log(f"RAW: {out_path} copiado do cache (mod {mod['name']})")
+            return out_path
+        part = raw_part_path(url, out_path)
+        resumed = _load_part_meta(part).get("done", 0) if os.path.exists(part) else 0
+        with log_span("raw", url=url, resumed=resumed) as span:
+            sha = robust_download(url, out_path, progress=progress, limiter=limiter, cancel=cancel,
+                                  expected_size=expect.get("size"), part_path=part, durable=True)
+            span["bytes"] = os.path.getsize(out_path) - resumed
+        if is_html_download(out_path):
+            raise DriveLinkError("O Drive devolveu uma página HTML no lugar do arquivo (permissão ou cota excedida?)")
+        try:
+            check_archive(out_path, expect, sha)
+        except IntegrityError as e:
+            write_log(f"RAW rejeitado ({url}): {e}")
+            raise
+    except BaseException:
+        # sai a reserva vazia ou o arquivo que não passou na conferência; o .part fica para retomar
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+        raise
+    write_log(f"RAW baixado para {out_path} (mod {mod['name']})")
+    return out_path
+
+# ---------- lista remota (mods.json) ----------
+# A última lista válida fica salva em CATALOG_CACHE_FILE; a versão do GitHub é
+# revalidada com GET condicional (ETag / If-Modified-Since).
+
+def load_cached_catalog():
+    try:
+        with open(CATALOG_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    return data if isinstance(data, list) else None
+
+def fetch_catalog():
+    """Baixa o mods.json com GET condicional; retorna None se não mudou desde a cópia salva."""
+    import requests
+    headers = {}
+    if os.path.exists(CATALOG_CACHE_FILE):
+        try:
+            with open(CATALOG_META_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception:
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    with log_span("catalog", url=JSON_URL) as span:
+        response = requests.get(JSON_URL, headers=headers, timeout=10)
+        span["bytes"] = len(response.content)
+        span["status"] = response.status_code
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    data = response.json()
+    if not isinstance(data, list):
+        raise ValueError("mods.json inválido (esperada uma lista de expansões)")
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    tmp = CATALOG_CACHE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, CATALOG_CACHE_FILE)
+    with open(CATALOG_META_FILE, "w", encoding="utf-8") as f:
+        json.dump({"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                   "fetched": datetime.now().isoformat(timespec="seconds")}, f)
+    return data
+
+# Campos opcionais de integridade numa entrada do mods.json:
+#   "size": 123456789, "sha256": "<hex>"                  -> arquivo baixado (o ZIP)
+#   "files": {"mod/pack.scs": "<hex>", ...}                 -> arquivos instalados
+# As chaves de "files" são relativas à pasta do jogo, como nos manifestos; o valor
+# também pode ser {"sha256": "<hex>", "size": n}. integrity_for_archive gera tudo a
+# partir do ZIP (python cli.py catalog-entry pacote.zip).
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+def _valid_sha256(value):
+    return isinstance(value, str) and SHA256_RE.match(value.lower()) is not None
+
+def catalog_integrity(mod):
+    """{"size", "sha256", "files"} de uma entrada do catálogo; valores inválidos são ignorados (com aviso no log)."""
+    name = mod.get("name", "?")
+    size = mod.get("size")
+    if size is not None and (not isinstance(size, int) or isinstance(size, bool) or size < 0):
+        write_log(f"Catálogo: 'size' inválido em {name}: {size!r}")
+        size = None
+    sha = mod.get("sha256")
+    if sha is not None and not _valid_sha256(sha):
+        write_log(f"Catálogo: 'sha256' inválido em {name}")
+        sha = None
+    files = {}
+    raw_files = mod.get("files") or {}
+    if not isinstance(raw_files, dict):
+        write_log(f"Catálogo: 'files' inválido em {name} (esperado um objeto)")
+        raw_files = {}
+    for key, value in raw_files.items():
+        record = {"sha256": value} if isinstance(value, str) else value
+        if not isinstance(record, dict) or not _valid_sha256(record.get("sha256")):
+            write_log(f"Catálogo: hash inválido para {key} em {name}")
+            continue
+        parts = split_zip_path(key)
+        if not parts:
+            continue
+        entry = {"sha256": record["sha256"].lower()}
+        if isinstance(record.get("size"), int):
+            entry["size"] = record["size"]
+        files["/".join(parts)] = entry
+    return {"size": size, "sha256": sha.lower() if sha else None, "files": files}
+
+def integrity_for_archive(path):
+    """Campos de integridade (size, sha256, files) para publicar o ZIP no catálogo."""
+    mods_key = InstallManifest.key_for(MODS_FOLDER)
+    profiles_key = InstallManifest.key_for(PROFILES_FOLDER)
+    files = {}
+    if not zipfile.is_zipfile(path):
+        # arquivo único (.scs direto no link): só size/sha256
+        return {"size": os.path.getsize(path), "sha256": hash_file(path), "files": files}
+    with zipfile.ZipFile(path) as zip_ref:
+        structure = classify_zip_entries(zip_ref)
+        for root, entries in ((mods_key, structure["mods_entries"]), (profiles_key, structure["profiles_entries"])):
+            for info, rel in entries:
+                if info.is_dir():
+                    continue
+                h = hashlib.sha256()
+                with zip_ref.open(info) as src:
+                    for block in iter(lambda: src.read(COPY_BUFFER_SIZE), b""):
+                        h.update(block)
+                files["/".join([root] + rel)] = {"sha256": h.hexdigest(), "size": info.file_size}
+    return {"size": os.path.getsize(path), "sha256": hash_file(path), "files": files}
@@ -1,419 +1,273 @@
 # ETS2 Mod Installer - Atualizado:
 # - Notifica se não encontrou pasta mods ou se ela estava vazia (0 mods encontrados)
-# - Botão "Baixar RAW" (baixa o ZIP para Downloads sem instalar; exige confirmação do usuário)
-# - Mantém: gdown-only, fila (Baixar Fila), logs, aba "Instalados", comportamento de mods/perfis pedidos anteriormente
-# Requer: pip install gdown
+# - Botão "Baixar RAW" (baixa o ZIP para Downloads sem instalar; exige confirmação; vários itens em paralelo, com cancelar/retomar)
+# - Instala direto do ZIP: cada entrada de mods/perfil é gravada uma única vez no destino final (sem extractall)
+# - Downloads retomáveis (.part + HTTP Range, novas tentativas com espera) com velocidade e tempo restante; gdown fica como alternativa
+# - Fila em duas etapas: vários downloads simultâneos (com limite de banda) e instalação um pacote por vez
+# - Cache de downloads por ID do Drive + sha256 (limite com LRU): reinstalar ou repetir um link não baixa de novo
+# - Manifesto por pacote (tamanho/mtime/CRC32): reinstalar só grava arquivos novos ou alterados
+# - Busca no catálogo indexada (sem acentos, por prefixo), com atraso na digitação e Treeview atualizado só nas diferenças
+# - Lista de expansões salva em disco e exibida na hora; revalidação em segundo plano (ETag/If-Modified-Since)
+# - Threads de trabalho não tocam no Tk: tudo passa pelo ui_bus (drenado a cada 50 ms, progresso coalescido, tempo de quadro no log)
+# - Motor sem interface em engine.py (catálogo, download, instalação) e linha de comando em cli.py (list/install/raw, JSON)
+# - Abertura rápida: janela primeiro; pastas, catálogo e gdown/requests só depois (ou no primeiro download); aba "Instalados" lida ao abrir
+# - Pré-visualizar conteúdo: pastas mods/perfil, contagens e tamanhos lidos só do central directory (remoto via HTTP Range)
+# - Antes de baixar: confere espaço livre (tamanho do download + total descompactado) no volume do cache e do jogo
+# - Instalação em transação: tudo preparado ao lado e aplicado com renomeações; perfis substituídos vão para backup (reflink/hardlink) e "Desfazer última instalação" volta ao estado anterior
+# - Cancelar de verdade: interrompe o download no meio (o .part fica para retomar), a extração e a cópia; a instalação cancelada é desfeita
+# - Integridade: size/sha256 (e hash por arquivo) opcionais no mods.json, conferidos enquanto os bytes chegam; "Verificar arquivos" relê mod/ em paralelo contra os manifestos
+# - Aba "Instalados" com os pacotes (índice montado dos manifestos, atualizado só nas diferenças) e "Remover pacote", que apaga só os arquivos do pacote (compartilhados ficam) e pode ser desfeito
+# - .scs iguais entre pacotes ficam uma vez só no disco (hardlink para um armazenamento por sha256); "Economizar espaço" faz o mesmo com o que já está em mod/
+# - Instalação em várias threads (um ZipFile por thread); .scs sem compressão copiados pelo kernel (copy_file_range/sendfile) quando o sistema permite
+# - Log em JSON (uma linha por evento) gravado em lote por uma thread, com rotação por tamanho; etapas medidas (catálogo, download, detect, extract, copy) e "python cli.py log-report"
+# - Conflito de perfis: política por perfil (manter, substituir ou mesclar); iguais não são regravados e o resumo mostra os bytes gravados
+# - Perfis na aba "Instalados" pelo nome do jogo (profile.sii em texto, cifrado ou binário): empresa, XP e último save, com busca e ordenação; índice em cache relê só o que mudou
+# - Mods na aba "Instalados" lidos de dentro do .scs (ZIP ou HashFS) sem extrair: nome e versão do manifest.sii, veículos e arquivos que dois mods sobrescrevem
+# - Atualização parcial: com "version" e "deltas" no mods.json, quem tem a versão anterior baixa só os arquivos alterados (senão, o pacote completo)
+# - Mantém: fila (Baixar Fila), logs, aba "Instalados", comportamento de mods/perfis pedidos anteriormente
+# Requer: pip install gdown (traz requests)
+
+import time
+STARTUP_STARTED = time.perf_counter()  # referência para o tempo até a primeira janela
 
 import os
-import json
 import threading
-import zipfile
-import shutil
+from collections import OrderedDict
+from concurrent.futures import Future
 import tkinter as tk
 from tkinter import messagebox, ttk
-import time
-import tempfile
-import ctypes
+import json
 import sys
-from datetime import datetime
-
-# tentar importar gdown (obrigatório para downloads)
-try:
-    import gdown
-    HAVE_GDOWN = True
-except Exception:
-    HAVE_GDOWN = False
-
-# ---------- Configs e pastas ----------
-def get_documents_folder():
-    if sys.platform.startswith("win"):
-        try:
-            _SHGetKnownFolderPath = ctypes.windll.shell32.SHGetKnownFolderPath
-            _SHGetKnownFolderPath.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_void_p, ctypes.POINTER(ctypes.c_wchar_p)]
-            _SHGetKnownFolderPath.restype = ctypes.c_long
-            buf = ctypes.c_wchar_p()
-            guid = ctypes.create_unicode_buffer("{FDD39AD0-238F-46AF-ADB4-6C85480369C7}")
-            res = _SHGetKnownFolderPath(ctypes.byref(guid), 0, 0, ctypes.byref(buf))
-            if res == 0 and buf.value:
-                return buf.value
-        except Exception:
-            pass
-    home = os.path.expanduser("~")
-    for candidate in ("Documents", "Documentos", "Meus Documentos"):
-        path = os.path.join(home, candidate)
-        if os.path.isdir(path):
-            return path
-    return os.path.join(home, "Documents")
-
-DOCUMENTS_FOLDER = get_documents_folder()
-EUROTRUCK_PATH = os.path.join(DOCUMENTS_FOLDER, "Euro Truck Simulator 2")
-MODS_FOLDER = os.path.join(EUROTRUCK_PATH, "mod")
-PROFILES_FOLDER = os.path.join(EUROTRUCK_PATH, "profiles")
-os.makedirs(MODS_FOLDER, exist_ok=True)
-os.makedirs(PROFILES_FOLDER, exist_ok=True)
-
-# Downloads folder (para "Baixar RAW")
-def get_downloads_folder():
-    home = os.path.expanduser("~")
-    # Windows generally has "Downloads", mac/linux usually also
-    for candidate in ("Downloads", "Download"):
-        d = os.path.join(home, candidate)
-        if os.path.isdir(d):
-            return d
-    # fallback para home
-    return home
-
-DOWNLOADS_FOLDER = get_downloads_folder()
-
-LOG_FOLDER = os.path.join(DOCUMENTS_FOLDER, "ets2_installer_logs")
-os.makedirs(LOG_FOLDER, exist_ok=True)
-LOG_FILE = os.path.join(LOG_FOLDER, datetime.now().strftime("log_%Y%m%d_%H%M%S.txt"))
-
-def write_log(line: str):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    entry = f"[{ts}] {line}\n"
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(entry)
-    except Exception:
-        pass
 
-JSON_URL = "https://raw.githubusercontent.com/DIY-Steering-Wheel/ETS__mod_hub/refs/heads/main/mods.json"
+from catalog import CatalogView
+from profiles import PROFILE_COLUMNS, ProfileView
+from scs import MOD_COLUMNS, ModView, describe_mod
+from engine import (
+    HAVE_GDOWN, INSTALL_LOCK, LOG_FOLDER, MODS_FOLDER, PROFILES_FOLDER,
+    BandwidthLimiter, CancelToken, Cancelled, InsufficientSpace, clear_download_cache, dedupe_mods, describe_download_progress, describe_layout,
+    download_raw, ensure_folders, fetch_catalog, fetch_package, format_bytes, format_eta, install_archive,
+    inspect_mods, installed_index, list_profiles, list_transactions, load_cached_catalog, preview_archive, recover_transactions, release_archive,
+    package_url, release_space, require_gdown_or_fail, reserve_raw_path, reserve_space, rollback_last,
+    run_install_pipeline, uninstall_package, verify_installed, write_log,
+)
 
-DOWNLOADING = False
-cancel_flag = False
 mods_list = []
 
 # fila
 install_queue = []
 queue_running = False
-queue_stop_requested = False
-
-# ---------- util gdown ----------
-def require_gdown_or_fail():
-    if not HAVE_GDOWN:
-        msg = ("O 'gdown' não está instalado neste sistema. Instale com:\n\npip install gdown\n\n"
-               "Este instalador foi configurado para usar SOMENTE gdown para downloads.")
-        write_log("gdown ausente: downloads bloqueados.")
-        try:
-            messagebox.showerror("gdown ausente", msg)
-        except Exception:
-            pass
-        raise RuntimeError("gdown não instalado")
-
-def robust_download_with_gdown(url, out_path):
-    require_gdown_or_fail()
-    try:
-        result = gdown.download(url, out_path, quiet=True, fuzzy=True)
-        if result is None and os.path.exists(out_path) and os.path.getsize(out_path) > 0:
-            return True
-        if result is not None and os.path.exists(result) and os.path.getsize(result) > 0:
-            if os.path.abspath(result) != os.path.abspath(out_path):
-                try:
-                    shutil.move(result, out_path)
-                except Exception:
-                    write_log(f"gdown salvou em {result}, não foi possível mover para {out_path}.")
-            return True
-        raise RuntimeError("gdown não retornou arquivo válido (arquivo ausente ou vazio).")
-    except Exception as e:
-        write_log(f"robust_download_with_gdown falhou para URL {url}: {e}")
-        raise
-
-# ---------- detectar/operar sobre mods/profiles ----------
-def detect_named_folders(extracted_root):
-    mods_dirs = []
-    profiles_dirs = []
-    for root_dir, dirs, files in os.walk(extracted_root):
-        for d in dirs:
-            lower = d.lower()
-            full = os.path.join(root_dir, d)
-            if lower in ("mods", "mod"):
-                if full not in mods_dirs:
-                    mods_dirs.append(full)
-            if lower in ("perfil", "profile", "profiles"):
-                if full not in profiles_dirs:
-                    profiles_dirs.append(full)
-    return {"mods_dirs": mods_dirs, "profiles_dirs": profiles_dirs}
-
-def copy_mods_from_dirs(mods_dirs):
-    copied = {"mods_files": [], "mods_folders": []}
-    total_items = 0
-    for mods_root in mods_dirs:
-        try:
-            items = os.listdir(mods_root)
-        except Exception:
-            items = []
-        total_items += len(items)
-        for item in items:
-            src = os.path.join(mods_root, item)
-            dest = os.path.join(MODS_FOLDER, item)
+queue_cancel = None  # CancelToken da execução atual da fila
+
+# ---------- ponte entre threads de trabalho e o Tk ----------
+# Threads de download/instalação nunca chamam o Tk: publicam chamadas no ui_bus e
+# a thread principal as executa a cada UI_TICK_MS. Atualizações de progresso usam
+# uma chave e, entre dois ticks, só a mais recente de cada chave é executada.
+UI_TICK_MS = 50
+UI_STATS_INTERVAL = 30.0  # segundos entre resumos de tempo de quadro no log
+
+class UIBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._seq = 0
+        self.root = None
+        # instrumentação: atraso de cada tick (= quanto a thread do Tk ficou ocupada) e tempo de drenagem
+        self._lateness = []
+        self._drain = []
+        self._calls = 0
+        self._coalesced = 0
+        self._stats_since = time.monotonic()
+
+    def post(self, fn, *args):
+        """Agenda fn(*args) na thread do Tk (ordem preservada)."""
+        with self._lock:
+            self._seq += 1
+            self._pending[("call", self._seq)] = (fn, args)
+
+    def post_latest(self, key, fn, *args):
+        """Como post, mas substitui a chamada ainda pendente com a mesma chave."""
+        with self._lock:
+            if key in self._pending:
+                self._coalesced += 1
+                del self._pending[key]
+            self._pending[key] = (fn, args)
+
+    def ask(self, fn, *args):
+        """Executa fn na thread do Tk e espera o resultado (para perguntas ao usuário)."""
+        future = Future()
+        def run():
             try:
-                if os.path.isdir(src):
-                    shutil.copytree(src, dest, dirs_exist_ok=True)
-                    copied["mods_folders"].append(dest)
-                    write_log(f"Copiado diretório de mod: {dest}")
-                else:
-                    shutil.copy2(src, dest)
-                    copied["mods_files"].append(dest)
-                    write_log(f"Copiado arquivo de mod: {dest}")
+                future.set_result(fn(*args))
             except Exception as e:
-                write_log(f"ERRO ao copiar mod {src} -> {dest}: {e}")
-    copied["total_items"] = total_items
-    return copied
-
-def prepare_profiles_copy_list(profiles_dirs):
-    to_copy = []
-    for p_root in profiles_dirs:
-        for item in os.listdir(p_root):
-            src = os.path.join(p_root, item)
-            dest = os.path.join(PROFILES_FOLDER, item)
-            is_dir = os.path.isdir(src)
-            exists = os.path.exists(dest)
-            to_copy.append({"src": src, "dest": dest, "is_dir": is_dir, "exists": exists, "container_name": os.path.basename(p_root)})
-    return to_copy
-
-def copy_profiles_with_decision(to_copy, overwrite=False):
-    copied = []
-    skipped = []
-    errors = []
-    for item in to_copy:
-        src = item["src"]
-        dest = item["dest"]
-        try:
-            if item["is_dir"]:
-                if os.path.exists(dest):
-                    if overwrite:
-                        # backup optional (not implemented) - here we simply remove then copy
-                        try:
-                            shutil.rmtree(dest)
-                        except Exception:
-                            pass
-                        shutil.copytree(src, dest, dirs_exist_ok=True)
-                        copied.append(dest)
-                        write_log(f"Substituído profile (diretório): {dest}")
-                    else:
-                        skipped.append(dest)
-                        write_log(f"Ignorado profile (já existe): {dest}")
-                else:
-                    shutil.copytree(src, dest, dirs_exist_ok=True)
-                    copied.append(dest)
-                    write_log(f"Copiado profile (diretório): {dest}")
-            else:
-                if os.path.exists(dest):
-                    if overwrite:
-                        shutil.copy2(src, dest)
-                        copied.append(dest)
-                        write_log(f"Substituído arquivo de profile: {dest}")
-                    else:
-                        skipped.append(dest)
-                        write_log(f"Ignorado arquivo de profile (já existe): {dest}")
-                else:
-                    shutil.copy2(src, dest)
-                    copied.append(dest)
-                    write_log(f"Copiado arquivo de profile: {dest}")
-        except Exception as e:
-            errors.append({"src": src, "dest": dest, "error": str(e)})
-            write_log(f"ERRO ao copiar profile {src} -> {dest}: {e}")
-    return {"copied": copied, "skipped": skipped, "errors": errors}
+                future.set_exception(e)
+        self.post(run)
+        return future.result()
+
+    def start(self, root):
+        self.root = root
+        self._expected = time.perf_counter() + UI_TICK_MS / 1000.0
+        root.after(UI_TICK_MS, self._tick)
+
+    def _tick(self):
+        started = time.perf_counter()
+        self._lateness.append(max(0.0, started - self._expected))
+        # agenda o próximo tick antes de drenar: um messagebox aberto aqui roda um
+        # loop de eventos próprio e o barramento continua andando enquanto isso
+        self._expected = started + UI_TICK_MS / 1000.0
+        self.root.after(UI_TICK_MS, self._tick)
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+        for fn, args in batch:
+            try:
+                fn(*args)
+            except tk.TclError:
+                pass  # widget já destruído (modal fechado)
+            except Exception as e:
+                write_log(f"UI: erro em {getattr(fn, '__name__', fn)}: {e}")
+        self._calls += len(batch)
+        self._drain.append(time.perf_counter() - started)
+        if started - self._stats_since >= UI_STATS_INTERVAL:
+            self._log_stats(started)
+
+    def _log_stats(self, now):
+        if self._calls:
+            late = sorted(self._lateness)
+            write_log(f"UI: {len(late)} ticks, atraso médio {sum(late) / len(late) * 1000:.1f} ms, "
+                      f"p95 {late[int(len(late) * 0.95)] * 1000:.1f} ms, máx {late[-1] * 1000:.1f} ms; "
+                      f"drenagem máx {max(self._drain) * 1000:.1f} ms; {self._calls} chamadas, {self._coalesced} coalescidas")
+        self._lateness, self._drain = [], []
+        self._calls = self._coalesced = 0
+        self._stats_since = now
+
+ui_bus = UIBus()
+
+def ui_set(var, value):
+    ui_bus.post_latest(("var", str(var)), var.set, value)
+
+def _bar_busy(bar):
+    bar.config(mode="indeterminate")
+    bar.start(12)
+
+def _bar_value(bar, value):
+    if str(bar["mode"]) != "determinate":
+        bar.stop()
+        bar.config(mode="determinate", maximum=100)
+    bar["value"] = value
+
+def ui_bar_busy(bar):
+    ui_bus.post_latest(("bar", str(bar)), _bar_busy, bar)
+
+def ui_bar_value(bar, value):
+    ui_bus.post_latest(("bar", str(bar)), _bar_value, bar, value)
+
+PROFILE_POLICY_LABELS = {
+    "keep": "Manter o atual",
+    "replace": "Substituir pelo do pacote",
+    "merge": "Mesclar (só o que mudou; saves mais novos ficam)",
+}
+PROFILE_DIALOG_MAX_ROWS = 20  # os demais perfis seguem uma escolha única
 
 def ask_overwrite_profiles(conflicting_names):
-    text = "Foram encontrados perfis com os mesmos nomes já instalados:\n\n"
-    text += "\n".join(conflicting_names[:20])
-    if len(conflicting_names) > 20:
-        text += f"\n... (+{len(conflicting_names)-20} outros)\n"
-    text += "\n\nDeseja substituir os perfis existentes? (Sim = substituir, Não = preservar existentes)"
-    return messagebox.askyesno("Conflito de Profiles", text)
+    """Janela com uma política por perfil; retorna {nome: política} (fechar = manter todos)."""
+    dlg = tk.Toplevel(root)
+    dlg.title("Conflito de Profiles")
+    dlg.transient(root)
+    dlg.grab_set()
+    tk.Label(dlg, text="Estes perfis já existem. Escolha o que fazer com cada um:",
+             anchor="w", justify="left").pack(fill="x", padx=10, pady=(10, 4))
+    frame = tk.Frame(dlg)
+    frame.pack(fill="both", expand=True, padx=10)
+    by_label = {label: policy for policy, label in PROFILE_POLICY_LABELS.items()}
+    shown = conflicting_names[:PROFILE_DIALOG_MAX_ROWS]
+    rest = conflicting_names[PROFILE_DIALOG_MAX_ROWS:]
+    rows = [(name, [name]) for name in shown]
+    if rest:
+        rows.append((f"Demais perfis (+{len(rest)})", rest))
+    choices = []
+    for row, (label, names) in enumerate(rows):
+        tk.Label(frame, text=label, anchor="w").grid(row=row, column=0, sticky="w", pady=2)
+        var = tk.StringVar(value=PROFILE_POLICY_LABELS["keep"])
+        ttk.Combobox(frame, textvariable=var, values=list(by_label), state="readonly",
+                     width=44).grid(row=row, column=1, padx=6, pady=2)
+        choices.append((names, var))
+    result = {}
+
+    def apply():
+        for names, var in choices:
+            result.update(dict.fromkeys(names, by_label[var.get()]))
+        dlg.destroy()
+
+    tk.Button(dlg, text="Aplicar", command=apply).pack(pady=8)
+    dlg.protocol("WM_DELETE_WINDOW", dlg.destroy)
+    root.wait_window(dlg)
+    return result
 
 # ---------- download + instalação (thread) ----------
-def download_and_install(mod, status_text, modal, progress_bar, cancel_btn, on_complete=None):
-    global DOWNLOADING, cancel_flag
-    if DOWNLOADING:
-        if on_complete:
-            try: root.after(0, lambda: on_complete(False, "Já existe um download em andamento", {}))
-            except: pass
-        return
-
-    DOWNLOADING = True
-    cancel_flag = False
-    tmp_dir = tempfile.mkdtemp(prefix="ets2_mod_")
-    temp_zip = os.path.join(tmp_dir, "temp_mod_download")
+def notify_user(kind, title, text):
+    """notify de install_archive para a janela: mostra a mensagem na thread do Tk."""
+    show = messagebox.showerror if kind == "error" else messagebox.showinfo
+    ui_bus.post(show, title, text)
+
+def ask_overwrite_from_worker(conflicts):
+    # a pergunta roda na thread do Tk; só a thread de instalação espera a resposta
+    return ui_bus.ask(ask_overwrite_profiles, conflicts)
+
+def download_and_install(mod, status_text, modal, progress_bar, cancel, on_complete=None):
+    archive = None
+    delta = None
+    space = None
     success = False
     info = ""
     details = {}
 
     try:
-        status_text.set(f"Baixando {mod['name']} (gdown)...")
-        try: root.update_idletasks()
-        except: pass
+        ui_set(status_text, f"Conferindo espaço em disco para {mod['name']}...")
+        try:
+            space = reserve_space(package_url(mod))
+        except InsufficientSpace as e:
+            ui_set(status_text, "Espaço em disco insuficiente")
+            write_log(f"{mod['name']}: {e}")
+            info = str(e)
+            details = {"error": str(e), "insufficient_space": True}
+            return
+        except Exception as e:
+            # sem estimativa (rede/Drive): segue; install_archive ainda confere antes de gravar
+            write_log(f"{mod['name']}: não foi possível planejar o espaço: {e}")
 
+        ui_set(status_text, f"Baixando {mod['name']}...")
         # animar
-        try:
-            progress_bar.config(mode='indeterminate')
-            progress_bar.start(12)
-        except:
-            pass
+        ui_bar_busy(progress_bar)
 
         try:
-            robust_download_with_gdown(mod['drive_link'], temp_zip)
+            archive, delta = fetch_package(mod,
+                                           progress=make_download_progress(f"Baixando {mod['name']}", status_text, progress_bar),
+                                           cancel=cancel)
+        except Cancelled:
+            ui_set(status_text, "Download cancelado (o parcial foi mantido para retomar)")
+            write_log(f"{mod['name']}: CANCELADO durante o download")
+            details = {"cancelled": True}
+            return
         except Exception as e:
-            status_text.set("Erro ao baixar arquivo (gdown)")
-            write_log(f"{mod['name']}: ERRO ao baixar com gdown: {e}")
+            ui_set(status_text, "Erro ao baixar arquivo (o download parcial foi mantido para retomar)")
+            write_log(f"{mod['name']}: ERRO ao baixar: {e}")
             details = {"error": str(e)}
             success = False
             return
 
-        try:
-            progress_bar.stop()
-            progress_bar.config(mode='determinate')
-            progress_bar["value"] = 0
-        except:
-            pass
-
-        if cancel_flag:
-            status_text.set("Operação cancelada")
-            write_log(f"{mod['name']}: CANCELADO (após download)")
-            details = {"cancelled": True}
-            success = False
-            return
-
-        status_text.set("Extraindo...")
-        try: root.update_idletasks()
-        except: pass
+        ui_bar_value(progress_bar, 0)
 
-        extracted = False
+        if not INSTALL_LOCK.acquire(blocking=False):
+            ui_set(status_text, "Aguardando a instalação em andamento terminar...")
+            INSTALL_LOCK.acquire()
         try:
-            with zipfile.ZipFile(temp_zip, 'r') as zip_ref:
-                zip_ref.extractall(tmp_dir)
-                extracted = True
-        except zipfile.BadZipFile:
-            write_log(f"{mod['name']}: Arquivo não é zip. Tentando salvar como arquivo único em mod/")
-            try:
-                with open(temp_zip, "rb") as f:
-                    head = f.read(4096)
-                head_text = head.decode('utf-8', errors='ignore').strip().lower()
-            except Exception:
-                head_text = ""
-            if head_text.startswith("<!doctype") or head_text.startswith("<html") or "drive.google.com" in head_text:
-                saved = os.path.join(LOG_FOLDER, f"{mod['name']}_raw.html")
-                try:
-                    shutil.copy2(temp_zip, saved)
-                    write_log(f"{mod['name']}: Conteúdo HTML salvo em {saved}")
-                except Exception:
-                    pass
-                messagebox.showerror("Erro", f"O arquivo baixado para '{mod['name']}' parece ser uma página HTML (erro/permissão). Verifique o link no Drive.")
-                details = {"html_saved": saved}
-                success = False
-                return
-            else:
-                guessed = (mod.get("filename") or mod['name'].replace(" ", "_")) + ".scs"
-                dest = os.path.join(MODS_FOLDER, guessed)
-                if os.path.exists(dest):
-                    base, ext = os.path.splitext(guessed)
-                    i = 1
-                    while True:
-                        cand = f"{base}_{i}{ext}"
-                        if not os.path.exists(os.path.join(MODS_FOLDER, cand)):
-                            dest = os.path.join(MODS_FOLDER, cand)
-                            break
-                        i += 1
-                try:
-                    shutil.copy2(temp_zip, dest)
-                    write_log(f"{mod['name']}: Arquivo não-zip salvo em mod/: {dest}")
-                    status_text.set("Arquivo não-zip salvo em mod/")
-                    details = {"saved_as": dest}
-                    success = True
-                    return
-                except Exception as e:
-                    write_log(f"{mod['name']}: Falha ao salvar não-zip: {e}")
-                    details = {"error_save": str(e)}
-                    success = False
-                    return
-
-        # se extraído, detectar estrutura
-        structure = detect_named_folders(tmp_dir)
-        mods_dirs = structure["mods_dirs"]
-        profiles_dirs = structure["profiles_dirs"]
-
-        # Se não encontrou nenhuma pasta 'mods', avisar e marcar 0 mods encontrados (mensagem + log)
-        mods_detected_count = 0
-        copied_mods_info = {}
-        if not mods_dirs:
-            write_log(f"{mod['name']}: Nenhuma pasta 'mods' encontrada no pacote.")
-            # vamos definir explicitamente 0 mods encontrados no resumo
-            mods_detected_count = 0
-        else:
-            # contar itens dentro das pastas mods para saber se está vazia
-            copied_mods_info = copy_mods_from_dirs(mods_dirs)
-            mods_detected_count = copied_mods_info.get("total_items", 0)
-            if mods_detected_count == 0:
-                # pasta 'mods' encontrada mas vazia
-                write_log(f"{mod['name']}: Pasta 'mods' encontrada mas vazia.")
-                # user notification
-                try:
-                    messagebox.showinfo("Mods vazios", f"O pacote '{mod['name']}' contém uma pasta 'mods', mas ela está vazia (0 mods encontrados).")
-                except Exception:
-                    pass
-
-        # processar profiles conforme regras
-        profiles_result = {"copied": [], "skipped": [], "errors": []}
-        if profiles_dirs:
-            profile_copy_plan = prepare_profiles_copy_list(profiles_dirs)
-            conflicts = [os.path.basename(x["dest"]) for x in profile_copy_plan if x["exists"]]
-            if conflicts:
-                decision_event = threading.Event()
-                decision = {"overwrite": False}
-                def ask_on_main():
-                    try:
-                        ans = ask_overwrite_profiles(conflicts)
-                        decision["overwrite"] = bool(ans)
-                    except Exception:
-                        decision["overwrite"] = False
-                    finally:
-                        decision_event.set()
-                try:
-                    root.after(0, ask_on_main)
-                except Exception:
-                    decision["overwrite"] = False
-                    decision_event.set()
-                decision_event.wait()
-                overwrite = decision["overwrite"]
-            else:
-                overwrite = False
-            profiles_result = copy_profiles_with_decision(profile_copy_plan, overwrite=overwrite)
-        else:
-            # nenhuma pasta de profiles encontrada
-            write_log(f"{mod['name']}: Nenhuma pasta 'perfil' encontrada no pacote.")
-
-        # compor resumo e mensagens finais
-        parts = []
-        # mods resumo
-        if mods_dirs:
-            # se pasta mods existia mas vazia -> registrar 0 mods
-            if mods_detected_count == 0:
-                parts.append("0 mods encontrados (pasta mods vazia)")
-            else:
-                parts.append(f"{mods_detected_count} itens copiados para mod/")
-        else:
-            parts.append("0 mods encontrados (nenhuma pasta 'mods' no pacote)")
-
-        # profiles resumo
-        if profiles_result.get("copied"):
-            parts.append(f"{len(profiles_result['copied'])} profiles copiados")
-        if profiles_result.get("skipped"):
-            parts.append(f"{len(profiles_result['skipped'])} profiles ignorados (não substituídos)")
-        if profiles_result.get("errors"):
-            parts.append(f"{len(profiles_result['errors'])} erros ao copiar profiles")
-
-        info = " / ".join(parts)
-        write_log(f"{mod['name']}: Resultado - {info}")
-        # notificar usuário com resumo
-        try:
-            messagebox.showinfo("Resumo da Instalação", f"{mod['name']}: {info}")
-        except Exception:
-            pass
-
-        success = True
-        details = {"mods": copied_mods_info, "profiles": profiles_result}
+            success, info, details = install_archive(mod, archive,
+                                                     status=lambda text: ui_set(status_text, text),
+                                                     progress=lambda pct: ui_bar_value(progress_bar, pct),
+                                                     notify=notify_user, ask_overwrite=ask_overwrite_from_worker,
+                                                     cancel=cancel, delta=delta)
+        finally:
+            INSTALL_LOCK.release()
 
     except Exception as e:
         write_log(f"{mod['name']}: ERRO inesperado - {e}")
@@ -421,26 +275,13 @@ def download_and_install(mod, status_text, modal, progress_bar, cancel_btn, on_c
         info = f"Erro inesperado: {e}"
         details = {"exception": str(e)}
     finally:
-        try:
-            if os.path.exists(temp_zip):
-                os.remove(temp_zip)
-        except:
-            pass
-        try:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-        except:
-            pass
-        DOWNLOADING = False
-        cancel_flag = False
-        try:
-            root.after(0, lambda: modal.destroy())
-        except:
-            pass
+        if archive:
+            release_archive(archive)
+        if space:
+            release_space(space)
+        ui_bus.post(modal.destroy)
         if on_complete:
-            try:
-                root.after(0, lambda: on_complete(success, info, details))
-            except:
-                pass
+            ui_bus.post(on_complete, success, info, details)
 
 # ---------- Baixar RAW (download sem instalar) ----------
 def baixar_raw_for_selected():
@@ -448,11 +289,8 @@ def baixar_raw_for_selected():
     if not sel:
         messagebox.showinfo("Selecionar", "Escolha uma expansão para baixar o RAW.")
         return
-    if len(sel) > 1:
-        messagebox.showinfo("Selecionar", "Selecione apenas um item para 'Baixar RAW' por vez.")
-        return
-    idx = int(sel[0])
-    mod = mods_list[idx]
+    mods = [mods_list[int(i)] for i in sel]
+    names = ", ".join(m["name"] for m in mods)
 
     # Termos / aviso
     terms = (
@@ -462,65 +300,132 @@ def baixar_raw_for_selected():
         "- Este botão SOMENTE FAZ O DOWNLOAD do arquivo ZIP para a sua pasta Downloads.\n"
         "- O instalador NÃO fará nenhuma ação automática com esse arquivo (não extrai, não copia nada).\n"
         "- Você será responsável por inspecionar/manipular o arquivo manualmente.\n\n"
+        f"Itens: {names}\n\n"
         "Deseja continuar e baixar o arquivo RAW para sua pasta Downloads?"
     )
     ok = messagebox.askyesno("Confirmar download RAW", terms)
     if not ok:
-        write_log(f"Baixar RAW cancelado pelo usuário para {mod['name']}")
+        write_log(f"Baixar RAW cancelado pelo usuário para {names}")
         return
 
-    require_gdown_or_fail()
-    out_name = (mod.get("filename") or mod['name'].replace(" ", "_")) + ".zip"
-    out_path = os.path.join(DOWNLOADS_FOLDER, out_name)
-
-    if os.path.exists(out_path):
-        base, ext = os.path.splitext(out_name)
-        i = 1
-        while True:
-            candidate = f"{base}_{i}{ext}"
-            if not os.path.exists(os.path.join(DOWNLOADS_FOLDER, candidate)):
-                out_path = os.path.join(DOWNLOADS_FOLDER, candidate)
-                break
-            i += 1
-
-    # Modal
-    modal = tk.Toplevel(root)
-    modal.title(f"Baixando RAW: {mod['name']}")
-    modal.geometry("420x140")
-    modal.transient(root)
-    modal.grab_set()
+    try:
+        require_gdown_or_fail()
+    except RuntimeError as e:
+        messagebox.showerror("gdown ausente", str(e))
+        return
+    # cada item ganha a sua janela (sem grab_set) e a sua thread: vários RAW
+    # baixam juntos sem travar a fila de instalação nem o resto da interface
+    for mod in mods:
+        start_raw_download(mod)
+
+def start_raw_download(mod):
+    out_path = reserve_raw_path(mod)
+
+    win = tk.Toplevel(root)
+    win.title(f"Baixando RAW: {mod['name']}")
+    win.geometry("420x160")
+    win.transient(root)
 
-    status_text = tk.StringVar(value="Inicializando download RAW...")
-    label = tk.Label(modal, textvariable=status_text, wraplength=380)
+    status_text = tk.StringVar(value=f"Inicializando download RAW...\n{out_path}")
+    label = tk.Label(win, textvariable=status_text, wraplength=380)
     label.pack(pady=8)
-    prog = ttk.Progressbar(modal, orient="horizontal", length=360, mode="indeterminate")
+    prog = ttk.Progressbar(win, orient="horizontal", length=360, mode="determinate")
     prog.pack(pady=6)
-    prog.start(10)
 
-    # botão fechar inicial escondido
-    close_btn = tk.Button(modal, text="Fechar", state="disabled", command=modal.destroy)
-    close_btn.pack(pady=6)
+    cancel = CancelToken()
+    def on_button():
+        if btn["text"] == "Fechar":
+            win.destroy()
+            return
+        cancel.cancel()
+        status_text.set("Cancelando... (o que já foi baixado fica guardado para retomar)")
+    btn = tk.Button(win, text="Cancelar", command=on_button)
+    btn.pack(pady=6)
+    win.protocol("WM_DELETE_WINDOW", lambda: (cancel.cancel(), win.destroy()))
 
     def do_download_raw():
         try:
-            robust_download_with_gdown(mod['drive_link'], out_path)
-            write_log(f"RAW baixado para {out_path} (mod {mod['name']})")
-            prog
-            root.after(0, lambda: status_text.set(f"Download concluído!\nArquivo salvo em:\n{out_path}"))
+            download_raw(mod, out_path, progress=make_download_progress("Baixando RAW", status_text, prog), cancel=cancel)
+            ui_set(status_text, f"Download concluído!\nArquivo salvo em:\n{out_path}")
+            ui_bar_value(prog, 100)
+        except Cancelled:
+            write_log(f"Baixar RAW cancelado durante o download de {mod['name']}")
+            ui_set(status_text, "Download cancelado. Clique em 'Baixar RAW' de novo para continuar de onde parou.")
         except Exception as e:
             write_log(f"Erro no Baixar RAW para {mod['name']}: {e}")
-            root.after(0, lambda: status_text.set(f"Erro: {e}"))
+            ui_set(status_text, f"Erro: {e}")
         finally:
-            prog["mode"] = "determinate"  # muda para modo determinado
-            prog["value"] = 100           # barra cheia
-            # habilitar botão fechar
-            root.after(0, lambda: close_btn.config(state="normal"))
-
+            ui_bus.post(lambda: btn.config(text="Fechar"))
 
     threading.Thread(target=do_download_raw, daemon=True).start()
 
 
+# ---------- Pré-visualizar conteúdo (sem instalar) ----------
+PREVIEW_MAX_ROWS = 500  # por grupo
+
+def preview_selected():
+    sel = tree.selection()
+    if len(sel) != 1:
+        messagebox.showinfo("Selecionar", "Escolha uma expansão para pré-visualizar.")
+        return
+    mod = mods_list[int(sel[0])]
+
+    win = tk.Toplevel(root)
+    win.title(f"Conteúdo: {mod['name']}")
+    win.geometry("560x420")
+    win.transient(root)
+    status_text = tk.StringVar(value="Lendo o índice do pacote...")
+    tk.Label(win, textvariable=status_text, justify="left", anchor="w", wraplength=520).pack(fill="x", padx=8, pady=6)
+    prog = ttk.Progressbar(win, orient="horizontal", length=520, mode="determinate")
+    prog.pack(padx=8)
+    content = ttk.Treeview(win, columns=("Tamanho",), show="tree headings")
+    content.heading("#0", text="Item")
+    content.heading("Tamanho", text="Arquivos / tamanho")
+    content.column("Tamanho", width=160, anchor="e")
+    content.pack(fill="both", expand=True, padx=8, pady=6)
+
+    def show(layout):
+        prog.pack_forget()
+        source = {"remote": "índice remoto, " + format_bytes(layout.get("bytes_read", 0)) + " lidos",
+                  "cache": "arquivo em cache", "download": "arquivo baixado"}[layout["source"]]
+        status_text.set(f"{describe_layout(layout)}\nPacote: {format_bytes(layout['archive_bytes'])} ({source})")
+        for key, label in (("mods", "Mods -> mod/"), ("profiles", "Perfis -> profiles/")):
+            part = layout[key]
+            node = content.insert("", "end", text=label, open=True,
+                                  values=(f"{part['files']} / {format_bytes(part['bytes'])}",))
+            for name in part["top_level"][:PREVIEW_MAX_ROWS]:
+                content.insert(node, "end", text=name)
+            if len(part["top_level"]) > PREVIEW_MAX_ROWS:
+                content.insert(node, "end", text=f"... (+{len(part['top_level']) - PREVIEW_MAX_ROWS} outros)")
+        ignored = layout["ignored"]
+        if ignored["files"]:
+            node = content.insert("", "end", text="Ignorados (fora de mods/perfil)",
+                                  values=(f"{ignored['files']} / {format_bytes(ignored['bytes'])}",))
+            for name in ignored["sample"]:
+                content.insert(node, "end", text=name)
+
+    def worker():
+        try:
+            layout = preview_archive(mod['drive_link'], progress=make_download_progress("Baixando para ler o conteúdo", status_text, prog))
+        except Exception as e:
+            write_log(f"Pré-visualização de {mod['name']} falhou: {e}")
+            ui_set(status_text, f"Não foi possível ler o conteúdo: {e}")
+            return
+        write_log(f"Pré-visualização de {mod['name']} ({layout['source']}): {layout['mods']['files']} arquivos de mods, "
+                  f"{layout['profiles']['files']} de perfis, {format_bytes(layout['install_bytes'])} a gravar")
+        ui_bus.post(show, layout)
+
+    threading.Thread(target=worker, daemon=True).start()
+
 # ---------- UI helpers (similar anteriores) ----------
+def make_download_progress(prefix, status_text, progress_bar):
+    """Callback de progresso do download que atualiza o modal via ui_bus."""
+    def update(done, total, rate, eta):
+        if total:
+            ui_bar_value(progress_bar, done * 100.0 / total)
+        ui_set(status_text, f"{prefix}\n{describe_download_progress(done, total, rate, eta)}")
+    return update
+
 def create_modal_for_mod(mod):
     modal = tk.Toplevel(root)
     modal.title(f"Instalando {mod['name']}")
@@ -538,18 +443,54 @@ def create_modal_for_mod(mod):
     label.pack(pady=8)
     progress_bar = ttk.Progressbar(modal, orient="horizontal", length=420, mode="determinate")
     progress_bar.pack(pady=6)
+    cancel = CancelToken()
     def cancel_operation():
-        global cancel_flag
-        cancel_flag = True
+        # interrompe a leitura em andamento; o worker fecha o modal quando terminar de desfazer
+        cancel.cancel()
         status_text.set("Cancelando...")
     cancel_btn = tk.Button(modal, text="Cancelar", command=cancel_operation)
     cancel_btn.pack(pady=8)
     modal._status_text = status_text
     modal._progress_bar = progress_bar
     modal._cancel_btn = cancel_btn
+    modal._cancel = cancel
     return modal
 
-# ---------- fila / controles (mesmo) ----------
+# ---------- fila / controles ----------
+# A fila roda em duas etapas: até QUEUE_DOWNLOAD_WORKERS downloads simultâneos
+# alimentam uma única thread de instalação (INSTALL_LOCK). Enquanto um pacote
+# grande é instalado, os próximos itens já estão baixando.
+QUEUE_DOWNLOAD_WORKERS = 2
+QUEUE_BANDWIDTH_LIMIT_MB = 0  # MB/s somados entre os downloads da fila (0 = sem limite)
+
+QUEUE_STATE_LABELS = {
+    "queued": "na fila",
+    "downloading": "baixando",
+    "downloaded": "aguardando instalação",
+    "installing": "instalando",
+    "done": "concluído",
+    "failed": "falhou",
+}
+
+def queue_item_label(item):
+    label = QUEUE_STATE_LABELS[item["state"]]
+    if item.get("progress"):
+        label += f" {item['progress']}"
+    return f"[{label}] {item['mod']['name']}"
+
+def refresh_queue_row(item):
+    # chamado na thread do Tk; procura por identidade (o mesmo mod pode estar duas vezes na fila)
+    for idx, it in enumerate(install_queue):
+        if it is item:
+            queue_listbox.delete(idx)
+            queue_listbox.insert(idx, queue_item_label(item))
+            return
+
+def set_queue_state(item, state, progress=""):
+    item["state"] = state
+    item["progress"] = progress
+    ui_bus.post_latest(("queue_row", id(item)), refresh_queue_row, item)
+
 def enqueue_selected():
     sel = tree.selection()
     if not sel:
@@ -559,81 +500,89 @@ def enqueue_selected():
     for s in sel:
         idx = int(s)
         mod = mods_list[idx]
-        install_queue.append(mod)
-        queue_listbox.insert("end", mod['name'])
+        item = {"mod": mod, "state": "queued", "progress": ""}
+        install_queue.append(item)
+        queue_listbox.insert("end", queue_item_label(item))
         added += 1
     write_log(f"Adicionados {added} item(s) à fila.")
     messagebox.showinfo("Fila", f"{added} item(s) adicionados à fila.")
 
 def clear_queue():
-    global install_queue
     if queue_running:
         messagebox.showwarning("Fila", "A fila está em execução. Pare-a antes de limpar.")
         return
-    install_queue = []
+    install_queue[:] = []
     queue_listbox.delete(0, "end")
     write_log("Fila limpa pelo usuário.")
     messagebox.showinfo("Fila", "Fila limpa.")
 
 def stop_queue():
-    global queue_stop_requested
     if not queue_running:
         messagebox.showinfo("Fila", "Nenhuma fila em execução.")
         return
-    queue_stop_requested = True
+    queue_cancel.cancel()
     write_log("Solicitado parada da fila.")
-    messagebox.showinfo("Fila", "Pedido de parada enviado. A operação em andamento será cancelada e a fila será parada.")
+    messagebox.showinfo("Fila", "Fila parada. Downloads em andamento foram interrompidos (o parcial fica para retomar), uma instalação em andamento é desfeita e os itens não concluídos continuam na fila.")
 
 def start_queue():
-    global queue_running, queue_stop_requested
+    global queue_running, queue_cancel
     if queue_running:
         messagebox.showinfo("Fila", "Fila já está em execução.")
         return
-    if not install_queue:
+    pending = [it for it in install_queue if it["state"] in ("queued", "failed")]
+    if not pending:
         messagebox.showinfo("Fila", "A fila está vazia.")
         return
+    try:
+        workers = max(1, int(queue_workers_var.get()))
+    except (ValueError, tk.TclError):
+        workers = QUEUE_DOWNLOAD_WORKERS
+    try:
+        limit_mb = max(0.0, float(queue_limit_var.get().replace(",", ".")))
+    except (ValueError, tk.TclError):
+        limit_mb = QUEUE_BANDWIDTH_LIMIT_MB
     queue_running = True
-    queue_stop_requested = False
-    write_log("Iniciando execução da fila.")
-    start_next_in_queue()
-
-def start_next_in_queue():
-    global queue_running, queue_stop_requested
-    if queue_stop_requested:
-        queue_running = False
-        queue_stop_requested = False
-        write_log("Fila parada pelo usuário.")
-        messagebox.showinfo("Fila", "Fila parada.")
-        return
-    if not install_queue:
-        queue_running = False
-        write_log("Fila concluída.")
-        messagebox.showinfo("Fila", "Todos os itens da fila foram processados.")
-        return
-    mod = install_queue.pop(0)
-    queue_listbox.delete(0)
-    modal = create_modal_for_mod(mod)
-    status_text = modal._status_text
-    progress_bar = modal._progress_bar
-    cancel_btn = modal._cancel_btn
-
-    def on_complete(success, info, details):
-        ignored = details.get("profiles", {}).get("skipped", []) if details else []
-        if success:
-            if ignored:
-                messagebox.showwarning("Concluído (com perfis ignorados)", f"{mod['name']} instalado com sucesso.\n{info}\nPerfis ignorados:\n" + "\n".join(ignored))
-            else:
-                messagebox.showinfo("Concluído", f"{mod['name']} instalado com sucesso.\n{info}")
-        else:
-            msg = info
-            if ignored:
-                msg += "\nPerfis ignorados:\n" + "\n".join(ignored)
-            messagebox.showwarning("Finalizado", f"{mod['name']} finalizado com problema.\n{msg}")
-        # atualizar lista de instalados
-        root.after(300, refresh_installed_lists)
-        root.after(300, start_next_in_queue)
-
-    threading.Thread(target=download_and_install, args=(mod, status_text, modal, progress_bar, cancel_btn, on_complete), daemon=True).start()
+    queue_cancel = CancelToken()
+    for it in pending:
+        set_queue_state(it, "queued")
+    write_log(f"Iniciando execução da fila ({len(pending)} itens, {workers} downloads simultâneos, limite {limit_mb or 'nenhum'} MB/s).")
+    limiter = BandwidthLimiter(int(limit_mb * 1024 * 1024))
+    threading.Thread(target=run_queue_pipeline, args=(pending, workers, limiter, queue_cancel), daemon=True).start()
+
+def run_queue_pipeline(items, workers, limiter, cancel):
+    def on_state(item):
+        ui_bus.post_latest(("queue_row", id(item)), refresh_queue_row, item)
+        if item["state"] == "done":
+            ui_bus.post(mark_installed_stale)
+    elapsed = run_install_pipeline(items, workers, limiter, on_state=on_state,
+                                   cancel=cancel,
+                                   status=lambda text: ui_set(queue_status_var, text),
+                                   progress=lambda pct: ui_bar_value(queue_progress, pct),
+                                   ask_overwrite=ask_overwrite_from_worker)
+    ui_bus.post(finish_queue, items, elapsed)
+
+def finish_queue(items, elapsed):
+    global queue_running, queue_cancel
+    stopped = queue_cancel is not None and queue_cancel.cancelled
+    queue_running = False
+    queue_cancel = None
+    queue_status_var.set("")
+    queue_progress["value"] = 0
+    done = [it for it in items if it["state"] == "done"]
+    failed = [it for it in items if it["state"] == "failed"]
+    # concluídos saem da fila; falhas e itens não iniciados ficam para uma nova execução
+    install_queue[:] = [it for it in install_queue if it["state"] != "done"]
+    queue_listbox.delete(0, "end")
+    for it in install_queue:
+        queue_listbox.insert("end", queue_item_label(it))
+    lines = [f"{it['mod']['name']}: {it.get('result', (False, '', {}))[1] or 'falhou'}" for it in done + failed]
+    write_log(f"Fila {'parada' if stopped else 'concluída'} em {elapsed:.0f}s: {len(done)} concluídos, {len(failed)} com problema.")
+    title = "Fila parada" if stopped else "Fila concluída"
+    text = f"{len(done)} concluído(s), {len(failed)} com problema em {format_eta(elapsed)}.\n\n" + "\n".join(lines[:20])
+    if failed:
+        messagebox.showwarning(title, text)
+    else:
+        messagebox.showinfo(title, text)
 
 def start_download_modal():
     sel = tree.selection()
@@ -649,11 +598,13 @@ def start_download_modal():
     modal = create_modal_for_mod(mod)
     status_text = modal._status_text
     progress_bar = modal._progress_bar
-    cancel_btn = modal._cancel_btn
+    cancel = modal._cancel
 
     def on_complete(success, info, details):
         ignored = details.get("profiles", {}).get("skipped", []) if details else []
-        if success:
+        if details and details.get("cancelled"):
+            messagebox.showinfo("Cancelado", f"{mod['name']}: operação cancelada. Nada foi alterado nas pastas do jogo.")
+        elif success:
             if ignored:
                 messagebox.showwarning("Concluído (com perfis ignorados)", f"{mod['name']} instalado com sucesso.\n{info}\nPerfis ignorados:\n" + "\n".join(ignored))
             else:
@@ -663,48 +614,183 @@ def start_download_modal():
             if ignored:
                 msg += "\nPerfis ignorados:\n" + "\n".join(ignored)
             messagebox.showwarning("Finalizado", f"{mod['name']} finalizado com problema.\n{msg}")
-        root.after(300, refresh_installed_lists)
+        mark_installed_stale()
 
-    threading.Thread(target=download_and_install, args=(mod, status_text, modal, progress_bar, cancel_btn, on_complete), daemon=True).start()
+    threading.Thread(target=download_and_install, args=(mod, status_text, modal, progress_bar, cancel, on_complete), daemon=True).start()
 
 # ---------- carregar lista remota ----------
-def load_mods():
+# A última lista válida (engine.CATALOG_CACHE_FILE) aparece assim que o app abre; a
+# versão do GitHub é revalidada em segundo plano e só substitui a lista quando mudou.
+catalog_fetching = False
+
+def apply_catalog(data):
     global mods_list
-    try:
-        import requests
-        response = requests.get(JSON_URL, timeout=10)
-        response.raise_for_status()
-        mods_list = response.json()
-    except Exception as e:
-        messagebox.showwarning("Aviso", f"Não foi possível acessar a lista de expansões. ({e})")
-        write_log(f"Erro ao carregar mods.json: {e}")
-        mods_list = []
+    mods_list = data
+    # índice de busca montado uma vez por carga do catálogo
+    catalog_view.set_catalog(mods_list)
     update_treeview()
 
+def load_mods():
+    """Mostra a lista salva na hora e revalida a lista remota numa thread."""
+    global catalog_fetching
+    if not mods_list:
+        cached = load_cached_catalog()
+        if cached is not None:
+            apply_catalog(cached)
+    if catalog_fetching:
+        return
+    catalog_fetching = True
+    have_list = bool(mods_list)
+
+    def worker():
+        global catalog_fetching
+        try:
+            data = fetch_catalog()
+            if data is None:
+                write_log("mods.json sem alterações desde a última consulta.")
+            else:
+                write_log(f"mods.json atualizado ({len(data)} expansões).")
+                ui_bus.post(apply_catalog, data)
+        except Exception as e:
+            write_log(f"Erro ao carregar mods.json: {e}")
+            if not have_list:
+                ui_bus.post(messagebox.showwarning, "Aviso", f"Não foi possível acessar a lista de expansões. ({e})")
+        finally:
+            catalog_fetching = False
+
+    threading.Thread(target=worker, daemon=True).start()
+
 def update_treeview(*args):
-    search = search_var.get().lower()
-    for i in tree.get_children():
-        tree.delete(i)
-    for idx, mod in enumerate(mods_list):
-        if search in mod['name'].lower() or search in mod.get('description','').lower():
-            tree.insert("", "end", iid=idx, values=(mod['name'], mod.get('description','')))
+    catalog_view.apply(search_var.get())
+
+def on_search_changed(*args):
+    # a cada tecla: filtra só depois de uma pausa na digitação
+    catalog_view.schedule(search_var.get())
 
 # ---------- aba instalados ----------
+# A leitura de mod/ e profiles/ só acontece com a aba aberta; instalações apenas
+# marcam a lista como desatualizada. Pacotes vêm de installed_index (só relê os
+# manifestos alterados) e as listas são atualizadas só nas diferenças.
+installed_lists_stale = True
+installed_package_rows = {}  # pacote -> valores exibidos no Treeview
+
+def installed_tab_visible():
+    return notebook.select() == str(tab_installed)
+
+def mark_installed_stale():
+    global installed_lists_stale
+    installed_lists_stale = True
+    if installed_tab_visible():
+        refresh_installed_lists()
+
+def on_notebook_tab_changed(event):
+    if installed_lists_stale and installed_tab_visible():
+        refresh_installed_lists()
+
+def sync_package_tree(packages):
+    for name in [n for n in installed_package_rows if n not in packages]:
+        installed_packages_tree.delete(name)
+        del installed_package_rows[name]
+    for pos, name in enumerate(sorted(packages, key=str.lower)):
+        info = packages[name]
+        values = (name, info["files"], format_bytes(info["bytes"]), info["updated"].replace("T", " "))
+        if name not in installed_package_rows:
+            installed_packages_tree.insert("", pos, iid=name, values=values)
+        elif installed_package_rows[name] != values:
+            installed_packages_tree.item(name, values=values)
+        installed_package_rows[name] = values
+
 def refresh_installed_lists():
-    try:
-        mods_items = sorted(os.listdir(MODS_FOLDER))
-    except Exception:
-        mods_items = []
-    installed_mods_listbox.delete(0, "end")
-    for it in mods_items:
-        installed_mods_listbox.insert("end", it)
-    try:
-        profiles_items = sorted(os.listdir(PROFILES_FOLDER))
-    except Exception:
-        profiles_items = []
-    installed_profiles_listbox.delete(0, "end")
-    for it in profiles_items:
-        installed_profiles_listbox.insert("end", it)
+    global installed_lists_stale
+    installed_lists_stale = False
+    index = installed_index()
+    sync_package_tree(index["packages"])
+    # item de topo (mod/x.scs, profiles/ABC) -> pacotes que o instalaram
+    owners = {}
+    for name, info in index["packages"].items():
+        for top in info["top_level"]:
+            owners.setdefault(top, []).append(name)
+    mods_owners = {k.split("/", 1)[1]: sorted(v) for k, v in owners.items() if k.startswith("mod/")}
+    profiles_owners = {k.split("/", 1)[1]: sorted(v) for k, v in owners.items() if k.startswith("profiles/")}
+    refresh_mods({k: ", ".join(v) for k, v in mods_owners.items()})
+    refresh_profiles({k: ", ".join(v) for k, v in profiles_owners.items()})
+
+def refresh_mods(owners):
+    # abrir os .scs fica numa thread: sem cache, centenas de mods levam alguns segundos
+    def worker():
+        try:
+            result = inspect_mods()
+        except Exception as e:
+            write_log(f"Falha ao ler os mods: {e}")
+            return
+        ui_bus.post(show_mods, result, owners)
+    threading.Thread(target=worker, daemon=True).start()
+
+def show_mods(result, owners):
+    global mod_conflicts
+    mod_conflicts = result["conflicts"]
+    mod_view.set_mods(result["mods"], mod_conflicts, owners)
+    on_mod_selected()
+
+def on_mod_selected(event=None):
+    selected = mod_view.selected()
+    mod_detail_var.set("\n".join(describe_mod(selected[0], mod_conflicts)) if selected else
+                       (f"{len(mod_conflicts)} grupos de arquivos sobrescritos por mais de um mod - selecione um mod para ver"
+                        if mod_conflicts else ""))
+
+def on_mod_search_changed(*args):
+    mod_view.schedule(mod_search_var.get())
+
+def refresh_profiles(owners):
+    # ler os profile.sii fica numa thread: a primeira vez (sem cache) pode levar alguns segundos
+    def worker():
+        try:
+            profiles = list_profiles()
+        except Exception as e:
+            write_log(f"Falha ao ler os perfis: {e}")
+            return
+        ui_bus.post(profile_view.set_profiles, profiles, owners)
+    threading.Thread(target=worker, daemon=True).start()
+
+def on_profile_search_changed(*args):
+    profile_view.schedule(profile_search_var.get())
+
+def uninstall_clicked():
+    sel = installed_packages_tree.selection()
+    if not sel:
+        messagebox.showinfo("Remover pacote", "Escolha um pacote na lista de pacotes instalados.")
+        return
+    name = sel[0]
+    index = installed_index()
+    info = index["packages"].get(name)
+    if info is None:
+        mark_installed_stale()
+        return
+    owned = [k for k, v in index["owners"].items() if name in v]
+    shared = sum(1 for k in owned if len(index["owners"][k]) > 1)
+    text = (f"Remover '{name}'?\n\n{info['files']} arquivos ({format_bytes(info['bytes'])}) instalados por ele saem de mod/ e profiles/."
+            + (f"\n{shared} arquivos também instalados por outro pacote ficam." if shared else "")
+            + "\nArquivos alterados depois da instalação (ex.: perfil salvo pelo jogo) também ficam."
+            + "\n\n\"Desfazer última instalação\" traz tudo de volta.")
+    if not messagebox.askyesno("Remover pacote", text):
+        return
+
+    def worker():
+        try:
+            with INSTALL_LOCK:
+                result = uninstall_package(name)
+        except Exception as e:
+            write_log(f"Falha ao remover o pacote {name}: {e}")
+            ui_bus.post(messagebox.showerror, "Remover pacote", f"Não foi possível remover: {e}")
+            return
+        kept = len(result["shared"]) + len(result["modified"])
+        msg = f"'{name}' removido: {len(result['removed'])} arquivos apagados."
+        if kept:
+            msg += f"\n{len(result['shared'])} compartilhados e {len(result['modified'])} alterados foram mantidos."
+        ui_bus.post(mark_installed_stale)
+        ui_bus.post(messagebox.showinfo, "Remover pacote", msg)
+
+    threading.Thread(target=worker, daemon=True).start()
 
 def open_mod_folder():
     try:
@@ -739,6 +825,105 @@ def open_log_folder():
     except Exception as e:
         messagebox.showinfo("Logs", f"Pasta de logs: {LOG_FOLDER}\nErro: {e}")
 
+def rollback_clicked():
+    last = next((j for j in list_transactions() if j["state"] == "committed"), None)
+    if last is None:
+        messagebox.showinfo("Desfazer", "Nenhuma instalação para desfazer.")
+        return
+    what = "a remoção" if last.get("action") == "uninstall" else "a instalação"
+    text = (f"Desfazer {what} de '{last['package']}' ({last['created'].replace('T', ' ')})?\n\n"
+            f"{len(last['ops'])} itens em mod/ e profiles/ voltam ao estado anterior.")
+    if not messagebox.askyesno("Desfazer instalação", text):
+        return
+
+    def worker():
+        try:
+            with INSTALL_LOCK:
+                journal = rollback_last(last["id"])
+        except Exception as e:
+            write_log(f"Falha ao desfazer {last['package']}: {e}")
+            ui_bus.post(messagebox.showerror, "Desfazer", f"Não foi possível desfazer: {e}")
+            return
+        ui_bus.post(mark_installed_stale)
+        what = "Remoção" if journal.get("action") == "uninstall" else "Instalação"
+        ui_bus.post(messagebox.showinfo, "Desfazer", f"{what} de '{journal['package']}' desfeita.")
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def verify_clicked():
+    verify_btn.config(state="disabled", text="Verificando arquivos de mod/...")
+
+    def on_progress(done, total):
+        pct = done * 100 // total if total else 100
+        ui_bus.post_latest("verify_progress", lambda: verify_btn.config(text=f"Verificando arquivos de mod/... {pct}%"))
+
+    def finish(result, error):
+        verify_btn.config(state="normal", text="Verificar arquivos de mod/")
+        if error:
+            messagebox.showerror("Verificar", f"Não foi possível verificar: {error}")
+            return
+        if not result["checked"]:
+            messagebox.showinfo("Verificar", "Nenhum arquivo instalado pelo instalador para verificar.")
+            return
+        summary = f"{result['checked']} arquivos ({format_bytes(result['bytes'])}) em {result['elapsed']:.1f}s."
+        bad = result["missing"] + result["corrupt"]
+        if not bad:
+            messagebox.showinfo("Verificar", f"Tudo certo: {summary}")
+            return
+        lines = [f"ausente: {k}" for k in result["missing"]] + [f"corrompido: {k}" for k in result["corrupt"]]
+        packages = ", ".join(sorted(result["packages"]))
+        messagebox.showwarning("Verificar", f"{summary}\n{len(bad)} com problema; reinstale: {packages}\n\n" + "\n".join(lines[:20]))
+
+    def worker():
+        try:
+            result = verify_installed(progress=on_progress)
+        except Exception as e:
+            write_log(f"Falha na verificação dos arquivos: {e}")
+            ui_bus.post(finish, None, e)
+            return
+        ui_bus.post(finish, result, None)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def dedupe_clicked():
+    if not messagebox.askyesno("Economizar espaço", "Procurar arquivos .scs idênticos em mod/ e guardar cada um uma vez só (hardlinks)?\n"
+                               "Os mods continuam nos mesmos lugares; só o espaço repetido é liberado."):
+        return
+    dedupe_btn.config(state="disabled", text="Procurando arquivos iguais...")
+
+    def on_progress(done, total):
+        pct = done * 100 // total if total else 100
+        ui_bus.post_latest("dedupe_progress", lambda: dedupe_btn.config(text=f"Procurando arquivos iguais... {pct}%"))
+
+    def finish(result, error):
+        dedupe_btn.config(state="normal", text="Economizar espaço em mod/ (arquivos iguais)")
+        if error:
+            messagebox.showerror("Economizar espaço", f"Não foi possível concluir: {error}")
+            return
+        mark_installed_stale()
+        messagebox.showinfo("Economizar espaço",
+                            f"{result['linked']} arquivos trocados por hardlink: {format_bytes(result['bytes_saved'])} liberados agora.\n"
+                            f"Arquivos iguais poupam {format_bytes(result['store']['saved'])} no total.")
+
+    def worker():
+        try:
+            with INSTALL_LOCK:
+                result = dedupe_mods(progress=on_progress)
+        except Exception as e:
+            write_log(f"Falha ao deduplicar mod/: {e}")
+            ui_bus.post(finish, None, e)
+            return
+        ui_bus.post(finish, result, None)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def clear_cache_clicked():
+    if not messagebox.askyesno("Cache", "Remover os arquivos baixados guardados em cache?\n(Itens em uso agora são mantidos.)"):
+        return
+    freed = clear_download_cache()
+    write_log(f"Cache limpo pelo usuário: {format_bytes(freed)} liberados.")
+    messagebox.showinfo("Cache", f"{format_bytes(freed)} liberados.")
+
 # ---------- GUI ----------
 root = tk.Tk()
 root.title("Instalador ETS2 - mods sobrescrevem, perfis confirmam")
@@ -758,7 +943,7 @@ search_frame = tk.Frame(left_frame)
 search_frame.pack(fill="x", pady=5)
 tk.Label(search_frame, text="Pesquisar:").pack(side="left")
 search_var = tk.StringVar()
-search_var.trace_add("write", update_treeview)
+search_var.trace_add("write", on_search_changed)
 search_entry = tk.Entry(search_frame, textvariable=search_var)
 search_entry.pack(side="left", fill="x", expand=True, padx=5)
 
@@ -776,6 +961,9 @@ tree.pack(side="left", fill="both", expand=True)
 scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
 tree.configure(yscroll=scrollbar.set)
 scrollbar.pack(side="right", fill="y")
+catalog_status_var = tk.StringVar()
+tk.Label(left_frame, textvariable=catalog_status_var, anchor="w").pack(fill="x")
+catalog_view = CatalogView(tree, status_var=catalog_status_var)
 
 right_frame = tk.Frame(main_frame, width=360)
 right_frame.pack(side="right", fill="y", padx=10)
@@ -796,49 +984,128 @@ queue_action_frame = tk.Frame(tab_queue)
 queue_action_frame.pack(fill="x", pady=4, padx=6)
 tk.Button(queue_action_frame, text="Baixar Fila", command=start_queue).pack(side="left", padx=3)
 tk.Button(queue_action_frame, text="Parar Fila", command=stop_queue).pack(side="left", padx=3)
+queue_config_frame = tk.Frame(tab_queue)
+queue_config_frame.pack(fill="x", pady=4, padx=6)
+tk.Label(queue_config_frame, text="Downloads simultâneos:").pack(side="left")
+queue_workers_var = tk.StringVar(value=str(QUEUE_DOWNLOAD_WORKERS))
+tk.Spinbox(queue_config_frame, from_=1, to=6, width=3, textvariable=queue_workers_var).pack(side="left", padx=3)
+tk.Label(queue_config_frame, text="Limite MB/s (0 = sem):").pack(side="left", padx=(8, 0))
+queue_limit_var = tk.StringVar(value=str(QUEUE_BANDWIDTH_LIMIT_MB))
+tk.Entry(queue_config_frame, width=5, textvariable=queue_limit_var).pack(side="left", padx=3)
+queue_status_var = tk.StringVar()
+tk.Label(tab_queue, textvariable=queue_status_var, wraplength=340, justify="left").pack(anchor="w", padx=6)
+queue_progress = ttk.Progressbar(tab_queue, orient="horizontal", mode="determinate")
+queue_progress.pack(fill="x", padx=6, pady=(0, 4))
 button_frame = tk.Frame(tab_queue)
 button_frame.pack(fill="x", pady=8, padx=6)
 tk.Button(button_frame, text="Instalar Selecionado", command=start_download_modal).pack(fill="x", pady=3)
 tk.Button(button_frame, text="Atualizar Lista", command=load_mods).pack(fill="x", pady=3)
 # Novo botão Baixar RAW
 tk.Button(button_frame, text="Baixar RAW", command=baixar_raw_for_selected).pack(fill="x", pady=3)
+tk.Button(button_frame, text="Pré-visualizar conteúdo", command=preview_selected).pack(fill="x", pady=3)
 
 tab_installed = tk.Frame(notebook)
 notebook.add(tab_installed, text="Instalados")
+notebook.bind("<<NotebookTabChanged>>", on_notebook_tab_changed)
+installed_packages_frame = tk.LabelFrame(tab_installed, text="Pacotes instalados pelo instalador")
+installed_packages_frame.pack(fill="both", expand=True, padx=6, pady=(6, 0))
+installed_packages_tree = ttk.Treeview(installed_packages_frame, columns=("Pacote", "Arquivos", "Tamanho", "Atualizado"),
+                                       show="headings", height=5, selectmode="browse")
+for col, width in (("Pacote", 150), ("Arquivos", 60), ("Tamanho", 70), ("Atualizado", 110)):
+    installed_packages_tree.heading(col, text=col)
+    installed_packages_tree.column(col, width=width, stretch=(col == "Pacote"))
+installed_packages_tree.pack(side="left", fill="both", expand=True, padx=(6, 0), pady=6)
+packages_scroll = tk.Scrollbar(installed_packages_frame, orient="vertical", command=installed_packages_tree.yview)
+installed_packages_tree.configure(yscroll=packages_scroll.set)
+packages_scroll.pack(side="right", fill="y", pady=6)
+tk.Button(tab_installed, text="Remover pacote selecionado", command=uninstall_clicked).pack(fill="x", padx=6, pady=(4, 0))
 installed_mods_frame = tk.LabelFrame(tab_installed, text="Mods instalados (pasta mod/)")
 installed_mods_frame.pack(fill="both", expand=True, padx=6, pady=6)
-installed_mods_listbox = tk.Listbox(installed_mods_frame, height=8, width=60)
-installed_mods_listbox.pack(side="left", fill="both", expand=True, padx=(6,0), pady=6)
-mods_scroll = tk.Scrollbar(installed_mods_frame, orient="vertical", command=installed_mods_listbox.yview)
-installed_mods_listbox.configure(yscroll=mods_scroll.set)
+mod_search_frame = tk.Frame(installed_mods_frame)
+mod_search_frame.pack(fill="x", padx=6, pady=(6, 0))
+tk.Label(mod_search_frame, text="Pesquisar:").pack(side="left")
+mod_search_var = tk.StringVar()
+mod_search_var.trace_add("write", on_mod_search_changed)
+tk.Entry(mod_search_frame, textvariable=mod_search_var).pack(side="left", fill="x", expand=True, padx=5)
+mod_detail_var = tk.StringVar()
+tk.Label(installed_mods_frame, textvariable=mod_detail_var, anchor="w", justify="left", wraplength=520).pack(side="bottom", fill="x", padx=6)
+mod_status_var = tk.StringVar()
+tk.Label(installed_mods_frame, textvariable=mod_status_var, anchor="w").pack(side="bottom", fill="x", padx=6)
+installed_mods_tree = ttk.Treeview(installed_mods_frame, columns=MOD_COLUMNS, show="headings", height=6, selectmode="browse")
+for col, width in (("file", 130), ("name", 130), ("version", 50), ("files", 55), ("conflicts", 130), ("owner", 90)):
+    installed_mods_tree.column(col, width=width, stretch=(col in ("file", "name", "conflicts")))
+installed_mods_tree.pack(side="left", fill="both", expand=True, padx=(6,0), pady=6)
+installed_mods_tree.bind("<<TreeviewSelect>>", on_mod_selected)
+mods_scroll = tk.Scrollbar(installed_mods_frame, orient="vertical", command=installed_mods_tree.yview)
+installed_mods_tree.configure(yscroll=mods_scroll.set)
 mods_scroll.pack(side="right", fill="y", pady=6)
+mod_view = ModView(installed_mods_tree, status_var=mod_status_var)
+mod_conflicts = []
 installed_mods_btn_frame = tk.Frame(tab_installed)
 installed_mods_btn_frame.pack(fill="x", padx=6)
 tk.Button(installed_mods_btn_frame, text="Atualizar Mods Instalados", command=refresh_installed_lists).pack(side="left", padx=3)
 tk.Button(installed_mods_btn_frame, text="Abrir pasta de mods", command=open_mod_folder).pack(side="left", padx=3)
 
-installed_profiles_frame = tk.LabelFrame(tab_installed, text="Profiles instalados (pasta profiles/)")
+installed_profiles_frame = tk.LabelFrame(tab_installed, text="Profiles (pastas profiles/ e steam_profiles/)")
 installed_profiles_frame.pack(fill="both", expand=True, padx=6, pady=(0,6))
-installed_profiles_listbox = tk.Listbox(installed_profiles_frame, height=8, width=60)
-installed_profiles_listbox.pack(side="left", fill="both", expand=True, padx=(6,0), pady=6)
-profiles_scroll = tk.Scrollbar(installed_profiles_frame, orient="vertical", command=installed_profiles_listbox.yview)
-installed_profiles_listbox.configure(yscroll=profiles_scroll.set)
+profile_search_frame = tk.Frame(installed_profiles_frame)
+profile_search_frame.pack(fill="x", padx=6, pady=(6, 0))
+tk.Label(profile_search_frame, text="Pesquisar:").pack(side="left")
+profile_search_var = tk.StringVar()
+profile_search_var.trace_add("write", on_profile_search_changed)
+tk.Entry(profile_search_frame, textvariable=profile_search_var).pack(side="left", fill="x", expand=True, padx=5)
+profile_status_var = tk.StringVar()
+tk.Label(installed_profiles_frame, textvariable=profile_status_var, anchor="w").pack(side="bottom", fill="x", padx=6)
+installed_profiles_tree = ttk.Treeview(installed_profiles_frame, columns=PROFILE_COLUMNS, show="headings", height=6, selectmode="browse")
+for col, width in (("name", 120), ("company", 110), ("experience", 60), ("saved", 110), ("owner", 90), ("dir", 90)):
+    installed_profiles_tree.column(col, width=width, stretch=(col in ("name", "company")))
+installed_profiles_tree.pack(side="left", fill="both", expand=True, padx=(6,0), pady=6)
+profiles_scroll = tk.Scrollbar(installed_profiles_frame, orient="vertical", command=installed_profiles_tree.yview)
+installed_profiles_tree.configure(yscroll=profiles_scroll.set)
 profiles_scroll.pack(side="right", fill="y", pady=6)
+profile_view = ProfileView(installed_profiles_tree, status_var=profile_status_var)
 installed_profiles_btn_frame = tk.Frame(tab_installed)
 installed_profiles_btn_frame.pack(fill="x", padx=6, pady=(0,6))
 tk.Button(installed_profiles_btn_frame, text="Atualizar Profiles Instalados", command=refresh_installed_lists).pack(side="left", padx=3)
 tk.Button(installed_profiles_btn_frame, text="Abrir pasta de profiles", command=open_profiles_folder).pack(side="left", padx=3)
+tk.Button(tab_installed, text="Desfazer última instalação", command=rollback_clicked).pack(fill="x", padx=6, pady=(0, 6))
+verify_btn = tk.Button(tab_installed, text="Verificar arquivos de mod/", command=verify_clicked)
+verify_btn.pack(fill="x", padx=6, pady=(0, 6))
+dedupe_btn = tk.Button(tab_installed, text="Economizar espaço em mod/ (arquivos iguais)", command=dedupe_clicked)
+dedupe_btn.pack(fill="x", padx=6, pady=(0, 6))
 
 tk.Button(right_frame, text="Abrir Pasta de Logs", command=open_log_folder).pack(pady=6, fill="x", padx=6)
+tk.Button(right_frame, text="Limpar cache de downloads", command=clear_cache_clicked).pack(pady=(0, 6), fill="x", padx=6)
 
-# inicializa
-load_mods()
-write_log("Aplicativo iniciado (modo gdown).")
-# atualizar lista de instalados na inicialização
-root.after(500, refresh_installed_lists)
-if not HAVE_GDOWN:
-    try:
-        messagebox.showwarning("gdown não instalado", "O pacote 'gdown' não está instalado. Instale com 'pip install gdown' para permitir downloads.")
-    except:
-        pass
+# inicializa: só o necessário para desenhar a janela; o resto roda depois do primeiro quadro
+# ETS2_STARTUP_PROBE=1 imprime os tempos em JSON e fecha (benchmarks/bench_startup.py)
+startup_times = {}
+
+def on_first_frame(event):
+    if event.widget is not root:
+        return
+    root.unbind("<Map>")
+    startup_times["first_frame_ms"] = round((time.perf_counter() - STARTUP_STARTED) * 1000, 1)
+    startup_times["heavy_modules"] = sorted(m for m in ("gdown", "requests", "bs4") if m in sys.modules)
+    root.after_idle(finish_startup)
+
+def finish_startup():
+    ensure_folders()
+    if recover_transactions():
+        mark_installed_stale()
+    load_mods()
+    startup_times["ready_ms"] = round((time.perf_counter() - STARTUP_STARTED) * 1000, 1)
+    write_log(f"Aplicativo iniciado: janela em {startup_times['first_frame_ms']:.0f} ms, pronto em {startup_times['ready_ms']:.0f} ms.")
+    if os.environ.get("ETS2_STARTUP_PROBE"):
+        print(json.dumps(startup_times), flush=True)
+        root.destroy()
+        return
+    if not HAVE_GDOWN:
+        try:
+            messagebox.showwarning("gdown não instalado", "O pacote 'gdown' não está instalado. Instale com 'pip install gdown' para permitir downloads.")
+        except:
+            pass
+
+root.bind("<Map>", on_first_frame)
+ui_bus.start(root)
 root.mainloop()
@@ -0,0 +1,516 @@
+# Perfis do ETS2 (profiles/ e steam_profiles/): nome, empresa, experiência e último save
+# lidos do profile.sii de cada pasta, para a aba "Instalados".
+# - As pastas têm o nome do perfil em hexadecimal (UTF-8): "4A6F616F" -> "Joao"
+# - profile.sii pode vir em texto ("SiiNunit"), cifrado ("ScsC": AES-256-CBC com a chave
+#   fixa do jogo + zlib) ou binário ("BSII"); os três são lidos aqui, sem dependências.
+#   O que não der para ler fica só com o nome da pasta e o campo "format"
+# - ProfileIndex guarda o resultado em JSON por (tamanho, mtime) do profile.sii: reabrir
+#   a aba relê só os perfis que mudaram
+# - ProfileView: Treeview com busca (mesmas regras do catálogo) e ordenação por coluna
+
+import json
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+from catalog import SEARCH_DEBOUNCE_MS, TableView, fold_text, text_matches
+
+PROFILE_FILE = "profile.sii"
+PROFILE_UNIT = "user_profile"
+# chave pública usada pelo jogo para cifrar os .sii (a mesma em todas as instalações)
+SII_KEY = bytes.fromhex("2a5fcb1791d22fb60245b3d8369ed0b2c27371563fbf1f3c9edf6b11825a5d0a")
+SII_MAX_BYTES = 8 * 1024 * 1024  # profile.sii tem poucos KB; maior que isso não é perfil
+INDEX_VERSION = 1
+
+HEX_NAME_RE = re.compile(r"(?:[0-9A-Fa-f]{2})+")
+TEXT_UNIT_RE = r"^\s*{}\s*:\s*[\w.]+\s*\{{"
+TEXT_FIELD_RE = re.compile(r"^\s*(\w+)(\[\d*\])?\s*:\s*(.*?)\s*$")
+
+
+def decode_dir_name(name):
+    """Nome do perfil a partir da pasta ("4A6F616F" -> "Joao"); outros nomes voltam iguais."""
+    if HEX_NAME_RE.fullmatch(name):
+        try:
+            text = bytes.fromhex(name).decode("utf-8")
+        except UnicodeDecodeError:
+            return name
+        if text.isprintable():
+            return text
+    return name
+
+
+# ---------- AES-256 (só decifrar; profile.sii tem poucos KB) ----------
+
+def _xtime(b):
+    b <<= 1
+    return (b ^ 0x11B) if b & 0x100 else b
+
+
+def _gf_mul(a, b):
+    out = 0
+    while b:
+        if b & 1:
+            out ^= a
+        a = _xtime(a)
+        b >>= 1
+    return out
+
+
+def _build_aes_tables():
+    sbox = [0] * 256
+    for x in range(256):
+        inv = 0
+        if x:
+            # inverso multiplicativo em GF(2^8): x^254
+            inv, base, exp = 1, x, 254
+            while exp:
+                if exp & 1:
+                    inv = _gf_mul(inv, base)
+                base = _gf_mul(base, base)
+                exp >>= 1
+        s = inv
+        for shift in range(1, 5):
+            s ^= ((inv << shift) | (inv >> (8 - shift))) & 0xFF
+        sbox[x] = s ^ 0x63
+    inv_sbox = [0] * 256
+    for x, s in enumerate(sbox):
+        inv_sbox[s] = x
+    mul = {k: [_gf_mul(x, k) for x in range(256)] for k in (9, 11, 13, 14)}
+    return sbox, inv_sbox, mul
+
+
+_aes_tables = None
+
+
+def _aes_round_keys(key):
+    sbox = _aes_tables[0]
+    words = [list(key[i:i + 4]) for i in range(0, 32, 4)]
+    rcon = 1
+    while len(words) < 60:
+        w = list(words[-1])
+        if len(words) % 8 == 0:
+            w = [sbox[b] for b in w[1:] + w[:1]]
+            w[0] ^= rcon
+            rcon = _xtime(rcon)
+        elif len(words) % 8 == 4:
+            w = [sbox[b] for b in w]
+        words.append([a ^ b for a, b in zip(words[-8], w)])
+    return [sum(words[r * 4:r * 4 + 4], []) for r in range(15)]
+
+
+def aes256_cbc_decrypt(key, iv, data):
+    """AES-256-CBC em Python puro (sem remover padding). len(data) precisa ser múltiplo de 16."""
+    global _aes_tables
+    if _aes_tables is None:
+        _aes_tables = _build_aes_tables()
+    _, inv_sbox, mul = _aes_tables
+    m9, m11, m13, m14 = mul[9], mul[11], mul[13], mul[14]
+    keys = _aes_round_keys(key)
+    # InvShiftRows sobre o estado em ordem de coluna (byte i = linha i % 4, coluna i // 4)
+    unshift = [(i - 4 * (i % 4)) % 16 for i in range(16)]
+    out = bytearray()
+    prev = iv
+    for start in range(0, len(data) - len(data) % 16, 16):
+        block = data[start:start + 16]
+        s = [b ^ k for b, k in zip(block, keys[14])]
+        for rnd in range(13, -1, -1):
+            s = [inv_sbox[s[unshift[i]]] ^ keys[rnd][i] for i in range(16)]
+            if rnd:
+                mixed = []
+                for c in range(0, 16, 4):
+                    a0, a1, a2, a3 = s[c:c + 4]
+                    mixed += (m14[a0] ^ m11[a1] ^ m13[a2] ^ m9[a3],
+                              m9[a0] ^ m14[a1] ^ m11[a2] ^ m13[a3],
+                              m13[a0] ^ m9[a1] ^ m14[a2] ^ m11[a3],
+                              m11[a0] ^ m13[a1] ^ m9[a2] ^ m14[a3])
+                s = mixed
+        out += bytes(a ^ b for a, b in zip(s, prev))
+        prev = block
+    return bytes(out)
+
+
+# ---------- formatos do .sii ----------
+
+def decrypt_sii(data):
+    """ScsC -> conteúdo (texto ou BSII). Cabeçalho: assinatura, HMAC (32), IV (16), tamanho (u32)."""
+    if len(data) < 56:
+        raise ValueError("ScsC truncado")
+    iv = data[36:52]
+    size = struct.unpack_from("<I", data, 52)[0]
+    plain = aes256_cbc_decrypt(SII_KEY, iv, data[56:])
+    # o padding do CBC fica depois do fim do fluxo zlib e é ignorado pelo decompressobj
+    out = zlib.decompressobj().decompress(plain)
+    if len(out) != size:
+        raise ValueError(f"ScsC: {len(out)} bytes, esperado {size}")
+    return out
+
+
+def _unescape_sii(value):
+    if len(value) < 2 or value[0] != '"' or value[-1] != '"':
+        return value
+    raw = value[1:-1]
+    if "\\" not in raw:
+        return raw
+    out = bytearray()
+    i = 0
+    while i < len(raw):
+        ch = raw[i]
+        if ch == "\\" and i + 1 < len(raw):
+            nxt = raw[i + 1]
+            if nxt == "x" and i + 3 < len(raw):
+                try:
+                    out.append(int(raw[i + 2:i + 4], 16))
+                    i += 4
+                    continue
+                except ValueError:
+                    pass
+            out += {"n": b"\n", "t": b"\t"}.get(nxt, nxt.encode("utf-8"))
+            i += 2
+            continue
+        out += ch.encode("utf-8")
+        i += 1
+    return out.decode("utf-8", "replace")
+
+
+def parse_text_sii(text, unit=PROFILE_UNIT):
+    """Campos do primeiro bloco `unit` de um SiiNunit em texto (valores como str; arrays como list)."""
+    match = re.search(TEXT_UNIT_RE.format(re.escape(unit)), text, re.M)
+    if not match:
+        raise ValueError(f"sem bloco {unit}")
+    fields = {}
+    for line in text[match.end():].splitlines():
+        if line.strip() == "}":
+            break
+        field = TEXT_FIELD_RE.match(line)
+        if not field:
+            continue
+        name, index, value = field.groups()
+        if index:
+            # "nome: 2" (tamanho) seguido de "nome[0]: ..." ou só "nome[]: ..."
+            items = fields.get(name)
+            if not isinstance(items, list):
+                items = fields[name] = []
+            items.append(_unescape_sii(value))
+        else:
+            fields[name] = _unescape_sii(value)
+    return fields
+
+
+# BSII: tamanho fixo de cada tipo simples; o tipo de array é o simples + 1
+_BSII_FIXED = {
+    0x03: 8,   # token (u64 codificado)
+    0x05: 4,   # float
+    0x07: 8,   # float2
+    0x09: 12,  # float3
+    0x11: 12,  # int3
+    0x17: 16,  # float4
+    0x19: 32,  # posição + rotação (float8)
+    0x25: 4,   # s32
+    0x27: 4,   # u32
+    0x2B: 2,   # u16
+    0x2F: 4,   # u32
+    0x31: 8,   # s64
+    0x33: 8,   # u64
+    0x35: 1,   # bool
+    0x37: 4,   # enum (índice em uma tabela de nomes)
+}
+_BSII_STRING = 0x01
+_BSII_IDS = (0x39, 0x3B, 0x3D)
+_BSII_ORDINAL = 0x37
+_TOKEN_CHARS = "\0" + "0123456789abcdefghijklmnopqrstuvwxyz_"
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, n):
+        end = self.pos + n
+        if end > len(self.data):
+            raise ValueError("BSII truncado")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def unpack(self, fmt):
+        value = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return value[0]
+
+    def string(self):
+        return self.take(self.unpack("<I")).decode("utf-8", "replace")
+
+    def unit_id(self):
+        parts = self.unpack("<B")
+        if parts == 0xFF:
+            return f"_nameless.{self.unpack('<Q'):x}"
+        return ".".join(_decode_token(self.unpack("<Q")) for _ in range(parts))
+
+
+def _decode_token(value):
+    chars = []
+    while value:
+        value, digit = divmod(value, 38)
+        chars.append(_TOKEN_CHARS[digit])
+    return "".join(chars).strip("\0")
+
+
+def _read_bsii_value(reader, kind, ordinals):
+    if kind == _BSII_STRING:
+        return reader.string()
+    if kind in _BSII_IDS:
+        return reader.unit_id()
+    if kind == 0x03:
+        return _decode_token(reader.unpack("<Q"))
+    if kind == _BSII_ORDINAL:
+        index = reader.unpack("<I")
+        return ordinals.get(index, str(index))
+    size = _BSII_FIXED.get(kind)
+    if size is None:
+        raise ValueError(f"BSII: tipo 0x{kind:02x} desconhecido")
+    raw = reader.take(size)
+    fmt = {0x25: "<i", 0x27: "<I", 0x2B: "<H", 0x2F: "<I", 0x31: "<q", 0x33: "<Q", 0x35: "<?"}.get(kind)
+    return struct.unpack(fmt, raw)[0] if fmt else None
+
+
+def parse_binary_sii(data, unit=PROFILE_UNIT):
+    """Campos do primeiro bloco `unit` de um BSII (versões 1 a 3)."""
+    reader = _Reader(data)
+    if reader.take(4) != b"BSII":
+        raise ValueError("não é BSII")
+    version = reader.unpack("<I")
+    if version not in (1, 2, 3):
+        raise ValueError(f"BSII versão {version} não suportada")
+    structures = {}
+    while reader.pos < len(data):
+        block = reader.unpack("<I")
+        if block == 0:
+            if not reader.unpack("<B"):
+                break  # fim do arquivo
+            struct_id = reader.unpack("<I")
+            name = reader.string()
+            fields = []
+            while True:
+                kind = reader.unpack("<I")
+                if kind == 0:
+                    break
+                field_name = reader.string()
+                ordinals = {}
+                if kind == _BSII_ORDINAL:
+                    for _ in range(reader.unpack("<I")):
+                        index = reader.unpack("<I")
+                        ordinals[index] = reader.string()
+                fields.append((field_name, kind, ordinals))
+            structures[struct_id] = (name, fields)
+            continue
+        if block not in structures:
+            raise ValueError(f"BSII: bloco {block} sem estrutura")
+        name, fields = structures[block]
+        reader.unit_id()
+        values = {}
+        for field_name, kind, ordinals in fields:
+            if kind in _BSII_FIXED or kind in _BSII_IDS or kind == _BSII_STRING:
+                values[field_name] = _read_bsii_value(reader, kind, ordinals)
+            elif kind - 1 in _BSII_FIXED or kind - 1 in _BSII_IDS or kind - 1 == _BSII_STRING:
+                values[field_name] = [_read_bsii_value(reader, kind - 1, ordinals)
+                                      for _ in range(reader.unpack("<I"))]
+            else:
+                raise ValueError(f"BSII: tipo 0x{kind:02x} desconhecido")
+        if name == unit:
+            return values
+    raise ValueError(f"sem bloco {unit}")
+
+
+def parse_sii(data, unit=PROFILE_UNIT):
+    """(formato, campos) de um .sii em qualquer formato; formato é text, encrypted, binary ou encrypted+binary."""
+    fmt = []
+    if data[:4] == b"ScsC":
+        data = decrypt_sii(data)
+        fmt.append("encrypted")
+    if data[:4] == b"BSII":
+        fmt.append("binary")
+        return "+".join(fmt), parse_binary_sii(data, unit)
+    if data.lstrip(b"\xef\xbb\xbf")[:8] == b"SiiNunit":
+        return "+".join(fmt) or "text", parse_text_sii(data.decode("utf-8", "replace"), unit)
+    raise ValueError("formato de .sii desconhecido")
+
+
+def read_profile_sii(path):
+    """(formato, campos) do bloco user_profile de um profile.sii."""
+    with open(path, "rb") as f:
+        data = f.read(SII_MAX_BYTES + 1)
+    if len(data) > SII_MAX_BYTES:
+        raise ValueError("profile.sii grande demais")
+    return parse_sii(data)
+
+
+def _int_field(fields, name):
+    value = fields.get(name)
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _mods_count(fields):
+    mods = fields.get("active_mods")
+    if isinstance(mods, list):
+        return len(mods)
+    return _int_field(fields, "active_mods")
+
+
+def read_profile(folder, source="profiles"):
+    """Resumo de uma pasta de perfil (nunca lança: erros vão para o campo "error")."""
+    dir_name = os.path.basename(folder)
+    info = {"dir": dir_name, "path": folder, "source": source, "name": decode_dir_name(dir_name),
+            "company": "", "experience": None, "distance": None, "mods": None,
+            "created": None, "saved": None, "format": None, "error": None}
+    sii = os.path.join(folder, PROFILE_FILE)
+    try:
+        info["saved"] = int(os.stat(sii).st_mtime)
+        info["format"], fields = read_profile_sii(sii)
+    except FileNotFoundError:
+        info["error"] = f"sem {PROFILE_FILE}"
+        return info
+    except (OSError, ValueError, zlib.error, struct.error) as e:
+        info["error"] = str(e)
+        return info
+    if fields.get("profile_name"):
+        info["name"] = fields["profile_name"]
+    info["company"] = fields.get("company_name") or ""
+    info["experience"] = _int_field(fields, "cached_experience")
+    info["distance"] = _int_field(fields, "cached_distance")
+    info["mods"] = _mods_count(fields)
+    info["created"] = _int_field(fields, "creation_time")
+    # save_time é o horário gravado pelo jogo; sem ele, vale o mtime do arquivo
+    info["saved"] = _int_field(fields, "save_time") or info["saved"]
+    return info
+
+
+# ---------- índice com cache ----------
+
+class ProfileIndex:
+    """Perfis de várias pastas, relidos só quando o profile.sii muda (tamanho ou mtime)."""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.last_reread = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and isinstance(data.get("profiles"), dict):
+            self.entries = data["profiles"]
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        tmp = self.cache_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "profiles": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+
+    def refresh(self, folders):
+        """folders: [(pasta, origem)]. Lista de perfis (dicts de read_profile) em ordem de nome."""
+        with self._lock:
+            seen = {}
+            reread = 0
+            for folder, source in folders:
+                try:
+                    dirs = [e for e in os.scandir(folder) if e.is_dir()]
+                except OSError:
+                    continue
+                for entry in dirs:
+                    try:
+                        st = os.stat(os.path.join(entry.path, PROFILE_FILE))
+                        stamp = [st.st_size, st.st_mtime_ns]
+                    except OSError:
+                        stamp = None
+                    cached = self.entries.get(entry.path)
+                    if cached is not None and cached.get("stamp") == stamp and cached.get("source") == source:
+                        seen[entry.path] = cached
+                        continue
+                    info = read_profile(entry.path, source)
+                    info["stamp"] = stamp
+                    seen[entry.path] = info
+                    reread += 1
+            changed = reread or seen.keys() != self.entries.keys()
+            self.entries = seen
+            self.last_reread = reread
+            if changed:
+                self._save()
+            return sorted(seen.values(), key=lambda p: (fold_text(p["name"]), p["path"]))
+
+
+def format_save_time(timestamp):
+    if not timestamp:
+        return ""
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def profile_matches(profile, terms):
+    """Todas as palavras da busca são prefixo de alguma palavra do nome, empresa ou pasta."""
+    return text_matches(f"{profile['name']} {profile['company']} {profile['dir']}", terms)
+
+
+# ---------- Treeview ----------
+
+PROFILE_COLUMNS = ("name", "company", "experience", "saved", "owner", "dir")
+PROFILE_HEADINGS = {"name": "Nome", "company": "Empresa", "experience": "XP",
+                    "saved": "Último save", "owner": "Pacote", "dir": "Pasta"}
+
+
+class ProfileView(TableView):
+    """Liga os perfis de ProfileIndex a um ttk.Treeview (iid = caminho da pasta)."""
+
+    columns = PROFILE_COLUMNS
+    headings = PROFILE_HEADINGS
+    numeric = ("experience", "saved")
+    noun = "perfis"
+
+    def __init__(self, tree, status_var=None, debounce_ms=SEARCH_DEBOUNCE_MS):
+        super().__init__(tree, status_var, debounce_ms)
+        self.owners = {}
+
+    def set_profiles(self, profiles, owners=None):
+        """owners: nome da pasta -> pacote que a instalou (vazio para perfis do próprio jogo)."""
+        self.owners = owners or {}
+        self.set_items({p["path"]: p for p in profiles})
+
+    def owner(self, profile):
+        # o instalador só grava em profiles/; steam_profiles/ é sempre do jogo
+        return self.owners.get(profile["dir"], "") if profile["source"] == "profiles" else ""
+
+    def sort_value(self, profile, column):
+        if column == "owner":
+            return self.owner(profile)
+        return profile.get(column)
+
+    def search_text(self, profile):
+        return f"{profile['name']} {profile['company']} {profile['dir']}"
+
+    def row_values(self, profile):
+        label = profile["name"]
+        if profile.get("error"):
+            label += " (?)"
+        experience = profile.get("experience")
+        folder = profile["dir"] if profile["source"] == "profiles" else f"{profile['source']}/{profile['dir']}"
+        return (label, profile.get("company", ""), "" if experience is None else f"{experience:,}".replace(",", "."),
+                format_save_time(profile.get("saved")), self.owner(profile), folder)
@@ -0,0 +1,529 @@
+# Conteúdo dos .scs de mod/ sem extrair: lista de arquivos, manifest.sii (nome, versão,
+# autor, categorias) e caminhos que dois mods sobrescrevem ao mesmo tempo.
+# - Formatos: ZIP (a maioria dos mods), HashFS v1 (SCS# versão 1: tabela de entradas
+#   + diretórios em texto) e HashFS v2 (só a tabela de entradas: sem nomes nem manifest)
+# - No HashFS os caminhos só existem como CityHash64; por isso o conflito é calculado
+#   sobre o hash do caminho (ZIP também vira hash) e os nomes aparecem quando se sabe
+# - ScsIndex guarda o resultado em JSON por (tamanho, mtime_ns) e, quando o manifesto
+#   de instalação tem o sha256 do arquivo, também por conteúdo: o mesmo .scs em outro
+#   nome ou reinstalado não é relido
+# - ModView: Treeview da aba "Instalados" (nome, versão, conflitos) sobre TableView
+
+import base64
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import zipfile
+import zlib
+from array import array
+
+from catalog import SEARCH_DEBOUNCE_MS, TableView
+from profiles import parse_sii
+
+MOD_EXTENSIONS = (".scs", ".zip")
+MANIFEST_FILE = "manifest.sii"
+MANIFEST_UNIT = "mod_package"
+MANIFEST_MAX_BYTES = 1024 * 1024
+INDEX_VERSION = 1
+CONFLICT_SAMPLE = 5  # caminhos de exemplo guardados por conflito
+
+HASHFS_MAGIC = b"SCS#"
+HASHFS_DIR = 0x1
+HASHFS_COMPRESSED = 0x2
+# arquivos da raiz do mod que não sobrescrevem nada do jogo
+MOD_META_NAMES = {MANIFEST_FILE, "mod_description.txt", "description.txt", "icon.jpg", "icon.png"}
+VEHICLE_RE = re.compile(r"^def/vehicle/(truck|trailer_owned|trailer_defs)/([^/]+)/")
+
+# ---------- CityHash64 (caminhos do HashFS) ----------
+
+_M64 = (1 << 64) - 1
+_K0 = 0xC3A5C85C97CB3127
+_K1 = 0xB492B66FBE98F273
+_K2 = 0x9AE16A3B2F90404F
+_KMUL = 0x9DDFEA08EB382D69
+
+
+def _f64(s, i):
+    return struct.unpack_from("<Q", s, i)[0]
+
+
+def _f32(s, i):
+    return struct.unpack_from("<I", s, i)[0]
+
+
+def _rot(v, shift):
+    return v if shift == 0 else ((v >> shift) | (v << (64 - shift))) & _M64
+
+
+def _smix(v):
+    return v ^ (v >> 47)
+
+
+def _bswap(v):
+    return int.from_bytes(v.to_bytes(8, "little"), "big")
+
+
+def _len16(u, v, mul=_KMUL):
+    a = ((u ^ v) * mul) & _M64
+    a ^= a >> 47
+    b = ((v ^ a) * mul) & _M64
+    b ^= b >> 47
+    return (b * mul) & _M64
+
+
+def _len0to16(s):
+    n = len(s)
+    if n >= 8:
+        mul = _K2 + n * 2
+        a = (_f64(s, 0) + _K2) & _M64
+        b = _f64(s, n - 8)
+        c = (_rot(b, 37) * mul + a) & _M64
+        d = ((_rot(a, 25) + b) * mul) & _M64
+        return _len16(c, d, mul)
+    if n >= 4:
+        mul = _K2 + n * 2
+        return _len16((n + (_f32(s, 0) << 3)) & _M64, _f32(s, n - 4), mul)
+    if n:
+        y = (s[0] + (s[n >> 1] << 8)) & 0xFFFFFFFF
+        z = (n + (s[n - 1] << 2)) & 0xFFFFFFFF
+        return (_smix(((y * _K2) ^ (z * _K0)) & _M64) * _K2) & _M64
+    return _K2
+
+
+def _len17to32(s):
+    n = len(s)
+    mul = _K2 + n * 2
+    a = (_f64(s, 0) * _K1) & _M64
+    b = _f64(s, 8)
+    c = (_f64(s, n - 8) * mul) & _M64
+    d = (_f64(s, n - 16) * _K2) & _M64
+    return _len16((_rot((a + b) & _M64, 43) + _rot(c, 30) + d) & _M64,
+                  (a + _rot((b + _K2) & _M64, 18) + c) & _M64, mul)
+
+
+def _len33to64(s):
+    n = len(s)
+    mul = _K2 + n * 2
+    a = (_f64(s, 0) * _K2) & _M64
+    b = _f64(s, 8)
+    c = _f64(s, n - 24)
+    d = _f64(s, n - 32)
+    e = (_f64(s, 16) * _K2) & _M64
+    f = (_f64(s, 24) * 9) & _M64
+    g = _f64(s, n - 8)
+    h = (_f64(s, n - 16) * mul) & _M64
+    u = (_rot((a + g) & _M64, 43) + (_rot(b, 30) + c) * 9) & _M64
+    v = (((a + g) & _M64 ^ d) + f + 1) & _M64
+    w = (_bswap(((u + v) * mul) & _M64) + h) & _M64
+    x = (_rot((e + f) & _M64, 42) + c) & _M64
+    y = ((_bswap(((v + w) * mul) & _M64) + g) * mul) & _M64
+    z = (e + f + c) & _M64
+    a = (_bswap(((x + z) * mul + y) & _M64) + b) & _M64
+    b = (_smix(((z + a) * mul + d + h) & _M64) * mul) & _M64
+    return (b + x) & _M64
+
+
+def _weak32(s, i, a, b):
+    w, x, y, z = struct.unpack_from("<4Q", s, i)
+    a = (a + w) & _M64
+    b = _rot((b + a + z) & _M64, 21)
+    c = a
+    a = (a + x + y) & _M64
+    b = (b + _rot(a, 44)) & _M64
+    return (a + z) & _M64, (b + c) & _M64
+
+
+def city_hash64(s):
+    """CityHash64 (v1.1) de bytes; é o hash de caminho do HashFS ("" = raiz)."""
+    n = len(s)
+    if n <= 16:
+        return _len0to16(s)
+    if n <= 32:
+        return _len17to32(s)
+    if n <= 64:
+        return _len33to64(s)
+    x = _f64(s, n - 40)
+    y = (_f64(s, n - 16) + _f64(s, n - 56)) & _M64
+    z = _len16((_f64(s, n - 48) + n) & _M64, _f64(s, n - 24))
+    v = _weak32(s, n - 64, n, z)
+    w = _weak32(s, n - 32, (y + _K1) & _M64, x)
+    x = (x * _K1 + _f64(s, 0)) & _M64
+    pos = 0
+    left = (n - 1) & ~63
+    while True:
+        x = (_rot((x + y + v[0] + _f64(s, pos + 8)) & _M64, 37) * _K1) & _M64
+        y = (_rot((y + v[1] + _f64(s, pos + 48)) & _M64, 42) * _K1) & _M64
+        x ^= w[1]
+        y = (y + v[0] + _f64(s, pos + 40)) & _M64
+        z = (_rot((z + w[0]) & _M64, 33) * _K1) & _M64
+        v = _weak32(s, pos, (v[1] * _K1) & _M64, (x + w[0]) & _M64)
+        w = _weak32(s, pos + 32, (z + w[1]) & _M64, (y + _f64(s, pos + 16)) & _M64)
+        z, x = x, z
+        pos += 64
+        left -= 64
+        if not left:
+            break
+    return _len16((_len16(v[0], w[0]) + _smix(y) * _K1 + z) & _M64,
+                  (_len16(v[1], w[1]) + x) & _M64)
+
+
+def path_hash(path):
+    return city_hash64(path.strip("/").encode("utf-8"))
+
+
+# ---------- leitura dos formatos ----------
+
+def _read_manifest(data):
+    """Campos de interesse do manifest.sii (nunca lança: erro vai em "manifest_error")."""
+    try:
+        _, fields = parse_sii(data, MANIFEST_UNIT)
+    except (ValueError, zlib.error, struct.error) as e:
+        return {"manifest_error": str(e)}
+
+    def text(name):
+        value = fields.get(name)
+        return value if isinstance(value, str) else ""
+
+    categories = fields.get("category") or []
+    return {"display_name": text("display_name"), "version": text("package_version"), "author": text("author"),
+            "categories": categories if isinstance(categories, list) else [categories],
+            "compatible_versions": fields.get("compatible_versions") or [],
+            "meta_files": [name for name in (text("icon"), text("description_file")) if name]}
+
+
+def read_zip_scs(path):
+    with zipfile.ZipFile(path) as z:
+        infos = [i for i in z.infolist() if not i.is_dir()]
+        info = {"format": "zip", "paths": [i.filename.replace("\\", "/").lstrip("/") for i in infos]}
+        manifest = next((i for i in infos if i.filename.lstrip("/") == MANIFEST_FILE), None)
+        if manifest is not None and manifest.file_size <= MANIFEST_MAX_BYTES:
+            info.update(_read_manifest(z.read(manifest)))
+    return info
+
+
+def _hashfs_read(f, entry):
+    offset, flags, size, stored = entry
+    f.seek(offset)
+    data = f.read(stored)
+    if flags & HASHFS_COMPRESSED:
+        data = zlib.decompressobj().decompress(data, size)
+    return data
+
+
+def read_hashfs_v1(f, salt, count, table_offset):
+    f.seek(table_offset)
+    table = f.read(count * 32)
+    if len(table) != count * 32:
+        raise ValueError("HashFS: tabela de entradas truncada")
+    entries = {}
+    for h, offset, flags, _crc, size, stored in struct.iter_unpack("<QQIIII", table):
+        entries[h] = (offset, flags, size, stored)
+    info = {"format": "hashfs1", "hashes": [h for h, e in entries.items() if not e[1] & HASHFS_DIR]}
+    if salt:
+        return info  # com salt os caminhos não batem com o hash simples: fica só a tabela
+    # os diretórios listam os filhos em texto ("*nome" = subdiretório); andando a partir
+    # da raiz, cada caminho montado tem que existir na tabela
+    paths = []
+    pending = [""]
+    while pending:
+        folder = pending.pop()
+        entry = entries.get(path_hash(folder))
+        if entry is None or not entry[1] & HASHFS_DIR:
+            return info
+        for name in _hashfs_read(f, entry).decode("utf-8", "replace").splitlines():
+            if not name:
+                continue
+            child = f"{folder}/{name.lstrip('*')}" if folder else name.lstrip("*")
+            if name.startswith("*"):
+                pending.append(child)
+            elif path_hash(child) in entries:
+                paths.append(child)
+    if len(paths) != len(info["hashes"]):
+        return info  # listagem incompleta: os hashes da tabela valem mais
+    info["paths"] = paths
+    manifest = entries.get(path_hash(MANIFEST_FILE))
+    if manifest is not None and manifest[2] <= MANIFEST_MAX_BYTES:
+        info.update(_read_manifest(_hashfs_read(f, manifest)))
+    return info
+
+
+def read_hashfs_v2(f, count, table_size, table_offset):
+    f.seek(table_offset)
+    table = zlib.decompress(f.read(table_size))
+    if len(table) != count * 16:
+        raise ValueError("HashFS v2: tabela de entradas com tamanho inesperado")
+    return {"format": "hashfs2",
+            "hashes": [h for h, _meta, _count, flags in struct.iter_unpack("<QIHH", table) if not flags & HASHFS_DIR]}
+
+
+def read_scs(path):
+    """{"format", "paths" (quando há nomes) ou "hashes", e campos do manifest.sii}; lança OSError/ValueError."""
+    with open(path, "rb") as f:
+        head = f.read(56)
+        if head[:4] == HASHFS_MAGIC:
+            version, salt = struct.unpack_from("<HH", head, 4)
+            if head[8:12] != b"CITY":
+                raise ValueError(f"HashFS: hash {head[8:12]!r} não suportado")
+            if version == 1:
+                count, table_offset = struct.unpack_from("<II", head, 12)
+                return read_hashfs_v1(f, salt, count, table_offset)
+            if version == 2:
+                count, table_size = struct.unpack_from("<II", head, 12)
+                table_offset = struct.unpack_from("<Q", head, 28)[0]
+                return read_hashfs_v2(f, count, table_size, table_offset)
+            raise ValueError(f"HashFS versão {version} não suportada")
+    try:
+        return read_zip_scs(path)
+    except zipfile.BadZipFile:
+        raise ValueError("não é ZIP nem HashFS") from None
+
+
+def summarize(info):
+    """Completa o resultado de read_scs: contagem, veículos e hashes dos caminhos que contam para conflito."""
+    paths = info.pop("paths", None)
+    meta = MOD_META_NAMES | set(info.get("meta_files", []))
+    if paths is not None:
+        info["files"] = len(paths)
+        vehicles = {f"{m.group(1)}/{m.group(2)}" for m in map(VEHICLE_RE.match, paths) if m}
+        info["vehicles"] = sorted(vehicles)
+        game_paths = sorted(p for p in paths if p not in meta)
+        hashes = array("Q", map(path_hash, game_paths))
+        # nomes guardados comprimidos: servem só para mostrar exemplos de conflito
+        info["names"] = base64.b64encode(zlib.compress("\n".join(game_paths).encode("utf-8"))).decode("ascii")
+    else:
+        meta_hashes = {path_hash(name) for name in meta}
+        info["files"] = len(info["hashes"])
+        info["vehicles"] = []
+        hashes = array("Q", sorted(h for h in info["hashes"] if h not in meta_hashes))
+    info.pop("hashes", None)
+    if sys.byteorder == "big":
+        hashes.byteswap()  # o cache guarda sempre little-endian
+    info["hashes"] = base64.b64encode(hashes.tobytes()).decode("ascii")
+    return info
+
+
+def mod_hashes(info):
+    hashes = array("Q")
+    hashes.frombytes(base64.b64decode(info.get("hashes", "")))
+    if sys.byteorder == "big":
+        hashes.byteswap()
+    return hashes
+
+
+def mod_paths(info):
+    """hash -> caminho (vazio no HashFS v2, que não guarda nomes)."""
+    names = info.get("names")
+    if not names:
+        return {}
+    paths = zlib.decompress(base64.b64decode(names)).decode("utf-8").split("\n")
+    return dict(zip(mod_hashes(info), paths))
+
+
+def inspect_mod(path, name):
+    """Resumo de um arquivo de mod/ (nunca lança: erros vão para o campo "error")."""
+    try:
+        info = summarize(read_scs(path))
+        info["error"] = None
+    except (OSError, ValueError, zlib.error, struct.error, EOFError, RuntimeError, NotImplementedError) as e:
+        info = {"format": None, "files": 0, "vehicles": [], "hashes": "", "error": str(e)}
+    info["file"] = name
+    return info
+
+
+def find_conflicts(mods):
+    """[{"mods": [arquivos], "files": n, "sample": [caminhos]}] dos caminhos presentes em mais de um mod."""
+    first = {}
+    shared = {}
+    for idx, mod in enumerate(mods):
+        for h in mod_hashes(mod):
+            owner = first.setdefault(h, idx)
+            if owner != idx:
+                owners = shared.setdefault(h, [owner])
+                if owners[-1] != idx:
+                    owners.append(idx)
+    groups = {}
+    for h, owners in shared.items():
+        groups.setdefault(tuple(owners), []).append(h)
+    names = {}
+    conflicts = []
+    for owners, hashes in sorted(groups.items(), key=lambda g: -len(g[1])):
+        sample = []
+        for h in hashes[:CONFLICT_SAMPLE]:
+            for idx in owners:
+                if idx not in names:
+                    names[idx] = mod_paths(mods[idx])
+                if h in names[idx]:
+                    sample.append(names[idx][h])
+                    break
+            else:
+                sample.append(f"#{h:016x}")
+        conflicts.append({"mods": [mods[idx]["file"] for idx in owners], "files": len(hashes), "sample": sorted(sample)})
+    return conflicts
+
+
+# ---------- índice com cache ----------
+
+class ScsIndex:
+    """Resumo dos .scs/.zip de uma pasta, relidos só quando o arquivo muda."""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.last_reread = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and isinstance(data.get("mods"), dict):
+            self.entries = data["mods"]
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        tmp = self.cache_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "mods": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+
+    def refresh(self, folder, known=None):
+        """Resumos dos mods de folder (em ordem de nome).
+
+        known: nome do arquivo -> (tamanho, mtime_ns, sha256) dos manifestos de instalação;
+        vale só se o arquivo ainda tem esse tamanho e mtime.
+        """
+        known = known or {}
+        with self._lock:
+            by_sha = {e["sha256"]: e for e in self.entries.values() if e.get("sha256") and not e.get("error")}
+            seen = {}
+            reread = 0
+            try:
+                files = [e for e in os.scandir(folder) if e.name.lower().endswith(MOD_EXTENSIONS) and e.is_file()]
+            except OSError:
+                files = []
+            for entry in files:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                stamp = [st.st_size, st.st_mtime_ns]
+                record = known.get(entry.name)
+                sha = record[2] if record and [record[0], record[1]] == stamp else None
+                cached = self.entries.get(entry.path)
+                if cached is not None and cached.get("stamp") == stamp:
+                    info = cached
+                    if sha and not info.get("sha256"):
+                        info = dict(info, sha256=sha)
+                elif sha and sha in by_sha:
+                    # mesmo conteúdo de um arquivo já lido (reinstalado, copiado, renomeado)
+                    info = dict(by_sha[sha], file=entry.name, stamp=stamp)
+                else:
+                    info = inspect_mod(entry.path, entry.name)
+                    info["stamp"] = stamp
+                    info["sha256"] = sha
+                    reread += 1
+                seen[entry.path] = info
+            changed = reread or seen != self.entries
+            self.entries = seen
+            self.last_reread = reread
+            if changed:
+                self._save()
+            return sorted(seen.values(), key=lambda m: m["file"].lower())
+
+
+FORMAT_LABELS = {"zip": "ZIP", "hashfs1": "HashFS v1", "hashfs2": "HashFS v2 (sem nomes)"}
+
+
+def describe_mod(mod, conflicts, max_conflicts=5):
+    """Linhas de texto sobre um mod: formato, manifest.sii, veículos e conflitos com outros mods."""
+    if mod.get("error"):
+        return [f"{mod['file']}: não foi possível ler ({mod['error']})"]
+    title = " ".join(part for part in (mod.get("display_name"), mod.get("version")) if part)
+    lines = [f"{mod['file']}: " + (f"{title} - " if title else "")
+             + f"{FORMAT_LABELS.get(mod['format'], mod['format'])}, {mod['files']} arquivos"
+             + (f", autor {mod['author']}" if mod.get("author") else "")]
+    if mod.get("categories"):
+        lines.append("Categorias: " + ", ".join(mod["categories"]))
+    if mod.get("vehicles"):
+        vehicles = [v.split("/", 1)[1] for v in mod["vehicles"]]
+        lines.append("Veículos: " + ", ".join(vehicles[:8]) + (f" +{len(vehicles) - 8}" if len(vehicles) > 8 else ""))
+    mine = [c for c in conflicts if mod["file"] in c["mods"]]
+    for c in mine[:max_conflicts]:
+        others = ", ".join(m for m in c["mods"] if m != mod["file"])
+        lines.append(f"{c['files']} arquivos também em {others} (ex.: {c['sample'][0]})")
+    if len(mine) > max_conflicts:
+        lines.append(f"... e mais {len(mine) - max_conflicts} grupos de conflito")
+    return lines
+
+
+# ---------- Treeview ----------
+
+MOD_COLUMNS = ("file", "name", "version", "files", "conflicts", "owner")
+MOD_HEADINGS = {"file": "Arquivo", "name": "Nome", "version": "Versão", "files": "Arquivos",
+                "conflicts": "Conflitos", "owner": "Pacote"}
+
+
+def conflicts_by_mod(conflicts):
+    """arquivo -> {outro arquivo: caminhos em comum}."""
+    result = {}
+    for conflict in conflicts:
+        for mod in conflict["mods"]:
+            others = result.setdefault(mod, {})
+            for other in conflict["mods"]:
+                if other != mod:
+                    others[other] = others.get(other, 0) + conflict["files"]
+    return result
+
+
+class ModView(TableView):
+    """Liga os resumos de ScsIndex a um ttk.Treeview (iid = nome do arquivo em mod/)."""
+
+    columns = MOD_COLUMNS
+    headings = MOD_HEADINGS
+    numeric = ("files", "conflicts")
+    noun = "mods"
+
+    def __init__(self, tree, status_var=None, debounce_ms=SEARCH_DEBOUNCE_MS):
+        super().__init__(tree, status_var, debounce_ms)
+        self.owners = {}
+        self.overlaps = {}
+
+    def set_mods(self, mods, conflicts, owners=None):
+        """owners: nome do arquivo -> pacote que o instalou."""
+        self.owners = owners or {}
+        self.overlaps = conflicts_by_mod(conflicts)
+        self.set_items({m["file"]: m for m in mods})
+
+    def sort_value(self, mod, column):
+        if column == "name":
+            return mod.get("display_name")
+        if column == "owner":
+            return self.owners.get(mod["file"], "")
+        if column == "conflicts":
+            return sum(self.overlaps.get(mod["file"], {}).values())
+        return mod.get(column)
+
+    def search_text(self, mod):
+        return f"{mod['file']} {mod.get('display_name', '')} {mod.get('author', '')} {' '.join(mod.get('vehicles', []))}"
+
+    def row_values(self, mod):
+        others = self.overlaps.get(mod["file"], {})
+        if others:
+            names = sorted(others, key=lambda o: -others[o])
+            conflicts = f"{sum(others.values())} com {', '.join(names[:2])}" + (f" +{len(names) - 2}" if len(names) > 2 else "")
+        else:
+            conflicts = ""
+        name = mod.get("display_name") or ("(ilegível)" if mod.get("error") else "")
+        return (mod["file"], name, mod.get("version", ""), mod.get("files", 0), conflicts, self.owners.get(mod["file"], ""))